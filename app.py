@@ -21,10 +21,10 @@ Version: 2.0 (Production Ready)
 
 import os
 import sys
+import json
 import logging
 from pathlib import Path
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 
 # Fix imports for Vercel serverless environment
 if os.environ.get('VERCEL'):
@@ -32,116 +32,207 @@ if os.environ.get('VERCEL'):
     current_dir = Path(__file__).resolve().parent
     if str(current_dir) not in sys.path:
         sys.path.insert(0, str(current_dir))
-    logger_temp = logging.getLogger(__name__)
-    logger_temp.info(f"Vercel environment detected. Working dir: {current_dir}")
 
-from config import config, DATA_DIR
-from utils import DataLoader, DiagnosisEngine, RecommendationEngine
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+from config import config, BASE_DIR, DATA_DIR, STATIC_DIR
+from utils import (
+    DiagnosisPipeline, KnowledgeBaseManager, Metrics, ResultCache, SessionClosed, SessionStore, SingleFlight,
+    StaticAssets, configure_logging
 )
+from utils.admission import AdmissionRejected, create_admission_controller
+from utils.assets import Asset, page_asset
+from utils.aggregates import PARAMETERS_ERROR, create_traffic_aggregates
+from utils.history import create_history_store
+from utils.serialization import current_timestamp
+from utils.sessions import SSE_HEARTBEAT, closed_event, format_event
+
 logger = logging.getLogger(__name__)
 
+# Content types accepted as newline-delimited JSON by /diagnose/batch
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# Prometheus text exposition format served by /metrics
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
 # Initialize Flask app
 app = Flask(__name__)
 env = os.environ.get('FLASK_ENV', 'production' if os.environ.get('VERCEL') else 'development')
 app.config.from_object(config[env])
 
-logger.info(f"Starting initialization in {env} mode")
-logger.info(f"BASE_DIR from config: {config[env].__dict__ if hasattr(config[env], '__dict__') else 'N/A'}")
-
-# Initialize data loader and engines
-try:
-    logger.info(f"DATA_DIR path: {DATA_DIR}")
-    logger.info(f"DATA_DIR exists: {DATA_DIR.exists()}")
-    
-    if DATA_DIR.exists():
-        logger.info(f"Files in DATA_DIR: {list(DATA_DIR.iterdir())}")
-    
-    data_loader = DataLoader(DATA_DIR)
-    logger.info("DataLoader created")
-    
-    disease_database = data_loader.get_diseases()
-    logger.info(f"Diseases loaded: {len(disease_database)} diseases")
-    
-    recommendations_config = data_loader.get_recommendations_config()
-    logger.info("Recommendations config loaded")
-
-    diagnosis_engine = DiagnosisEngine(disease_database)
-    logger.info("DiagnosisEngine initialized")
-    
-    recommendation_engine = RecommendationEngine(recommendations_config)
-    logger.info("RecommendationEngine initialized")
-
-    logger.info(f"Application initialized successfully in {env} mode")
-    logger.info(f"Loaded {len(disease_database)} diseases from database")
-except Exception as e:
-    logger.error(f"Failed to initialize application: {e}", exc_info=True)
-    logger.error(f"Current working directory: {Path.cwd()}")
-    logger.error(f"Script directory: {Path(__file__).parent}")
-    raise
-
-
-def validate_symptom_input(data: dict) -> tuple:
+# Configure logging: a background thread writes the records
+log_pipeline = configure_logging(app.config)
+
+# Initialize the knowledge base. Detailed environment diagnostics are served
+# on demand by /health rather than logged on every (cold) start.
+result_cache = None
+if app.config['RESULT_CACHE_SIZE'] > 0:
+    result_cache = ResultCache(app.config['RESULT_CACHE_SIZE'], app.config['RESULT_CACHE_TTL'])
+
+# Engines live in an immutable snapshot that the watcher swaps on change
+knowledge_base = KnowledgeBaseManager(DATA_DIR, app.config, cache=result_cache)
+
+if not app.config['LAZY_KB_LOAD']:
+    try:
+        knowledge_base.load()
+    except Exception as e:
+        logger.error(f"Failed to initialize application: {e}", exc_info=True)
+        raise
+
+if app.config['KB_RELOAD_INTERVAL'] > 0:
+    knowledge_base.start_watcher(app.config['KB_RELOAD_INTERVAL'])
+
+# Incremental diagnosis sessions; None disables the /session API
+session_store = None
+if app.config['SESSION_MAX_COUNT'] > 0:
+    session_store = SessionStore(app.config['SESSION_MAX_COUNT'], app.config['SESSION_IDLE_TTL'])
+
+# Concurrent identical /diagnose records share one computation; None disables
+diagnosis_flights = SingleFlight() if app.config['DIAGNOSE_SINGLE_FLIGHT'] else None
+
+# Load shedding in front of /diagnose; None admits everything
+admission = create_admission_controller(app.config)
+
+# Write-behind audit log of /diagnose results; None keeps no history
+history = create_history_store(app.config)
+
+# Live per-bucket counters of diagnosis traffic; None disables /aggregates
+aggregates = create_traffic_aggregates(app.config)
+
+# Request instrumentation; None skips timing entirely
+metrics = Metrics() if app.config['METRICS_ENABLED'] else None
+
+# Fingerprinted, precompressed static files; templates link them with asset_url()
+static_assets = StaticAssets(STATIC_DIR, app.config['ASSETS_PREBUILT_DIR'], auto_reload=app.debug)
+app.jinja_env.globals['asset_url'] = static_assets.url
+
+# Rendered index page, built on first request (re-rendered on every request in debug mode)
+index_page = None
+
+logger.info(f"Application initialized in {env} mode")
+
+
+def validate_symptom_input(data: dict, pipeline: DiagnosisPipeline = None) -> tuple:
     """
     Validate and extract symptom data from request
 
     Args:
         data: Request JSON data
+        pipeline: Pipeline of the snapshot serving the request (default: current)
 
     Returns:
         Tuple of (temperature, symptoms_data) or raises ValueError
     """
-    try:
-        temperature = float(data.get('temperature', 36.6))
-
-        # Validate temperature range
-        if not (app.config['MIN_TEMPERATURE'] <= temperature <= app.config['MAX_TEMPERATURE']):
-            raise ValueError(f"Temperature must be between {app.config['MIN_TEMPERATURE']}°C and {app.config['MAX_TEMPERATURE']}°C")
-
-        # Extract all symptoms
-        symptoms_data = {
-            'fever': int(data.get('fever', 0)),
-            'body_ache': int(data.get('body_ache', 0)),
-            'headache': int(data.get('headache', 0)),
-            'stuffy_nose': int(data.get('stuffy_nose', 0)),
-            'runny_nose': int(data.get('runny_nose', 0)),
-            'cough': int(data.get('cough', 0)),
-            'fatigue': int(data.get('fatigue', 0)),
-            'sore_throat': int(data.get('sore_throat', 0)),
-            'difficulty_breathing': int(data.get('difficulty_breathing', 0)),
-            'chest_pain': int(data.get('chest_pain', 0)),
-            'loss_of_taste': int(data.get('loss_of_taste', 0)),
-            'nausea': int(data.get('nausea', 0)),
-            'chills': int(data.get('chills', 0)),
-            'sneezing': int(data.get('sneezing', 0)),
-            'watery_eyes': int(data.get('watery_eyes', 0)),
-            'itchy_eyes': int(data.get('itchy_eyes', 0)),
-            'facial_pain': int(data.get('facial_pain', 0)),
-            'difficulty_swallowing': int(data.get('difficulty_swallowing', 0)),
-            'swollen_lymph': int(data.get('swollen_lymph', 0)),
-            'sensitivity_light': int(data.get('sensitivity_light', 0)),
-            'sensitivity_sound': int(data.get('sensitivity_sound', 0)),
-            'confusion': int(data.get('confusion', 0))
-        }
+    return (pipeline or knowledge_base.get().pipeline).validate(data)
 
-        # Validate symptom ranges (0-10)
-        for symptom, value in symptoms_data.items():
-            if not (0 <= value <= 10):
-                raise ValueError(f"Symptom '{symptom}' must be between 0 and 10")
 
-        return temperature, symptoms_data
+def asset_response(asset: Asset, cache_control: str) -> Response:
+    """
+    Serve an asset in the best encoding the client accepts
+
+    Args:
+        asset: Asset to serve
+        cache_control: Cache-Control header value
 
-    except (ValueError, TypeError) as e:
-        raise ValueError(f"Invalid input data: {str(e)}")
+    Returns:
+        Response, or a 304 when the client's If-None-Match matches
+    """
+    encoding, body = asset.select(request.headers.get('Accept-Encoding'))
+    response = Response(body, mimetype=asset.content_type)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    if asset.compressible:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(asset.etag(encoding))
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    global index_page
+    page = index_page
+    if page is None or app.debug:
+        page = index_page = page_asset('index.html', render_template('index.html'))
+    # The page links versioned assets, so browsers revalidate it on every visit
+    return asset_response(page, 'no-cache')
+
+
+@app.route('/assets/<name>')
+def asset(name):
+    """Serve a fingerprinted static file, cached by browsers for good"""
+    found = static_assets.get(name)
+    if found is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    return asset_response(found, f"public, max-age={app.config['ASSET_MAX_AGE']}, immutable")
+
+
+@app.route('/model')
+def get_model():
+    """
+    Serve the compact model export that static/scorer.js scores with
+
+    The ETag is the export's content hash, so browsers revalidate their copy
+    with a 304 until the knowledge base changes.
+    """
+    try:
+        model = knowledge_base.get().pipeline.model()
+    except Exception as e:
+        logger.error(f"Model export error: {e}", exc_info=True)
+        return jsonify({'error': 'Internal server error. Please try again.'}), 500
+    return asset_response(model, 'no-cache')
+
+
+def build_diagnosis(
+    temperature: float,
+    symptoms_data: dict,
+    pipeline: DiagnosisPipeline = None,
+    timer=None
+) -> dict:
+    """
+    Run the diagnosis pipeline for one validated symptom record
+
+    Args:
+        temperature: Patient's temperature
+        symptoms_data: Validated symptom severities
+        pipeline: Pipeline of the snapshot serving the request (default: current)
+        timer: Stage timer of the request, when metrics are enabled
+
+    Returns:
+        Response dictionary with diagnoses and recommendations
+    """
+    return (pipeline or knowledge_base.get().pipeline).run(temperature, symptoms_data, timer)
+
+
+def diagnosis_response(response: dict, pipeline: DiagnosisPipeline):
+    """
+    Serialize a diagnosis with the snapshot's pre-encoded fragments
+
+    Debug mode keeps jsonify for its indented output.
+    """
+    if app.debug:
+        return jsonify(response)
+    return Response(pipeline.encode(response) + b'\n', mimetype=app.json.mimetype)
+
+
+def record_metrics(endpoint: str, response, status: int, timer=None, error: Exception = None):
+    """
+    Record a finished request and attach its Server-Timing header
+
+    Args:
+        endpoint: Request path
+        response: Flask response
+        status: HTTP status code
+        timer: Stage timer of the request
+        error: Exception that failed the request
+
+    Returns:
+        Tuple of (response, status)
+    """
+    if metrics is not None:
+        if timer is not None:
+            timer.mark('serialize')
+            response.headers['Server-Timing'] = timer.server_timing()
+        metrics.record_request(endpoint, status, timer, error)
+    return response, status
 
 
 @app.route('/diagnose', methods=['POST'])
@@ -149,57 +240,469 @@ def get_diagnosis():
     """
     Process symptom data and return diagnosis with recommendations
 
+    Set ``"explain": true`` in the body to add per-symptom contributions and
+    the what-if sensitivity grid of every diagnosis.
+
     Returns:
         JSON response with diagnoses and recommendations
     """
+    timer = metrics.timer() if metrics is not None else None
+    admitted = False
     try:
+        data = request.json
+        if timer is not None:
+            timer.mark('parse')
+
+        # Pin the knowledge base snapshot for the whole request
+        pipeline = knowledge_base.get().pipeline
+
+        if admission is not None:
+            admission.acquire(critical=pipeline.is_critical(data))
+            admitted = True
+            if timer is not None:
+                timer.mark('admission')
+
         # Validate and extract input data
-        temperature, symptoms_data = validate_symptom_input(request.json)
+        temperature, symptoms_data = validate_symptom_input(data, pipeline)
+        if timer is not None:
+            timer.mark('validate')
+
+        if diagnosis_flights is None:
+            response = build_diagnosis(temperature, symptoms_data, pipeline, timer)
+        else:
+            # Keyed on the snapshot too: records scored against another
+            # knowledge base version are not the same computation
+            response, shared = diagnosis_flights.do(
+                (pipeline, temperature, bytes(symptoms_data.values())),
+                lambda: build_diagnosis(temperature, symptoms_data, pipeline, timer)
+            )
+            if shared:
+                response = {**response, 'timestamp': current_timestamp()}
+                if timer is not None:
+                    timer.mark('coalesced')
+
+        if history is not None:
+            history.record(pipeline, temperature, symptoms_data, response)
+        if aggregates is not None:
+            aggregates.record(response, symptoms_data, pipeline.registry.names)
+
+        if data.get('explain'):
+            # Opt-in; the (possibly cached) response itself is left untouched
+            response = {
+                **response,
+                'explanations': pipeline.explain(temperature, symptoms_data, response['diagnoses'])
+            }
+            if timer is not None:
+                timer.mark('explain')
+
+        logger.info(
+            "Diagnosis completed: %d matches, severity: %s",
+            len(response['diagnoses']), response['overall_severity']
+        )
+        return record_metrics('/diagnose', diagnosis_response(response, pipeline), 200, timer)
+
+    except AdmissionRejected as e:
+        logger.warning("Shedding /diagnose request: %s", e)
+        response = jsonify({'error': 'Server is busy. Please retry shortly.'})
+        response.headers['Retry-After'] = e.retry_after_header
+        return record_metrics('/diagnose', response, 429, timer)
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return record_metrics('/diagnose', jsonify({'error': str(e)}), 400, timer, e)
+    except Exception as e:
+        logger.error(f"Processing error: {e}", exc_info=True)
+        return record_metrics(
+            '/diagnose', jsonify({'error': 'Internal server error. Please try again.'}), 500, timer, e
+        )
+    finally:
+        if admitted:
+            admission.release()
+
+
+def diagnose_record(index: int, record, pipeline: DiagnosisPipeline) -> dict:
+    """
+    Diagnose a single batch record, reporting failures inline
+
+    Args:
+        index: Position of the record in the batch
+        record: Decoded JSON object, or a raw NDJSON line
+        pipeline: Pipeline of the snapshot serving the batch
+
+    Returns:
+        Result dictionary tagged with the record index
+    """
+    try:
+        if isinstance(record, (bytes, str)):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("Invalid input data: each record must be a JSON object")
+
+        temperature, symptoms_data = validate_symptom_input(record, pipeline)
+        return {'index': index, **build_diagnosis(temperature, symptoms_data, pipeline)}
+
+    except json.JSONDecodeError as e:
+        return {'index': index, 'error': f"Invalid JSON: {e}"}
+    except ValueError as e:
+        return {'index': index, 'error': str(e)}
+    except Exception as e:
+        logger.error(f"Processing error in batch record {index}: {e}", exc_info=True)
+        return {'index': index, 'error': 'Internal server error. Please try again.'}
+
+
+def iter_ndjson_lines(stream):
+    """Yield non-blank lines from an NDJSON request body without buffering it"""
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+@app.route('/diagnose/batch', methods=['POST'])
+def get_batch_diagnosis():
+    """
+    Process many symptom records and stream the results as NDJSON
 
-        # Perform diagnosis
-        diagnoses = diagnosis_engine.analyze_symptoms(
-            symptoms_data,
-            temperature,
-            min_confidence=app.config['MIN_CONFIDENCE_THRESHOLD']
+    Accepts either a JSON array of symptom records or an NDJSON body
+    (Content-Type: application/x-ndjson). NDJSON input is read line by line,
+    so memory use does not grow with the size of the batch. Each output line
+    carries the record ``index`` and either the diagnosis or an ``error``.
+
+    Returns:
+        Streaming NDJSON response, one line per input record
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        records = iter_ndjson_lines(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return record_metrics(
+                '/diagnose/batch', jsonify({'error': 'Request body must be a JSON array or NDJSON'}), 400
+            )
+        records = iter(data)
+
+    # The whole batch is scored against one knowledge base snapshot
+    try:
+        pipeline = knowledge_base.get().pipeline
+    except Exception as e:
+        logger.error(f"Processing error: {e}", exc_info=True)
+        return record_metrics(
+            '/diagnose/batch', jsonify({'error': 'Internal server error. Please try again.'}), 500, error=e
         )
 
-        # Limit to max results
-        diagnoses = diagnoses[:app.config['MAX_RESULTS']]
+    def generate():
+        count = 0
+        for index, record in enumerate(records):
+            result = diagnose_record(index, record, pipeline)
+            yield pipeline.encode(result) + b'\n'
+            count += 1
+        logger.info("Batch diagnosis completed: %d records", count)
+        if metrics is not None:
+            metrics.record_request('/diagnose/batch', 200)
+            metrics.increment('batch_records_total', amount=count)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
+
+
+def session_lookup(session_id: str):
+    """Live session by id, or None when sessions are disabled or it is gone"""
+    return session_store.get(session_id) if session_store is not None else None
+
+
+def session_not_found(endpoint: str):
+    return record_metrics(endpoint, jsonify({'error': 'Session not found'}), 404)
+
+
+@app.route('/session', methods=['POST'])
+def create_session():
+    """
+    Open an incremental diagnosis session from a full symptom record
+
+    Later updates send only the changed fields to PATCH /session/<id>;
+    every update is pushed to GET /session/<id>/events.
 
-        # Assess overall severity
-        overall_severity = diagnosis_engine.assess_overall_severity(
-            diagnoses, symptoms_data, temperature
+    Returns:
+        201 with the session id, sequence number and first diagnosis
+    """
+    if session_store is None:
+        return session_not_found('/session')
+    try:
+        pipeline = knowledge_base.get().pipeline
+        temperature, symptoms_data = validate_symptom_input(request.json, pipeline)
+        session = session_store.create(pipeline, temperature, symptoms_data)
+        logger.info("Session %s opened", session.session_id)
+        response = {'session_id': session.session_id, 'seq': session.seq, **session.response}
+        return record_metrics('/session', diagnosis_response(response, pipeline), 201)
+
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return record_metrics('/session', jsonify({'error': str(e)}), 400, error=e)
+    except Exception as e:
+        logger.error(f"Processing error: {e}", exc_info=True)
+        return record_metrics(
+            '/session', jsonify({'error': 'Internal server error. Please try again.'}), 500, error=e
         )
 
-        # Generate recommendations
-        recommendations = recommendation_engine.generate_recommendations(
-            diagnoses, symptoms_data, temperature
+
+@app.route('/session/<session_id>', methods=['GET', 'PATCH', 'DELETE'])
+def session_resource(session_id: str):
+    """
+    Read (GET), update (PATCH) or close (DELETE) a session
+
+    PATCH takes only the changed fields, e.g. {"cough": 6}; the new diagnosis
+    is published to the event stream and returned by GET.
+
+    Returns:
+        GET: current diagnosis; PATCH: 202 with the new sequence number;
+        DELETE: 204
+    """
+    endpoint = '/session/<id>'
+    if request.method == 'DELETE':
+        if session_store is None or not session_store.close(session_id):
+            return session_not_found(endpoint)
+        return record_metrics(endpoint, Response(status=204), 204)
+
+    session = session_lookup(session_id)
+    if session is None:
+        return session_not_found(endpoint)
+
+    if request.method == 'GET':
+        pipeline = session.pipeline
+        response = {'session_id': session_id, 'seq': session.seq, **session.response}
+        return record_metrics(endpoint, diagnosis_response(response, pipeline), 200)
+
+    try:
+        data = request.json
+        if not isinstance(data, dict):
+            raise ValueError("Invalid input data: body must be a JSON object")
+        seq = session.update(data, knowledge_base.get().pipeline)
+        return record_metrics(endpoint, jsonify({'session_id': session_id, 'seq': seq}), 202)
+
+    except SessionClosed:
+        return session_not_found(endpoint)
+    except ValueError as e:
+        logger.warning("Validation error: %s", e)
+        return record_metrics(endpoint, jsonify({'error': str(e)}), 400, error=e)
+    except Exception as e:
+        logger.error(f"Processing error: {e}", exc_info=True)
+        return record_metrics(
+            endpoint, jsonify({'error': 'Internal server error. Please try again.'}), 500, error=e
         )
 
-        # Calculate symptom summary
-        active_symptoms = {k: v for k, v in symptoms_data.items() if v > 0}
-        symptom_avg = sum(active_symptoms.values()) / len(active_symptoms) if active_symptoms else 0
-
-        response = {
-            'diagnoses': diagnoses,
-            'overall_severity': overall_severity,
-            'symptom_average': round(symptom_avg, 1),
-            'temperature': temperature,
-            'active_symptom_count': len(active_symptoms),
-            'recommendations': recommendations,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'critical_warning': len(recommendations.get('immediate', [])) > 0
+
+def last_event_id() -> int:
+    """Sequence number the client already has (Last-Event-ID header or query)"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+@app.route('/session/<session_id>/events')
+def session_events(session_id: str):
+    """
+    Stream a session's diagnoses as Server-Sent Events
+
+    Sends the current diagnosis unless the client already has it, then one
+    ``diagnosis`` event per update (``id`` is the sequence number) and a
+    final ``closed`` event when the session ends.
+
+    Returns:
+        text/event-stream response
+    """
+    session = session_lookup(session_id)
+    if session is None:
+        return session_not_found('/session/<id>/events')
+    heartbeat = app.config['SESSION_HEARTBEAT_INTERVAL']
+    resume_from = last_event_id()
+
+    def generate():
+        seen = resume_from
+        while True:
+            seq, payload, closed = session.latest()
+            if seq > seen:
+                yield format_event('diagnosis', payload, seq)
+                seen = seq
+            if closed is not None:
+                yield closed_event(closed)
+                return
+            if not session.wait(seen, heartbeat):
+                # Open streams keep their session alive
+                session_store.touch(session)
+                yield SSE_HEARTBEAT
+
+    if metrics is not None:
+        metrics.record_request('/session/<id>/events', 200)
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/health')
+def get_health():
+    """
+    Report application health, loading the knowledge base if needed
+
+    Pass ``?verbose=1`` for environment diagnostics (paths, data files,
+    Python version) that used to be logged on every startup; only in debug
+    mode or with HEALTH_VERBOSE, otherwise the parameter is ignored.
+
+    Returns:
+        JSON response with knowledge base status
+    """
+    try:
+        knowledge_base.get()
+        status, code = 'ok', 200
+    except Exception as e:
+        logger.error(f"Knowledge base failed to load: {e}", exc_info=True)
+        status, code = 'error', 503
+
+    health = {
+        'status': status,
+        'environment': env,
+        'knowledge_base': knowledge_base.status(),
+        'engine': type(knowledge_base.current.diagnosis_engine).__name__ if knowledge_base.current else None
+    }
+
+    if request.args.get('verbose') and (app.debug or app.config['HEALTH_VERBOSE']):
+        health['diagnostics'] = {
+            'python_version': sys.version,
+            'cwd': str(Path.cwd()),
+            'base_dir': str(BASE_DIR),
+            'data_dir': str(DATA_DIR),
+            'data_dir_exists': DATA_DIR.exists(),
+            'data_files': sorted(p.name for p in DATA_DIR.iterdir()) if DATA_DIR.exists() else [],
+            'sys_path': sys.path[:5],
+            'vercel': bool(os.environ.get('VERCEL'))
         }
 
-        logger.info(f"Diagnosis completed: {len(diagnoses)} matches, severity: {overall_severity}")
-        return jsonify(response)
+    return jsonify(health), code
+
+
+@app.route('/aggregates')
+def get_aggregates():
+    """
+    Report live aggregates of recent diagnosis traffic
+
+    Query parameters: ``window`` (seconds, default 3600) and ``step``
+    (seconds) to also get the window as a time series, e.g.
+    ``?window=86400&step=3600`` for hourly counts.
 
+    Returns:
+        JSON response with request, severity, disease and symptom counts
+    """
+    if aggregates is None:
+        return jsonify({'error': 'Aggregates are disabled'}), 404
+    try:
+        window = int(request.args.get('window', 3600))
+        step = request.args.get('step')
+        step = int(step) if step else None
+    except ValueError:
+        return jsonify({'error': PARAMETERS_ERROR}), 400
+    try:
+        return jsonify(aggregates.query(window, step))
     except ValueError as e:
-        logger.warning(f"Validation error: {e}")
         return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        logger.error(f"Processing error: {e}", exc_info=True)
-        return jsonify({'error': 'Internal server error. Please try again.'}), 500
+
+
+@app.route('/cache/stats')
+def get_cache_stats():
+    """
+    Report result cache counters for sizing the cache
+
+    Returns:
+        JSON response with hit/miss/eviction counters
+    """
+    if result_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **result_cache.stats()})
+
+
+@app.route('/metrics')
+def get_metrics():
+    """
+    Expose request, cache and knowledge base metrics for Prometheus
+
+    Returns:
+        Prometheus text exposition, or 404 when METRICS_ENABLED is off
+    """
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+
+    gauges = []
+    if result_cache is not None:
+        stats = result_cache.stats()
+        gauges.append(('cache_entries', 'gauge', 'Result cache entries', (), stats['size']))
+        for counter in ('hits', 'misses', 'evictions', 'expirations'):
+            gauges.append((f"cache_{counter}_total", 'counter', f"Result cache {counter}", (), stats[counter]))
+
+    status = knowledge_base.status()
+    if status['loaded']:
+        gauges.extend([
+            ('knowledge_base_info', 'gauge', 'Active knowledge base version',
+             (('version', status['version']),), 1),
+            ('knowledge_base_diseases', 'gauge', 'Diseases in the active knowledge base',
+             (), status['disease_count']),
+            ('knowledge_base_reloads_total', 'counter', 'Successful knowledge base reloads',
+             (), status['reload_count']),
+            ('knowledge_base_failed_reloads_total', 'counter', 'Failed knowledge base reloads',
+             (), status['failed_reloads']),
+        ])
+
+    if session_store is not None:
+        stats = session_store.stats()
+        gauges.append(('sessions_active', 'gauge', 'Live diagnosis sessions', (), stats['active']))
+        for counter in ('created', 'expired', 'evicted'):
+            gauges.append((f"sessions_{counter}_total", 'counter', f"Diagnosis sessions {counter}", (), stats[counter]))
+
+    if diagnosis_flights is not None:
+        stats = diagnosis_flights.stats()
+        gauges.extend([
+            ('diagnose_in_flight', 'gauge', 'Distinct /diagnose computations running', (), stats['in_flight']),
+            ('diagnose_computed_total', 'counter', '/diagnose computations run', (), stats['executed']),
+            ('diagnose_coalesced_total', 'counter', '/diagnose requests that shared a running computation',
+             (), stats['shared']),
+        ])
+
+    if admission is not None:
+        stats = admission.stats()
+        gauges.extend([
+            ('admission_active', 'gauge', 'Admitted /diagnose requests in flight', (), stats['active']),
+            ('admission_waiting', 'gauge', 'Requests waiting for a /diagnose slot', (), stats['waiting']),
+            ('admission_admitted_total', 'counter', 'Requests admitted by priority',
+             (('priority', 'normal'),), stats['admitted']),
+            ('admission_admitted_total', 'counter', 'Requests admitted by priority',
+             (('priority', 'critical'),), stats['admitted_critical']),
+            ('admission_queued_total', 'counter', 'Requests that waited for a slot', (), stats['queued']),
+        ])
+        for reason, count in stats['rejected'].items():
+            gauges.append(('admission_rejected_total', 'counter', 'Requests shed by reason',
+                           (('reason', reason),), count))
+
+    if history is not None:
+        stats = history.stats()
+        gauges.append(('history_queue_records', 'gauge', 'Results waiting for the history writer', (), stats['queued']))
+        for counter, help_text in (
+            ('written', 'Results written to the history database'),
+            ('batches', 'History transactions committed'),
+            ('dropped', 'Results dropped because the history queue was full'),
+            ('failed', 'Results lost to failed history writes'),
+        ):
+            gauges.append((f"history_{counter}_total", 'counter', help_text, (), stats[counter]))
+
+    stats = log_pipeline.stats()
+    gauges.extend([
+        ('log_queue_records', 'gauge', 'Log records waiting for the writer thread', (), stats['queued']),
+        ('log_dropped_total', 'counter', 'Log records dropped because the queue was full', (), stats['dropped']),
+        ('log_sampled_out_total', 'counter', 'Log records skipped by sampling', (), stats['sampled_out']),
+    ])
+
+    return Response(metrics.render(gauges), mimetype=PROMETHEUS_MIMETYPE)
+
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,644 @@
+"""
+Medical Symptom Checker - ASGI Application
+==========================================
+
+Asyncio variant of app.py for serving many concurrent connections from one
+process. It uses the same knowledge base, engines and request/response
+contract as the Flask application, without a web framework:
+
+- ``GET /``, ``/assets/*`` and ``/static/*`` serve the web interface; the
+  page and its fingerprinted assets are served from memory, compressed
+- ``GET /model`` serves the compact model export the page scores with
+- ``POST /diagnose`` scores one record directly on the event loop (a few
+  microseconds of work, so there is nothing to gain from a thread hop)
+- ``POST /diagnose/batch`` streams NDJSON results; records are scored in
+  chunks on a bounded thread pool so large batches never block the loop
+- ``/session`` serves incremental diagnosis sessions; their Server-Sent
+  Events streams wait on an asyncio.Event instead of holding a thread
+
+Run with any ASGI server, for example:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --backlog 4096
+"""
+
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Mapping
+from urllib.parse import parse_qs
+
+from jinja2 import Environment, FileSystemLoader
+
+from config import BASE_DIR, DATA_DIR, STATIC_DIR, load_settings
+from utils import (
+    DiagnosisPipeline, KnowledgeBaseManager, ResultCache, SessionClosed, SessionStore, StaticAssets,
+    configure_logging
+)
+from utils.admission import AdmissionRejected, create_admission_controller
+from utils.assets import Asset, page_asset
+from utils.aggregates import PARAMETERS_ERROR, create_traffic_aggregates
+from utils.history import create_history_store
+from utils.serialization import dumps_stdlib
+from utils.sessions import SSE_HEARTBEAT, closed_event, format_event
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = BASE_DIR / 'templates'
+
+# Content types accepted as newline-delimited JSON by /diagnose/batch
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+INTERNAL_ERROR = {'error': 'Internal server error. Please try again.'}
+
+SESSION_NOT_FOUND = {'error': 'Session not found'}
+
+
+class PayloadTooLarge(Exception):
+    """Request body exceeds MAX_CONTENT_LENGTH"""
+
+
+def score_records(pipeline: DiagnosisPipeline, chunk: list) -> bytes:
+    """
+    Score one chunk of batch records on an executor thread
+
+    Args:
+        pipeline: Pipeline of the snapshot serving the batch
+        chunk: List of (index, record) pairs; records are decoded objects or raw NDJSON lines
+
+    Returns:
+        NDJSON lines, one per record, with failures reported inline
+    """
+    lines = []
+    for index, record in chunk:
+        try:
+            if isinstance(record, (bytes, str)):
+                record = json.loads(record)
+            if not isinstance(record, dict):
+                raise ValueError("Invalid input data: each record must be a JSON object")
+            result = {'index': index, **pipeline.diagnose(record)}
+        except json.JSONDecodeError as e:
+            result = {'index': index, 'error': f"Invalid JSON: {e}"}
+        except ValueError as e:
+            result = {'index': index, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"Processing error in batch record {index}: {e}", exc_info=True)
+            result = {'index': index, **INTERNAL_ERROR}
+        lines.append(pipeline.encode(result))
+    lines.append(b'')
+    return b'\n'.join(lines)
+
+
+class SymptomCheckerASGI:
+    """ASGI application serving the web interface and the diagnosis API"""
+
+    def __init__(self, settings: Mapping[str, Any], data_dir: Path = DATA_DIR):
+        self.settings = settings
+        self.max_content_length = settings['MAX_CONTENT_LENGTH']
+        self.chunk_size = settings['ASGI_BATCH_CHUNK_SIZE']
+
+        result_cache = None
+        if settings['RESULT_CACHE_SIZE'] > 0:
+            result_cache = ResultCache(settings['RESULT_CACHE_SIZE'], settings['RESULT_CACHE_TTL'])
+        self.knowledge_base = KnowledgeBaseManager(data_dir, settings, cache=result_cache)
+
+        self.sessions = None
+        if settings['SESSION_MAX_COUNT'] > 0:
+            self.sessions = SessionStore(settings['SESSION_MAX_COUNT'], settings['SESSION_IDLE_TTL'])
+        self.heartbeat_interval = settings['SESSION_HEARTBEAT_INTERVAL']
+        self.history = create_history_store(settings)
+        self.aggregates = create_traffic_aggregates(settings)
+
+        # Batch chunks queue here; the semaphore bounds work submitted to the pool
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings['ASGI_BATCH_WORKERS'], thread_name_prefix='asgi-batch'
+        )
+        self._batch_slots = asyncio.Semaphore(settings['ASGI_BATCH_MAX_PENDING'])
+
+        # Records are scored one at a time on the event loop, so only the
+        # rate limit applies; a request never waits for a slot
+        self.admission = create_admission_controller(settings, wait=False)
+
+        self.assets = StaticAssets(STATIC_DIR, settings['ASSETS_PREBUILT_DIR'])
+        self._asset_cache_control = f"public, max-age={settings['ASSET_MAX_AGE']}, immutable".encode('latin-1')
+        self._index_page = None
+        self._static_files = {}
+        self._routes = {
+            ('GET', '/'): self.index,
+            ('GET', '/model'): self.model,
+            ('GET', '/aggregates'): self.get_aggregates,
+            ('POST', '/diagnose'): self.diagnose,
+            ('POST', '/diagnose/batch'): self.diagnose_batch,
+            ('POST', '/session'): self.create_session,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        path, method = scope['path'], scope['method']
+        handler = self._routes.get((method, path))
+        try:
+            if handler is not None:
+                await handler(scope, receive, send)
+            elif path.startswith('/assets/') and method == 'GET':
+                await self.asset(scope, send, path[len('/assets/'):])
+            elif path.startswith('/static/') and method == 'GET':
+                await self.static(path[len('/static/'):], send)
+            elif path.startswith('/session/'):
+                await self.session_resource(scope, receive, send, path[len('/session/'):])
+            elif any(route_path == path for _, route_path in self._routes):
+                await self._send_json(send, {'error': 'Method not allowed'}, 405)
+            else:
+                await self._send_json(send, {'error': 'Not found'}, 404)
+        except PayloadTooLarge:
+            await self._send_json(send, {'error': 'Request body too large'}, 413)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if not self.settings['LAZY_KB_LOAD']:
+                        await self._pipeline()
+                    if self.settings['KB_RELOAD_INTERVAL'] > 0:
+                        self.knowledge_base.start_watcher(self.settings['KB_RELOAD_INTERVAL'])
+                except Exception as e:
+                    logger.error(f"Failed to initialize application: {e}", exc_info=True)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.knowledge_base.stop_watcher()
+                if self.sessions is not None:
+                    self.sessions.close_all('shutdown')
+                if self.history is not None:
+                    self.history.close()
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _pipeline(self) -> DiagnosisPipeline:
+        """Pipeline of the active snapshot; the first load runs off the event loop"""
+        snapshot = self.knowledge_base.current
+        if snapshot is None:
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(self.executor, self.knowledge_base.get)
+        return snapshot.pipeline
+
+    async def _read_body(self, receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body = message.get('body', b'')
+            size += len(body)
+            if size > self.max_content_length:
+                raise PayloadTooLarge()
+            chunks.append(body)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def _iter_lines(self, receive):
+        """Yield non-blank lines of an NDJSON body as it arrives"""
+        buffer = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            buffer += message.get('body', b'')
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield line
+            if not message.get('more_body', False):
+                break
+        if buffer.strip():
+            yield buffer
+
+    async def _read_json(self, scope, receive) -> Any:
+        """Decode a JSON request body; anything else raises TypeError, like Flask's request.json"""
+        body = await self._read_body(receive)
+        if not _is_json(_content_type(scope)):
+            raise TypeError("Request body must be application/json")
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise TypeError(f"Failed to decode JSON body: {e}")
+
+    async def _send(self, send, status: int, content_type: str, body: bytes, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode('latin-1')),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                *headers
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_json(self, send, payload: Dict[str, Any], status: int = 200):
+        await self._send(send, status, 'application/json', dumps_stdlib(payload) + b'\n')
+
+    async def _send_asset(self, scope, send, asset: Asset, cache_control: bytes):
+        """Send the best encoding the client accepts, or a 304 if its copy is current"""
+        encoding, body = asset.select(_header(scope, b'accept-encoding'))
+        etag = f'"{asset.etag(encoding)}"'
+        headers = [(b'etag', etag.encode('latin-1')), (b'cache-control', cache_control)]
+        if asset.compressible:
+            headers.append((b'vary', b'Accept-Encoding'))
+        if _etag_matches(_header(scope, b'if-none-match'), etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        if encoding != 'identity':
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+        content_type = asset.content_type
+        if content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        await self._send(send, 200, content_type, body, headers)
+
+    async def index(self, scope, receive, send):
+        if self._index_page is None:
+            # Reads and compresses the static files, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            self._index_page = await loop.run_in_executor(None, self._render_index)
+        await self._send_asset(scope, send, self._index_page, b'no-cache')
+
+    def _render_index(self) -> Asset:
+        environment = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)), autoescape=True)
+        environment.globals['asset_url'] = self.assets.url
+        environment.globals['url_for'] = lambda endpoint, filename: f"/static/{filename}"
+        return page_asset('index.html', environment.get_template('index.html').render())
+
+    async def asset(self, scope, send, name: str):
+        """Serve a fingerprinted static file (see the Flask route)"""
+        if self.assets.loaded:
+            found = self.assets.get(name)
+        else:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(None, self.assets.get, name)
+        if found is None:
+            await self._send_json(send, {'error': 'Asset not found'}, 404)
+            return
+        await self._send_asset(scope, send, found, self._asset_cache_control)
+
+    async def model(self, scope, receive, send):
+        """Serve the compact model export for client-side scoring (see the Flask route)"""
+        pipeline = await self._pipeline()
+        try:
+            model = pipeline.model()
+        except Exception as e:
+            logger.error(f"Model export error: {e}", exc_info=True)
+            await self._send_json(send, INTERNAL_ERROR, 500)
+            return
+        await self._send_asset(scope, send, model, b'no-cache')
+
+    async def get_aggregates(self, scope, receive, send):
+        """Report live aggregates of recent diagnosis traffic (see the Flask route)"""
+        if self.aggregates is None:
+            await self._send_json(send, {'error': 'Aggregates are disabled'}, 404)
+            return
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            window = int(query.get('window', ['3600'])[0])
+            step = query.get('step', [None])[0]
+            step = int(step) if step else None
+        except ValueError:
+            await self._send_json(send, {'error': PARAMETERS_ERROR}, 400)
+            return
+        try:
+            summary = self.aggregates.query(window, step)
+        except ValueError as e:
+            await self._send_json(send, {'error': str(e)}, 400)
+            return
+        await self._send_json(send, summary)
+
+    async def static(self, name: str, send):
+        content = self._static_files.get(name)
+        if content is None:
+            path = (STATIC_DIR / name).resolve()
+            if STATIC_DIR.resolve() not in path.parents or not path.is_file():
+                await self._send_json(send, {'error': 'Not found'}, 404)
+                return
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(None, path.read_bytes)
+            content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+            content = self._static_files[name] = (content_type, body)
+        await self._send(send, 200, content[0], content[1], [(b'cache-control', b'public, max-age=3600')])
+
+    async def diagnose(self, scope, receive, send):
+        """
+        Process symptom data and return diagnosis with recommendations
+
+        Mirrors the Flask route: validation errors are 400s, and anything
+        else, including a body that is not JSON, is a 500.
+        """
+        try:
+            data = await self._read_json(scope, receive)
+            pipeline = await self._pipeline()
+            if self.admission is not None:
+                self.admission.acquire(critical=pipeline.is_critical(data))
+                # Nothing below awaits before the response, so the slot is freed at once
+                self.admission.release()
+            temperature, symptoms_data = pipeline.validate(data)
+            response = pipeline.run(temperature, symptoms_data)
+            if self.history is not None:
+                self.history.record(pipeline, temperature, symptoms_data, response)
+            if self.aggregates is not None:
+                self.aggregates.record(response, symptoms_data, pipeline.registry.names)
+            if data.get('explain'):
+                response = {
+                    **response,
+                    'explanations': pipeline.explain(temperature, symptoms_data, response['diagnoses'])
+                }
+
+            logger.info(
+                "Diagnosis completed: %d matches, severity: %s",
+                len(response['diagnoses']), response['overall_severity']
+            )
+            await self._send(send, 200, 'application/json', pipeline.encode(response) + b'\n')
+
+        except PayloadTooLarge:
+            raise
+        except AdmissionRejected as e:
+            logger.warning("Shedding /diagnose request: %s", e)
+            await self._send(
+                send, 429, 'application/json',
+                dumps_stdlib({'error': 'Server is busy. Please retry shortly.'}) + b'\n',
+                [(b'retry-after', e.retry_after_header.encode('latin-1'))]
+            )
+        except ValueError as e:
+            logger.warning("Validation error: %s", e)
+            await self._send_json(send, {'error': str(e)}, 400)
+        except Exception as e:
+            logger.error(f"Processing error: {e}", exc_info=True)
+            await self._send_json(send, INTERNAL_ERROR, 500)
+
+    async def diagnose_batch(self, scope, receive, send):
+        """
+        Process many symptom records and stream the results as NDJSON
+
+        Accepts a JSON array or an NDJSON body, like the Flask route. Records
+        are scored in chunks of ASGI_BATCH_CHUNK_SIZE on the batch executor,
+        with at most two chunks per batch in flight so output stays in order
+        and memory stays bounded.
+        """
+        content_type = _content_type(scope)
+        if content_type in NDJSON_MIMETYPES:
+            records = self._iter_lines(receive)
+        else:
+            body = await self._read_body(receive)
+            try:
+                data = json.loads(body) if _is_json(content_type) else None
+            except ValueError:
+                data = None
+            if not isinstance(data, list):
+                await self._send_json(send, {'error': 'Request body must be a JSON array or NDJSON'}, 400)
+                return
+            records = _aiter(data)
+
+        try:
+            pipeline = await self._pipeline()
+        except Exception as e:
+            logger.error(f"Processing error: {e}", exc_info=True)
+            await self._send_json(send, INTERNAL_ERROR, 500)
+            return
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson')],
+        })
+
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+        count = 0
+
+        async def submit(chunk):
+            await self._batch_slots.acquire()
+            future = loop.run_in_executor(self.executor, score_records, pipeline, chunk)
+            future.add_done_callback(lambda _: self._batch_slots.release())
+            in_flight.append(future)
+
+        async def flush(keep: int):
+            while len(in_flight) > keep:
+                await send({'type': 'http.response.body', 'body': await in_flight.popleft(), 'more_body': True})
+
+        chunk = []
+        async for record in records:
+            chunk.append((count, record))
+            count += 1
+            if len(chunk) >= self.chunk_size:
+                await submit(chunk)
+                chunk = []
+                await flush(keep=1)
+        if chunk:
+            await submit(chunk)
+        await flush(keep=0)
+
+        await send({'type': 'http.response.body', 'body': b''})
+        logger.info("Batch diagnosis completed: %d records", count)
+
+    async def create_session(self, scope, receive, send):
+        """Open an incremental diagnosis session (see the Flask route)"""
+        if self.sessions is None:
+            await self._send_json(send, SESSION_NOT_FOUND, 404)
+            return
+        try:
+            data = await self._read_json(scope, receive)
+            pipeline = await self._pipeline()
+            temperature, symptoms_data = pipeline.validate(data)
+            session = self.sessions.create(pipeline, temperature, symptoms_data)
+            logger.info("Session %s opened", session.session_id)
+            response = {'session_id': session.session_id, 'seq': session.seq, **session.response}
+            await self._send(send, 201, 'application/json', pipeline.encode(response) + b'\n')
+
+        except PayloadTooLarge:
+            raise
+        except ValueError as e:
+            logger.warning("Validation error: %s", e)
+            await self._send_json(send, {'error': str(e)}, 400)
+        except Exception as e:
+            logger.error(f"Processing error: {e}", exc_info=True)
+            await self._send_json(send, INTERNAL_ERROR, 500)
+
+    async def session_resource(self, scope, receive, send, subpath: str):
+        """
+        GET/PATCH/DELETE /session/<id> and GET /session/<id>/events
+
+        Updates are scored on the event loop, like /diagnose: re-scoring the
+        diseases a change touches is cheaper than a thread hop.
+        """
+        method = scope['method']
+        session_id, _, tail = subpath.partition('/')
+        if tail not in ('', 'events') or (tail == 'events' and method != 'GET'):
+            await self._send_json(send, {'error': 'Not found'}, 404)
+            return
+        if method not in ('GET', 'PATCH', 'DELETE'):
+            await self._send_json(send, {'error': 'Method not allowed'}, 405)
+            return
+
+        if method == 'DELETE':
+            if self.sessions is None or not self.sessions.close(session_id):
+                await self._send_json(send, SESSION_NOT_FOUND, 404)
+                return
+            await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        session = self.sessions.get(session_id) if self.sessions is not None else None
+        if session is None:
+            await self._send_json(send, SESSION_NOT_FOUND, 404)
+        elif tail == 'events':
+            await self.session_events(scope, receive, send, session)
+        elif method == 'GET':
+            response = {'session_id': session_id, 'seq': session.seq, **session.response}
+            await self._send(send, 200, 'application/json', session.pipeline.encode(response) + b'\n')
+        else:
+            try:
+                data = await self._read_json(scope, receive)
+                if not isinstance(data, dict):
+                    raise ValueError("Invalid input data: body must be a JSON object")
+                seq = session.update(data, await self._pipeline())
+                await self._send_json(send, {'session_id': session_id, 'seq': seq}, 202)
+
+            except PayloadTooLarge:
+                raise
+            except SessionClosed:
+                await self._send_json(send, SESSION_NOT_FOUND, 404)
+            except ValueError as e:
+                logger.warning("Validation error: %s", e)
+                await self._send_json(send, {'error': str(e)}, 400)
+            except Exception as e:
+                logger.error(f"Processing error: {e}", exc_info=True)
+                await self._send_json(send, INTERNAL_ERROR, 500)
+
+    async def session_events(self, scope, receive, send, session):
+        """
+        Stream a session's diagnoses as Server-Sent Events
+
+        The session wakes the stream through loop.call_soon_threadsafe, so
+        updates made from any thread are delivered; a watcher task ends the
+        stream when the client disconnects.
+        """
+        loop = asyncio.get_running_loop()
+        updated = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(updated.set)
+
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        session.subscribe(wake)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            seen = _last_event_id(scope)
+            while True:
+                updated.clear()
+                seq, payload, closed = session.latest()
+                if seq > seen:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': format_event('diagnosis', payload, seq),
+                        'more_body': True,
+                    })
+                    seen = seq
+                if closed is not None:
+                    await send({'type': 'http.response.body', 'body': closed_event(closed)})
+                    return
+
+                waiter = asyncio.ensure_future(updated.wait())
+                done, _ = await asyncio.wait(
+                    (waiter, disconnected), timeout=self.heartbeat_interval,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                waiter.cancel()
+                if disconnected in done:
+                    return
+                if not done:
+                    # Open streams keep their session alive
+                    self.sessions.touch(session)
+                    await send({'type': 'http.response.body', 'body': SSE_HEARTBEAT, 'more_body': True})
+        finally:
+            session.unsubscribe(wake)
+            disconnected.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _last_event_id(scope) -> int:
+    """Sequence number the client already has (Last-Event-ID header or query)"""
+    value = None
+    for name, header in scope['headers']:
+        if name == b'last-event-id':
+            value = header.decode('latin-1')
+    if not value:
+        value = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('last_event_id', [None])[0]
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+
+def _header(scope, name: bytes):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _etag_matches(if_none_match, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against a quoted ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def _content_type(scope) -> str:
+    for name, value in scope['headers']:
+        if name == b'content-type':
+            return value.decode('latin-1').split(';')[0].strip().lower()
+    return ''
+
+
+def _is_json(mimetype: str) -> bool:
+    return mimetype == 'application/json' or (
+        mimetype.startswith('application/') and mimetype.endswith('+json')
+    )
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+env = os.environ.get('FLASK_ENV', 'production' if os.environ.get('VERCEL') else 'development')
+settings = load_settings(env)
+# Configure logging: a background thread writes the records
+configure_logging(settings)
+app = SymptomCheckerASGI(settings)
@@ -0,0 +1,242 @@
+"""
+Concurrency Benchmark
+=====================
+
+Compares the Flask (WSGI) and asyncio (ASGI) applications under many
+concurrent keep-alive connections. Each server is started in its own
+process, then an asyncio client holds --connections connections open and
+POSTs the synthetic /diagnose request mix on each of them as fast as the
+server answers (closed loop). The report gives throughput, p50/p99 latency
+and error counts per server.
+
+Servers:
+    flask     app:app on Werkzeug's threaded server (thread per connection)
+    prefork   serve.py: preloaded app on forked Werkzeug workers
+    gunicorn  app:app on gunicorn gthread workers (requires gunicorn)
+    asgi      asgi:app on uvicorn (requires uvicorn)
+
+The client shares the machine with the server; on small boxes pin them to
+different cores (taskset) or point --target at a server on another host.
+
+Usage:
+    python benchmarks/concurrency.py --connections 1000 --duration 15
+    python benchmarks/concurrency.py --servers asgi --connections 2000 -o asgi.json
+    python benchmarks/concurrency.py --target http://10.0.0.5:8000 --connections 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import urlsplit
+
+from hotpaths import summarize
+from synthetic import SHIPPED_DATA_DIR, generate_requests
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+SERVER_COMMANDS = {
+    'flask': [
+        sys.executable, '-c',
+        "import sys; from werkzeug.serving import run_simple; from app import app; "
+        "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)",
+        '{port}'
+    ],
+    'prefork': [
+        sys.executable, 'serve.py', '--host', '127.0.0.1', '--port', '{port}'
+    ],
+    'gunicorn': [
+        sys.executable, '-m', 'gunicorn', 'app:app', '--bind', '127.0.0.1:{port}',
+        '--worker-class', 'gthread', '--threads', '64', '--backlog', '4096', '--log-level', 'warning'
+    ],
+    'asgi': [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', '{port}',
+        '--backlog', '4096', '--log-level', 'warning', '--no-access-log'
+    ],
+}
+
+
+def raise_file_limit(connections: int):
+    """Each connection needs a descriptor in the client and one in the server"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = connections + 256
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int) -> subprocess.Popen:
+    """Start a server process in production mode and wait until it accepts connections"""
+    command = [part.format(port=port) for part in SERVER_COMMANDS[name]]
+    env = {**os.environ, 'FLASK_ENV': 'production'}
+    process = subprocess.Popen(
+        command, cwd=PROJECT_ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} server exited with code {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start on port {port}")
+
+
+async def read_response(reader: asyncio.StreamReader):
+    """Read one HTTP/1.x response; returns (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed")
+    version, status = status_line.split(b' ', 2)[:2]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if b'content-length' in headers:
+        await reader.readexactly(int(headers[b'content-length']))
+    else:
+        await reader.read()
+        return int(status), False
+
+    connection = headers.get(b'connection')
+    keep_alive = connection == b'keep-alive' if version == b'HTTP/1.0' else connection != b'close'
+    return int(status), keep_alive
+
+
+async def connection_loop(host: str, port: int, bodies: List[bytes], offset: int,
+                          measure_from: float, deadline: float, stats: Dict[str, Any]):
+    """Send requests back to back on one connection until the deadline"""
+    reader = writer = None
+    index = offset
+    header = (
+        f"POST /diagnose HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        f"Content-Type: application/json\r\nConnection: keep-alive\r\n"
+    ).encode('ascii')
+
+    while time.monotonic() < deadline:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                stats['connect_errors'] += 1
+                await asyncio.sleep(0.05)
+                continue
+
+        body = bodies[index % len(bodies)]
+        index += 1
+        start = time.perf_counter_ns()
+        try:
+            writer.write(header + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats['errors'] += 1
+            writer.close()
+            writer = None
+            continue
+
+        if time.monotonic() >= measure_from:
+            stats['latencies'].append(time.perf_counter_ns() - start)
+            if status != 200:
+                stats['non_200'] += 1
+        if not keep_alive:
+            writer.close()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(url: str, bodies: List[bytes], connections: int,
+                   duration: float, warmup: float) -> Dict[str, Any]:
+    """Hold ``connections`` connections busy for warmup + duration seconds"""
+    parts = urlsplit(url)
+    stats = {'latencies': [], 'errors': 0, 'connect_errors': 0, 'non_200': 0}
+    now = time.monotonic()
+    measure_from, deadline = now + warmup, now + warmup + duration
+
+    await asyncio.gather(*(
+        connection_loop(parts.hostname, parts.port or 80, bodies, i * 7,
+                        measure_from, deadline, stats)
+        for i in range(connections)
+    ))
+
+    latencies = stats.pop('latencies')
+    result = summarize(latencies) if latencies else {'calls': 0}
+    result['requests_per_sec'] = round(len(latencies) / duration, 1)
+    result.pop('ops_per_sec', None)
+    return {**result, **stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI throughput under high concurrency.')
+    parser.add_argument('--servers', default='flask,asgi',
+                        help=f"Comma-separated servers to start: {', '.join(SERVER_COMMANDS)} (default: flask,asgi)")
+    parser.add_argument('--target', help='Benchmark an already running server at this base URL instead')
+    parser.add_argument('--connections', type=int, default=1000, help='Concurrent connections (default: 1000)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Measured seconds (default: 10)')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds first (default: 3)')
+    parser.add_argument('--requests', type=int, default=2000, help='Distinct request bodies (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-o', '--output', type=Path, help='Write results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    raise_file_limit(args.connections)
+    with open(SHIPPED_DATA_DIR / 'diseases.json', encoding='utf-8') as f:
+        diseases = json.load(f)['diseases']
+    bodies = [json.dumps(r).encode('utf-8') for r in generate_requests(diseases, args.requests, args.seed)]
+
+    targets = [('target', args.target, None)] if args.target else []
+    results = {}
+    for name in ([] if args.target else args.servers.split(',')):
+        port = free_port()
+        targets.append((name, f"http://127.0.0.1:{port}", port))
+
+    for name, url, port in targets:
+        process = start_server(name, port) if port else None
+        try:
+            print(f"{name}: {args.connections} connections for {args.duration}s ...", file=sys.stderr)
+            results[name] = asyncio.run(run_load(url, bodies, args.connections, args.duration, args.warmup))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report = {
+        'connections': args.connections,
+        'duration': args.duration,
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+    print(f"{'server':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'non-200':>9}")
+    for name, stats in results.items():
+        print(f"{name:<10}{stats['requests_per_sec']:>10.1f}"
+              f"{stats.get('p50_us', 0) / 1000:>10.2f}{stats.get('p99_us', 0) / 1000:>10.2f}"
+              f"{stats['errors'] + stats['connect_errors']:>8}{stats['non_200']:>9}")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Hot Path Benchmark
+==================
+
+Times the diagnosis and recommendation hot paths against a synthetic
+knowledge base and request mix (see synthetic.py):
+
+- DiagnosisEngine.analyze_symptoms
+- DiagnosisEngine.assess_overall_severity
+- RecommendationEngine.generate_recommendations
+- validate_symptom_input
+- DiagnosisPipeline.encode (response serialization)
+- DiagnosisPipeline.explain (contributions and sensitivity grid)
+- DiagnosisSession.update (one-field delta to an incremental session)
+- POST /diagnose through Flask's test client
+
+Each benchmark cycles through the request mix for at least --min-time
+seconds, timing every call. Results are reported as ops/s and p50/p99
+latency, can be saved as JSON and compared against a saved baseline.
+Everything runs offline, in-process, with the result cache disabled.
+
+Usage:
+    python benchmarks/hotpaths.py
+    python benchmarks/hotpaths.py --diseases 5000 --symptoms 80 -o results.json
+    python benchmarks/hotpaths.py --baseline results.json --tolerance 0.15
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from synthetic import generate_requests, write_knowledge_base
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples_ns: List[int]) -> Dict[str, Any]:
+    """ops/s and latency percentiles (microseconds) of per-call timings"""
+    samples = sorted(samples_ns)
+    total = sum(samples)
+    return {
+        'calls': len(samples),
+        'ops_per_sec': round(len(samples) / (total / 1e9), 1) if total else 0.0,
+        'mean_us': round(total / len(samples) / 1000, 2),
+        'p50_us': round(percentile(samples, 0.50) / 1000, 2),
+        'p99_us': round(percentile(samples, 0.99) / 1000, 2),
+    }
+
+
+def measure(call: Callable[[Any], Any], inputs: List[Any], min_time: float) -> Dict[str, Any]:
+    """
+    Call ``call`` on each input in turn until min_time seconds have elapsed
+
+    One untimed pass over the inputs warms caches and memoized plans first.
+    """
+    for item in inputs:
+        call(item)
+
+    perf_counter_ns = time.perf_counter_ns
+    samples = []
+    deadline = perf_counter_ns() + int(min_time * 1e9)
+    while True:
+        for item in inputs:
+            start = perf_counter_ns()
+            call(item)
+            samples.append(perf_counter_ns() - start)
+        if perf_counter_ns() >= deadline:
+            return summarize(samples)
+
+
+def load_app(data_dir: Path, vectorized: bool):
+    """Import the Flask app against a knowledge base directory"""
+    os.environ['SYMPTOM_CHECKER_DATA_DIR'] = str(data_dir)
+    # Testing config: no result cache, no reload watcher
+    os.environ['FLASK_ENV'] = 'testing'
+
+    project_root = str(Path(__file__).resolve().parent.parent)
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+    import app as app_module
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Serialize like production; debug mode pretty-prints through jsonify
+    app_module.app.debug = False
+    if not vectorized:
+        app_module.app.config['USE_VECTORIZED_ENGINE'] = False
+        app_module.knowledge_base.load()
+    return app_module
+
+
+def run_benchmarks(app_module, requests: List[Dict[str, Any]], min_time: float) -> Dict[str, Any]:
+    """Time every hot path over the request mix"""
+    pipeline = app_module.knowledge_base.get().pipeline
+    diagnosis_engine = pipeline.diagnosis_engine
+    recommendation_engine = pipeline.recommendation_engine
+
+    validated = [pipeline.validate(request) for request in requests]
+    scored = [
+        (
+            diagnosis_engine.analyze_symptoms(
+                symptoms, temperature,
+                min_confidence=pipeline.min_confidence, limit=pipeline.max_results
+            ),
+            symptoms,
+            temperature
+        )
+        for temperature, symptoms in validated
+    ]
+    client = app_module.app.test_client()
+
+    # One session per request of the mix, each updated with one-field deltas
+    rng = random.Random(0)
+    symptom_names = pipeline.registry.names
+    sessions = [
+        app_module.SessionStore(len(validated), float('inf')).create(pipeline, temperature, symptoms)
+        for temperature, symptoms in validated[:100]
+    ]
+    deltas = [
+        (session, {rng.choice(symptom_names): rng.randint(0, 10)})
+        for session in sessions for _ in range(20)
+    ]
+
+    def diagnose_http(request):
+        response = client.post('/diagnose', json=request)
+        if response.status_code != 200:
+            raise RuntimeError(f"/diagnose returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    return {
+        'analyze_symptoms': measure(
+            lambda item: diagnosis_engine.analyze_symptoms(
+                item[1], item[0], min_confidence=pipeline.min_confidence, limit=pipeline.max_results
+            ),
+            validated, min_time
+        ),
+        'assess_overall_severity': measure(
+            lambda item: diagnosis_engine.assess_overall_severity(*item), scored, min_time
+        ),
+        'generate_recommendations': measure(
+            lambda item: recommendation_engine.generate_recommendations(*item), scored, min_time
+        ),
+        'validate_symptom_input': measure(app_module.validate_symptom_input, requests, min_time),
+        'encode_response': measure(
+            pipeline.encode,
+            [pipeline.run(temperature, symptoms) for temperature, symptoms in validated],
+            min_time
+        ),
+        'explain': measure(
+            lambda item: pipeline.explain(item[2], item[1], item[0]), scored, min_time
+        ),
+        'session_update': measure(lambda item: item[0].update(item[1], pipeline), deltas, min_time),
+        'diagnose_http': measure(diagnose_http, requests, min_time),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return benchmarks whose throughput dropped by more than tolerance"""
+    regressions = []
+    for name, stats in results['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if before and stats['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+            change = (stats['ops_per_sec'] / before['ops_per_sec'] - 1) * 100
+            regressions.append(
+                f"{name}: {before['ops_per_sec']} -> {stats['ops_per_sec']} ops/s ({change:+.1f}%)"
+            )
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Dict[str, Any] = None):
+    print(f"{'benchmark':<26}{'ops/s':>12}{'p50 us':>11}{'p99 us':>11}{'vs base':>10}")
+    for name, stats in results['benchmarks'].items():
+        before = (baseline or {}).get('benchmarks', {}).get(name)
+        delta = f"{(stats['ops_per_sec'] / before['ops_per_sec'] - 1) * 100:+.1f}%" if before else ''
+        print(f"{name:<26}{stats['ops_per_sec']:>12.1f}{stats['p50_us']:>11.2f}"
+              f"{stats['p99_us']:>11.2f}{delta:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the diagnosis and recommendation hot paths.')
+    parser.add_argument('--diseases', type=int, default=1000, help='Synthetic diseases (default: 1000)')
+    parser.add_argument('--symptoms', type=int, default=22, help='Synthetic symptoms (default: 22)')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests in the mix (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--data-dir', type=Path,
+                        help='Benchmark an existing knowledge base instead of a synthetic one')
+    parser.add_argument('--engine', choices=('auto', 'python'), default='auto',
+                        help="'auto' uses the NumPy engine when available (default: auto)")
+    parser.add_argument('--min-time', type=float, default=2.0,
+                        help='Minimum seconds per benchmark (default: 2.0)')
+    parser.add_argument('-o', '--output', type=Path, help='Write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, help='Compare against a previously saved result file')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed throughput drop vs baseline before failing (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='msc-bench-') as temp_dir:
+        data_dir = args.data_dir or write_knowledge_base(
+            Path(temp_dir), args.diseases, args.symptoms, args.seed
+        )
+        with open(data_dir / 'diseases.json', encoding='utf-8') as f:
+            diseases = json.load(f)['diseases']
+        requests = generate_requests(diseases, args.requests, args.seed)
+
+        app_module = load_app(data_dir, vectorized=args.engine == 'auto')
+        engine = type(app_module.knowledge_base.get().diagnosis_engine).__name__
+        benchmarks = run_benchmarks(app_module, requests, args.min_time)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': engine,
+        },
+        'workload': {
+            'data_dir': str(args.data_dir) if args.data_dir else None,
+            'diseases': len(diseases),
+            'symptoms': len({s for info in diseases.values() for s in info['symptoms']}),
+            'requests': args.requests,
+            'seed': args.seed,
+        },
+        'benchmarks': benchmarks,
+    }
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline else None
+    if baseline and baseline.get('workload') != results['workload']:
+        print("warning: baseline was recorded with a different workload", file=sys.stderr)
+
+    print_table(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""
+Load Test
+=========
+
+Measures the capacity of a /diagnose deployment: drives a configurable mix
+of realistic symptom payloads (see synthetic.py; the ``critical`` profile
+exercises the critical-symptom early return of generate_recommendations)
+against a server started locally or at a given URL, and reports throughput,
+latency percentiles (p50/p90/p99/p99.9) and error rates, overall and per
+request profile.
+
+Two ways to apply load:
+
+- ``--rate R`` (open loop): requests are scheduled at a fixed arrival rate,
+  whether or not earlier ones have finished, and each latency is measured
+  from the request's *scheduled* start. A server stall therefore shows up in
+  every request that should have been sent during it, instead of silently
+  delaying (and omitting) them: the numbers are free of coordinated
+  omission. ``--connections`` caps the connections in flight; requests
+  beyond that queue in the client and the wait counts as latency.
+- ``--concurrency N`` (closed loop): N connections each send the next
+  request as soon as the previous one is answered. Latencies are
+  additionally reported corrected for coordinated omission the way
+  HdrHistogram does it: a response slower than the expected interval is
+  back-filled with the samples the stalled connection would have produced
+  (``--expected-interval-ms``, default: the run's median latency).
+
+The client runs on one asyncio loop; when it cannot keep up with --rate the
+report says so (schedule_lag_ms). On small machines run it on a different
+core or host than the server.
+
+Usage:
+    python benchmarks/loadtest.py --rate 500 --duration 30
+    python benchmarks/loadtest.py --concurrency 64 --server asgi -o run.json
+    python benchmarks/loadtest.py --target http://10.0.0.5:8000 --rate 2000 --mix critical=1
+    python benchmarks/loadtest.py --rate 500 --baseline run.json --tolerance 0.10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from concurrency import SERVER_COMMANDS, free_port, raise_file_limit, read_response, start_server
+from hotpaths import percentile
+from synthetic import REQUEST_PROFILES, SHIPPED_DATA_DIR, generate_requests
+
+# Percentiles reported for every latency distribution
+PERCENTILES = (('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('p99_9', 0.999))
+
+
+class ConnectionPool:
+    """Keep-alive connections to one server, at most ``limit`` in use at once"""
+
+    def __init__(self, host: str, port: int, limit: int):
+        self.host = host
+        self.port = port
+        self._slots = asyncio.Semaphore(limit)
+        self._idle = []
+        self._header = (
+            f"POST /diagnose HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            f"Content-Type: application/json\r\nConnection: keep-alive\r\n"
+        ).encode('ascii')
+
+    async def post(self, body: bytes, on_send=None) -> int:
+        """
+        POST one /diagnose body
+
+        Args:
+            body: Request body
+            on_send: Called right before the request is written (after any
+                     wait for a free connection)
+
+        Returns:
+            HTTP status code; raises OSError and friends on connection errors
+        """
+        async with self._slots:
+            if self._idle:
+                reader, writer = self._idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            if on_send is not None:
+                on_send()
+            try:
+                writer.write(self._header + f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+                status, keep_alive = await read_response(reader)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.append((reader, writer))
+            else:
+                writer.close()
+            return status
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class Recorder:
+    """Latencies and outcomes of the measured requests, per profile"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.service_times = {}
+        self.outcomes = {}
+
+    def record(self, profile: str, outcome: str, latency_ns: int = 0, service_ns: int = 0):
+        self.outcomes.setdefault(profile, Counter())[outcome] += 1
+        if outcome.startswith('status_'):
+            self.latencies.setdefault(profile, []).append(latency_ns)
+            self.service_times.setdefault(profile, []).append(service_ns)
+
+
+async def _send(pool: ConnectionPool, recorder: Recorder, profile: str, body: bytes,
+                scheduled_ns: int, measured: bool, timeout: float):
+    """Send one request; latency counts from scheduled_ns, service time from the write"""
+    sent = [scheduled_ns]
+
+    def on_send():
+        sent[0] = time.perf_counter_ns()
+
+    try:
+        status = await asyncio.wait_for(pool.post(body, on_send), timeout)
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+        outcome = 'connection_error'
+    else:
+        outcome = f"status_{status}"
+    if measured:
+        now = time.perf_counter_ns()
+        recorder.record(profile, outcome, now - scheduled_ns, now - sent[0])
+
+
+async def open_loop(url: str, items: List[Tuple[str, bytes]], rate: float, duration: float,
+                    warmup: float, connections: int, timeout: float, poisson: bool,
+                    seed: int) -> Dict[str, Any]:
+    """Send requests at a fixed arrival rate for warmup + duration seconds"""
+    parts = urlsplit(url)
+    pool = ConnectionPool(parts.hostname, parts.port or 80, connections)
+    recorder = Recorder()
+    rng = random.Random(seed)
+    pending = set()
+
+    start = time.perf_counter_ns()
+    measure_from = start + int(warmup * 1e9)
+    end = measure_from + int(duration * 1e9)
+    interval_ns = 1e9 / rate
+    scheduled = float(start)
+    index = 0
+    max_lag_ns = 0
+
+    while scheduled < end:
+        delay = (scheduled - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Behind schedule: keep sending, but let responses be processed
+            max_lag_ns = max(max_lag_ns, -delay * 1e9)
+            await asyncio.sleep(0)
+        profile, body = items[index % len(items)]
+        index += 1
+        task = asyncio.create_task(_send(
+            pool, recorder, profile, body, int(scheduled), scheduled >= measure_from, timeout
+        ))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        scheduled += rng.expovariate(1.0) * interval_ns if poisson else interval_ns
+
+    if pending:
+        await asyncio.wait(pending)
+    pool.close()
+    return {'recorder': recorder, 'schedule_lag_ms': round(max_lag_ns / 1e6, 3)}
+
+
+async def closed_loop(url: str, items: List[Tuple[str, bytes]], concurrency: int, duration: float,
+                      warmup: float, timeout: float) -> Dict[str, Any]:
+    """Keep ``concurrency`` requests in flight for warmup + duration seconds"""
+    parts = urlsplit(url)
+    pool = ConnectionPool(parts.hostname, parts.port or 80, concurrency)
+    recorder = Recorder()
+
+    start = time.perf_counter_ns()
+    measure_from = start + int(warmup * 1e9)
+    end = measure_from + int(duration * 1e9)
+
+    async def worker(offset: int):
+        index = offset
+        while True:
+            now = time.perf_counter_ns()
+            if now >= end:
+                return
+            profile, body = items[index % len(items)]
+            index += 1
+            await _send(pool, recorder, profile, body, now, now >= measure_from, timeout)
+
+    await asyncio.gather(*(worker(i * 7) for i in range(concurrency)))
+    pool.close()
+    return {'recorder': recorder}
+
+
+def backfill(latencies_ns: List[int], interval_ns: float) -> List[int]:
+    """
+    Coordinated omission correction for closed-loop samples
+
+    Like HdrHistogram's recordValueWithExpectedInterval: a latency L longer
+    than the expected interval I adds the samples L - I, L - 2I, ... down
+    to I, the latencies of the requests that would have been sent meanwhile.
+    """
+    corrected = list(latencies_ns)
+    if interval_ns <= 0:
+        return corrected
+    for latency in latencies_ns:
+        missing = latency - interval_ns
+        while missing >= interval_ns:
+            corrected.append(int(missing))
+            missing -= interval_ns
+    return corrected
+
+
+def latency_summary(samples_ns: List[int]) -> Dict[str, float]:
+    """Mean, percentiles and max in milliseconds"""
+    if not samples_ns:
+        return {}
+    samples = sorted(samples_ns)
+    summary = {'mean': round(sum(samples) / len(samples) / 1e6, 3)}
+    for name, fraction in PERCENTILES:
+        summary[name] = round(percentile(samples, fraction) / 1e6, 3)
+    summary['max'] = round(samples[-1] / 1e6, 3)
+    return summary
+
+
+def summarize_group(outcomes: Counter, latencies: List[int], service_times: List[int],
+                    duration: float, expected_interval_ns: Optional[float]) -> Dict[str, Any]:
+    """Throughput, error rates and latency distributions of one group of requests"""
+    total = sum(outcomes.values())
+    statuses = {int(key[len('status_'):]): count for key, count in outcomes.items() if key.startswith('status_')}
+    ok = sum(count for status, count in statuses.items() if 200 <= status < 300)
+    errors = {
+        'timeout': outcomes.get('timeout', 0),
+        'connection': outcomes.get('connection_error', 0),
+        'http': total - ok - outcomes.get('timeout', 0) - outcomes.get('connection_error', 0),
+    }
+    summary = {
+        'requests': total,
+        'throughput_rps': round(ok / duration, 1),
+        'error_rate': round((total - ok) / total, 6) if total else 0.0,
+        'errors': errors,
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'latency_ms': latency_summary(latencies),
+    }
+    if expected_interval_ns is None:
+        # Open loop: latency_ms counts from the scheduled start; this is the
+        # time from the actual write, i.e. what a naive client would report
+        summary['service_time_ms'] = latency_summary(service_times)
+    else:
+        summary['latency_ms_uncorrected'] = summary['latency_ms']
+        summary['latency_ms'] = latency_summary(backfill(latencies, expected_interval_ns))
+    return summary
+
+
+def build_items(diseases: Dict[str, Any], mix: List[Tuple[str, float]], count: int,
+                seed: int) -> List[Tuple[str, bytes]]:
+    """Request bodies tagged with their profile, drawn in the given proportions"""
+    rng = random.Random(seed)
+    pools = {}
+    for offset, (profile, _) in enumerate(mix):
+        pools[profile] = [
+            json.dumps(payload).encode('utf-8')
+            for payload in generate_requests(diseases, max(1, count // len(mix)), seed + offset, ((profile, 1.0),))
+        ]
+    profiles, weights = zip(*mix)
+    items = []
+    for _ in range(count):
+        profile = rng.choices(profiles, weights)[0]
+        items.append((profile, rng.choice(pools[profile])))
+    return items
+
+
+def parse_mix(value: str) -> List[Tuple[str, float]]:
+    """'critical=0.2,disease=0.8' -> [('critical', 0.2), ('disease', 0.8)]"""
+    known = dict(REQUEST_PROFILES)
+    mix = []
+    for part in value.split(','):
+        name, _, share = part.partition('=')
+        name = name.strip()
+        if name not in known:
+            raise argparse.ArgumentTypeError(f"unknown profile '{name}' (known: {', '.join(known)})")
+        try:
+            weight = float(share) if share else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid share for '{name}': {share}")
+        if weight > 0:
+            mix.append((name, weight))
+    if not mix:
+        raise argparse.ArgumentTypeError('the mix is empty')
+    return mix
+
+
+def run(args, url: str, items: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    if args.rate:
+        outcome = asyncio.run(open_loop(
+            url, items, args.rate, args.duration, args.warmup, args.connections,
+            args.timeout, args.poisson, args.seed
+        ))
+    else:
+        outcome = asyncio.run(closed_loop(
+            url, items, args.concurrency, args.duration, args.warmup, args.timeout
+        ))
+    recorder = outcome.pop('recorder')
+
+    expected_interval_ns = None
+    if not args.rate:
+        all_latencies = sorted(latency for samples in recorder.latencies.values() for latency in samples)
+        if args.expected_interval_ms:
+            expected_interval_ns = args.expected_interval_ms * 1e6
+        else:
+            expected_interval_ns = percentile(all_latencies, 0.5) if all_latencies else 0.0
+        outcome['expected_interval_ms'] = round(expected_interval_ns / 1e6, 3)
+
+    overall = summarize_group(
+        sum(recorder.outcomes.values(), Counter()),
+        [latency for samples in recorder.latencies.values() for latency in samples],
+        [sample for samples in recorder.service_times.values() for sample in samples],
+        args.duration, expected_interval_ns
+    )
+    by_profile = {
+        profile: summarize_group(
+            recorder.outcomes[profile], recorder.latencies.get(profile, []),
+            recorder.service_times.get(profile, []), args.duration, expected_interval_ns
+        )
+        for profile in sorted(recorder.outcomes)
+    }
+    return {**outcome, 'overall': overall, 'by_profile': by_profile}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return regressions: throughput down or p99 up by more than tolerance"""
+    regressions = []
+    now, before = results['results']['overall'], baseline.get('results', {}).get('overall')
+    if not before:
+        return regressions
+    if now['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+        regressions.append(f"throughput: {before['throughput_rps']} -> {now['throughput_rps']} req/s")
+    p99, p99_before = now['latency_ms'].get('p99'), before['latency_ms'].get('p99')
+    if p99 is not None and p99_before and p99 > p99_before * (1 + tolerance):
+        regressions.append(f"p99 latency: {p99_before} -> {p99} ms")
+    if now['error_rate'] > before['error_rate'] + tolerance / 100:
+        regressions.append(f"error rate: {before['error_rate']} -> {now['error_rate']}")
+    return regressions
+
+
+def print_table(results: Dict[str, Any]):
+    groups = {'all': results['results']['overall'], **results['results']['by_profile']}
+    print(f"{'profile':<10}{'requests':>10}{'req/s':>10}{'errors':>9}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}{'max ms':>9}")
+    for name, stats in groups.items():
+        latency = stats['latency_ms']
+        print(f"{name:<10}{stats['requests']:>10}{stats['throughput_rps']:>10.1f}"
+              f"{stats['error_rate'] * 100:>8.2f}%"
+              f"{latency.get('p50', 0):>9.2f}{latency.get('p90', 0):>9.2f}{latency.get('p99', 0):>9.2f}"
+              f"{latency.get('p99_9', 0):>10.2f}{latency.get('max', 0):>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test /diagnose and report latency percentiles.')
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument('--rate', type=float, help='Open loop: requests per second')
+    load.add_argument('--concurrency', type=int, help='Closed loop: requests in flight')
+    parser.add_argument('--target', help='Base URL of a running server (default: start one locally)')
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS), default='prefork',
+                        help='Server to start locally when no --target is given (default: prefork)')
+    parser.add_argument('--data-dir', type=Path,
+                        help="Knowledge base to draw payloads from (and to serve, for a local server)")
+    parser.add_argument('--mix', type=parse_mix, default=list(REQUEST_PROFILES),
+                        help='Request profiles and shares, e.g. critical=0.2,disease=0.8 '
+                             f"(default: {','.join(f'{name}={share}' for name, share in REQUEST_PROFILES)})")
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds (default: 30)')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Unmeasured seconds first (default: 5)')
+    parser.add_argument('--connections', type=int, default=256,
+                        help='Open loop: maximum connections in flight (default: 256)')
+    parser.add_argument('--poisson', action='store_true',
+                        help='Open loop: exponentially distributed gaps instead of a constant interval')
+    parser.add_argument('--expected-interval-ms', type=float,
+                        help='Closed loop: interval for the coordinated omission correction '
+                             '(default: median latency)')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a request fails (default: 10)')
+    parser.add_argument('--requests', type=int, default=5000, help='Distinct request bodies (default: 5000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('-o', '--output', type=Path, help='Write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, help='Compare against a previously saved result file')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed throughput drop / p99 increase vs baseline (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    raise_file_limit(args.connections if args.rate else args.concurrency)
+    data_dir = args.data_dir or SHIPPED_DATA_DIR
+    with open(data_dir / 'diseases.json', encoding='utf-8') as f:
+        diseases = json.load(f)['diseases']
+    items = build_items(diseases, args.mix, args.requests, args.seed)
+
+    process = None
+    url = args.target
+    if url is None:
+        if args.data_dir:
+            os.environ['SYMPTOM_CHECKER_DATA_DIR'] = str(args.data_dir.resolve())
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        process = start_server(args.server, port)
+    try:
+        mode = f"{args.rate} req/s" if args.rate else f"{args.concurrency} in flight"
+        print(f"Load testing {url} at {mode} for {args.duration}s ...", file=sys.stderr)
+        outcome = run(args, url, items)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'workload': {
+            'target': args.target,
+            'server': None if args.target else args.server,
+            'data_dir': str(args.data_dir) if args.data_dir else None,
+            'mode': 'open' if args.rate else 'closed',
+            'rate': args.rate,
+            'concurrency': args.concurrency,
+            'connections': args.connections if args.rate else args.concurrency,
+            'poisson': args.poisson,
+            'mix': dict(args.mix),
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'requests': args.requests,
+            'seed': args.seed,
+        },
+        'results': outcome,
+    }
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline else None
+    if baseline and baseline.get('workload') != results['workload']:
+        print("warning: baseline was recorded with a different workload", file=sys.stderr)
+
+    print_table(results)
+    if outcome.get('schedule_lag_ms', 0) > 100:
+        print(f"warning: the client fell up to {outcome['schedule_lag_ms']} ms behind schedule; "
+              f"latencies include client delay", file=sys.stderr)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Cold-Start Benchmark
+====================
+
+Measures the serverless cold-start path of api/index.py in fresh interpreter
+processes, so that import-time and startup regressions are visible:
+
+- ``python -X importtime`` output for ``import api.index``, parsed into the
+  total import time and the slowest modules (self and cumulative time)
+- wall-clock time to import the app, to serve the first /diagnose request
+  and the end-to-end process lifetime, as medians over several runs
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --output startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+# Timed in a fresh interpreter; prints a JSON line of stage timings
+COLD_START_PROBE = """
+import json, time
+start = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+response = app.test_client().post('/diagnose', json={'fever': 7, 'cough': 6, 'temperature': 38.4})
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (served - imported) * 1000}))
+"""
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env['VERCEL'] = '1'
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse ``-X importtime`` output
+
+    Returns:
+        List of dicts with module, depth, self_us and cumulative_us
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append({
+                'module': module,
+                'depth': (len(indent) - 1) // 2,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+            })
+    return modules
+
+
+def import_profile(top: int) -> dict:
+    """Profile ``import api.index`` with -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import api.index'],
+        cwd=PROJECT_ROOT, env=_environment(), capture_output=True, text=True, check=True
+    )
+    modules = parse_importtime(result.stderr)
+    top_level = [m for m in modules if m['depth'] == 0]
+
+    return {
+        'total_import_ms': round(sum(m['cumulative_us'] for m in top_level) / 1000, 2),
+        'module_count': len(modules),
+        'slowest_self': [
+            {'module': m['module'], 'ms': round(m['self_us'] / 1000, 2)}
+            for m in sorted(modules, key=lambda m: m['self_us'], reverse=True)[:top]
+        ],
+        'slowest_top_level': [
+            {'module': m['module'], 'ms': round(m['cumulative_us'] / 1000, 2)}
+            for m in sorted(top_level, key=lambda m: m['cumulative_us'], reverse=True)[:top]
+        ],
+    }
+
+
+def cold_starts(runs: int) -> dict:
+    """Time import and first request in fresh processes"""
+    samples = {'import_ms': [], 'first_request_ms': [], 'process_ms': []}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', COLD_START_PROBE],
+            cwd=PROJECT_ROOT, env=_environment(), capture_output=True, text=True, check=True
+        )
+        samples['process_ms'].append((time.perf_counter() - start) * 1000)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        samples['import_ms'].append(timings['import_ms'])
+        samples['first_request_ms'].append(timings['first_request_ms'])
+
+    return {
+        name: {
+            'median': round(statistics.median(values), 2),
+            'min': round(min(values), 2),
+            'max': round(max(values), 2),
+        }
+        for name, values in samples.items()
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Return human-readable regressions beyond tolerance (e.g. 0.1 = 10%)"""
+    regressions = []
+    for name, stats in report['cold_start'].items():
+        before = baseline.get('cold_start', {}).get(name, {}).get('median')
+        if before and stats['median'] > before * (1 + tolerance):
+            regressions.append(f"{name}: {before} ms -> {stats['median']} ms")
+    before = baseline.get('imports', {}).get('total_import_ms')
+    after = report['imports']['total_import_ms']
+    if before and after > before * (1 + tolerance):
+        regressions.append(f"total_import_ms: {before} ms -> {after} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the serverless cold-start path.')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh processes to time (default: 10)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest modules to list (default: 15)')
+    parser.add_argument('-o', '--output', type=Path, help='Write the JSON report to this file')
+    parser.add_argument('--baseline', type=Path, help='Compare against a previously saved report')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='Allowed slowdown vs baseline before failing (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    report = {
+        'python': sys.version.split()[0],
+        'imports': import_profile(args.top),
+        'cold_start': cold_starts(args.runs),
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding='utf-8')), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Synthetic Workload Generator
+============================
+
+Deterministic (seeded) generators for benchmark inputs:
+
+- a knowledge base scaled to N diseases over M symptoms, written in the same
+  layout as data/diseases.json and data/recommendations.json
+- a request mix that resembles real traffic: mostly mild and typical
+  presentations, some disease-shaped ones, a share of critical cases
+
+The real diseases and symptoms come first, so small synthetic knowledge bases
+behave like the shipped one and large ones extend it.
+
+Usage:
+    python benchmarks/synthetic.py -o /tmp/kb --diseases 2000 --symptoms 60
+    python benchmarks/synthetic.py -o /tmp/kb --requests 5000
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+SHIPPED_DATA_DIR = PROJECT_ROOT / 'data'
+
+SEVERITIES = ('low', 'medium', 'high')
+URGENCIES = ('normal', 'warning', 'urgent')
+
+# Share of each request profile in the generated mix
+REQUEST_PROFILES = (
+    ('healthy', 0.10),
+    ('mild', 0.30),
+    ('disease', 0.40),
+    ('noisy', 0.10),
+    ('critical', 0.10),
+)
+
+
+def _load_shipped() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    with open(SHIPPED_DATA_DIR / 'diseases.json', encoding='utf-8') as f:
+        diseases = json.load(f)
+    with open(SHIPPED_DATA_DIR / 'recommendations.json', encoding='utf-8') as f:
+        recommendations = json.load(f)
+    return diseases, recommendations
+
+
+def shipped_symptoms() -> List[str]:
+    """Symptom schema declared in the shipped diseases.json"""
+    return _load_shipped()[0]['symptoms']
+
+
+def symptom_names(count: int) -> List[str]:
+    """The shipped symptom fields followed by synthetic ones, count in total"""
+    names = shipped_symptoms()[:count]
+    names.extend(f"symptom_{i:03d}" for i in range(len(names) + 1, count + 1))
+    return names
+
+
+def generate_knowledge_base(
+    disease_count: int,
+    symptom_count: int,
+    seed: int = 0
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Build a synthetic knowledge base
+
+    Args:
+        disease_count: Number of diseases (N)
+        symptom_count: Number of distinct symptoms (M)
+        seed: Random seed
+
+    Returns:
+        Tuple of (diseases.json content, recommendations.json content)
+    """
+    rng = random.Random(seed)
+    shipped, recommendations = _load_shipped()
+    symptoms = symptom_names(symptom_count)
+    known = set(symptoms)
+
+    diseases = {}
+    for name, info in shipped['diseases'].items():
+        if len(diseases) >= disease_count:
+            break
+        if set(info['symptoms']) <= known:
+            diseases[name] = info
+
+    disease_specific = dict(recommendations.get('disease_specific', {}))
+    while len(diseases) < disease_count:
+        name = f"Synthetic Disease {len(diseases) + 1:05d}"
+        symptom_total = rng.randint(min(4, symptom_count), min(10, symptom_count))
+        low = round(rng.uniform(36.0, 38.5), 1)
+        diseases[name] = {
+            'symptoms': {
+                symptom: round(rng.uniform(0.3, 0.95), 2)
+                for symptom in rng.sample(symptoms, symptom_total)
+            },
+            'temp_range': [low, round(low + rng.uniform(1.0, 2.5), 1)],
+            'severity': rng.choice(SEVERITIES),
+            'urgency': rng.choice(URGENCIES),
+            'description': f"{name} (synthetic)",
+            'incubation': f"{rng.randint(1, 5)}-{rng.randint(6, 14)} days",
+        }
+        if rng.random() < 0.3:
+            disease_specific[name] = {'medical': [f"Specific test recommended for {name}"]}
+
+    recommendations = {**recommendations, 'disease_specific': disease_specific}
+    return {'symptoms': symptoms, 'diseases': diseases}, recommendations
+
+
+def write_knowledge_base(
+    output_dir: Path,
+    disease_count: int,
+    symptom_count: int,
+    seed: int = 0
+) -> Path:
+    """Generate a knowledge base and write its JSON files to output_dir"""
+    diseases, recommendations = generate_knowledge_base(disease_count, symptom_count, seed)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for filename, content in (('diseases.json', diseases), ('recommendations.json', recommendations)):
+        with open(output_dir / filename, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=2)
+    return output_dir
+
+
+def generate_requests(
+    diseases: Dict[str, Any],
+    count: int,
+    seed: int = 0,
+    profiles: Sequence[Tuple[str, float]] = REQUEST_PROFILES
+) -> List[Dict[str, Any]]:
+    """
+    Build a request mix shaped like /diagnose traffic
+
+    Every request carries all symptom fields, as the web form does, with the
+    temperature entered to one decimal.
+
+    Args:
+        diseases: Disease table (the 'diseases' object of diseases.json)
+        count: Number of requests
+        seed: Random seed
+        profiles: (profile, share) pairs, see REQUEST_PROFILES
+
+    Returns:
+        List of request payloads
+    """
+    rng = random.Random(seed)
+    symptoms = sorted({s for info in diseases.values() for s in info['symptoms']} | set(shipped_symptoms()))
+    disease_table = list(diseases.values())
+    profiles, weights = zip(*profiles)
+
+    requests = []
+    for _ in range(count):
+        profile = rng.choices(profiles, weights)[0]
+        severities = dict.fromkeys(symptoms, 0)
+
+        if profile == 'healthy':
+            for symptom in rng.sample(symptoms, rng.randint(0, 1)):
+                severities[symptom] = rng.randint(1, 3)
+            temperature = rng.uniform(36.3, 37.0)
+        elif profile == 'mild':
+            for symptom in rng.sample(symptoms, rng.randint(2, 4)):
+                severities[symptom] = rng.randint(2, 6)
+            temperature = rng.uniform(36.5, 37.8)
+        elif profile == 'disease':
+            info = rng.choice(disease_table)
+            for symptom in info['symptoms']:
+                if rng.random() < 0.8:
+                    severities[symptom] = rng.randint(4, 9)
+            low, high = info['temp_range']
+            temperature = rng.uniform(low, high)
+        elif profile == 'noisy':
+            for symptom in rng.sample(symptoms, rng.randint(5, 10)):
+                severities[symptom] = rng.randint(0, 10)
+            temperature = rng.uniform(35.5, 40.0)
+        else:
+            for symptom in rng.sample(symptoms, rng.randint(2, 5)):
+                severities[symptom] = rng.randint(3, 8)
+            critical = rng.choice(('difficulty_breathing', 'chest_pain', 'fever'))
+            if critical == 'fever':
+                temperature = rng.uniform(40.0, 42.0)
+            else:
+                severities[critical] = rng.randint(7, 10)
+                temperature = rng.uniform(37.0, 39.5)
+
+        requests.append({'temperature': round(temperature, 1), **severities})
+    return requests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic knowledge base and request mix.')
+    parser.add_argument('-o', '--output', type=Path, required=True, help='Output directory')
+    parser.add_argument('--diseases', type=int, default=1000, help='Number of diseases (default: 1000)')
+    default_symptoms = len(shipped_symptoms())
+    parser.add_argument('--symptoms', type=int, default=default_symptoms,
+                        help=f'Number of symptoms (default: {default_symptoms})')
+    parser.add_argument('--requests', type=int, default=0,
+                        help='Also write this many requests to requests.jsonl')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args(argv)
+
+    write_knowledge_base(args.output, args.diseases, args.symptoms, args.seed)
+    if args.requests:
+        with open(args.output / 'diseases.json', encoding='utf-8') as f:
+            diseases = json.load(f)['diseases']
+        with open(args.output / 'requests.jsonl', 'w', encoding='utf-8') as f:
+            for request in generate_requests(diseases, args.requests, args.seed):
+                f.write(json.dumps(request) + '\n')
+
+    print(f"Wrote {args.diseases} diseases over {args.symptoms} symptoms to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
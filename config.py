@@ -15,13 +15,24 @@ if os.environ.get('VERCEL'):
 else:
     BASE_DIR = Path(__file__).resolve().parent
 
-# Data directory
-DATA_DIR = BASE_DIR / 'data'
+# Data directory (SYMPTOM_CHECKER_DATA_DIR points the app at another knowledge base,
+# e.g. a synthetic one generated by the benchmarks)
+DATA_DIR = Path(os.environ.get('SYMPTOM_CHECKER_DATA_DIR') or BASE_DIR / 'data')
 
 # JSON file paths
 DISEASES_JSON = DATA_DIR / 'diseases.json'
 RECOMMENDATIONS_JSON = DATA_DIR / 'recommendations.json'
 
+# Precompiled binary knowledge base (built by scripts/build_kb.py)
+KB_ARTIFACT = DATA_DIR / 'knowledge_base.bin'
+
+# Local state written at runtime (diagnosis history database)
+INSTANCE_DIR = BASE_DIR / 'instance'
+
+# Static files and their precompressed, fingerprinted copies (built by scripts/build_assets.py)
+STATIC_DIR = BASE_DIR / 'static'
+ASSETS_BUILD_DIR = STATIC_DIR / 'dist'
+
 # Flask configuration
 class Config:
     """Base configuration"""
@@ -36,6 +47,99 @@ class Config:
     # Diagnosis settings
     MIN_CONFIDENCE_THRESHOLD = 20  # Minimum confidence to include disease
     MAX_RESULTS = 5  # Maximum number of diagnoses to return
+    USE_VECTORIZED_ENGINE = True  # Use the NumPy scoring engine when available
+
+    # Result cache settings
+    RESULT_CACHE_SIZE = 4096  # Maximum cached symptom profiles (0 disables the cache)
+    RESULT_CACHE_TTL = None  # Seconds before a cached result expires (None = never)
+    RESULT_CACHE_TEMPERATURE_PRECISION = 1  # Decimals the temperature is entered with
+
+    # Identical /diagnose records arriving concurrently (e.g. live slider
+    # updates from many clients) share one computation
+    DIAGNOSE_SINGLE_FLIGHT = True
+
+    # Admission control for /diagnose: excess requests get a 429 with
+    # Retry-After instead of queueing. Records that trip a critical rule of
+    # recommendations.json are always admitted. Limits are per process.
+    ADMISSION_RATE = None  # Sustained requests per second (None: no rate limit)
+    ADMISSION_BURST = 100  # Requests admitted back to back above the rate
+    ADMISSION_MAX_CONCURRENCY = 32  # Requests scored at once (None: no limit)
+    ADMISSION_MAX_QUEUE = 64  # Requests waiting for a free slot before new ones are shed
+    ADMISSION_QUEUE_TIMEOUT = 1.0  # Seconds a request waits for a slot
+
+    # Memory-mapped knowledge base artifact, used when present and up to date
+    # (None always parses the JSON files)
+    KB_ARTIFACT_PATH = KB_ARTIFACT
+
+    # Fingerprinted static assets (/assets/<name>.<hash>.<ext>) are cached by
+    # browsers for this long; a changed file gets a new URL
+    ASSET_MAX_AGE = 365 * 24 * 3600
+    ASSETS_PREBUILT_DIR = ASSETS_BUILD_DIR  # Precompressed variants (None compresses in memory)
+
+    # Defer loading the knowledge base until the first request that needs it.
+    # Keeps serverless cold starts lean; long-running servers load eagerly.
+    LAZY_KB_LOAD = bool(os.environ.get('VERCEL'))
+
+    # /health?verbose=1 exposes paths, data files and the Python version, so it
+    # is only honoured in debug mode or when explicitly enabled (HEALTH_VERBOSE=1)
+    HEALTH_VERBOSE = bool(os.environ.get('HEALTH_VERBOSE'))
+
+    # Knowledge base hot reload: seconds between data file checks (0 disables).
+    # Serverless deployments ship immutable data files, so no watcher is needed.
+    KB_RELOAD_INTERVAL = 0 if os.environ.get('VERCEL') else 5.0
+
+    # ASGI application (asgi.py): batch scoring runs on a bounded thread pool
+    ASGI_BATCH_WORKERS = min(4, os.cpu_count() or 1)  # Threads scoring batch chunks
+    ASGI_BATCH_CHUNK_SIZE = 100  # Records scored per executor job
+    ASGI_BATCH_MAX_PENDING = 64  # Chunk jobs queued or running before batches wait
+
+    # Incremental diagnosis sessions (/session). Sessions live in process
+    # memory, so serverless deployments turn them off (0 disables the API).
+    SESSION_MAX_COUNT = 0 if os.environ.get('VERCEL') else 1000  # Live sessions before LRU eviction
+    SESSION_IDLE_TTL = 900  # Seconds without activity before a session expires
+    SESSION_HEARTBEAT_INTERVAL = 15.0  # Seconds between keep-alive comments on event streams
+
+    # Prefork launcher (serve.py). With preload the master loads the knowledge
+    # base once and the workers share it copy-on-write.
+    SERVER_HOST = os.environ.get('HOST', '0.0.0.0')
+    SERVER_PORT = int(os.environ.get('PORT', 8000))
+    SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY') or os.cpu_count() or 1)  # Worker processes
+    SERVER_PRELOAD = True  # Load the application in the master before forking
+    SERVER_BACKLOG = 2048  # Pending connections on the shared listening socket
+    SERVER_GRACEFUL_TIMEOUT = 30.0  # Seconds workers get to finish on shutdown
+    SERVER_MEMORY_REPORT_INTERVAL = 0  # Seconds between worker memory reports (0: once after startup)
+
+    # Diagnosis history: /diagnose results are queued and a background thread
+    # writes them to SQLite in batches. Serverless file systems are
+    # read-only and ephemeral, so no history is kept there (None disables).
+    HISTORY_DB_PATH = None if os.environ.get('VERCEL') else INSTANCE_DIR / 'history.sqlite3'
+    HISTORY_QUEUE_SIZE = 10000  # Results waiting for the writer before new ones are dropped
+    HISTORY_BATCH_SIZE = 500  # Most rows committed per transaction
+    HISTORY_FLUSH_INTERVAL = 1.0  # Longest a result waits to be committed, in seconds
+
+    # Live traffic aggregates (/aggregates): per-bucket counters of diagnoses,
+    # kept in process memory for AGGREGATE_BUCKETS x AGGREGATE_BUCKET_SECONDS
+    # (24 hours). Serverless instances are short-lived, so they keep none.
+    AGGREGATE_BUCKET_SECONDS = 300
+    AGGREGATE_BUCKETS = 0 if os.environ.get('VERCEL') else 288  # 0 disables
+
+    # Per-stage request timing, Server-Timing headers and /metrics.
+    # When off, requests skip the instrumentation entirely.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+    # Logging: records go through a bounded queue to a background writer.
+    # Serverless functions freeze between requests, so they log synchronously.
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # 'text' or 'json' (one object per line)
+    LOG_ASYNC = not os.environ.get('VERCEL')
+    LOG_QUEUE_SIZE = 10000  # Records waiting for the writer before new ones are dropped
+    # Fraction of INFO/DEBUG records kept per logger (children inherit);
+    # warnings and errors are always kept
+    LOG_SAMPLE_RATES = {
+        'utils.diagnosis_engine': 0.01,
+        'utils.vector_engine': 0.01,
+        'utils.recommendation_engine': 0.01,
+    }
 
     # Temperature thresholds
     MIN_TEMPERATURE = 35.0
@@ -61,6 +165,9 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    RESULT_CACHE_SIZE = 0
+    KB_RELOAD_INTERVAL = 0
+    HISTORY_DB_PATH = None
 
 # Configuration dictionary
 config = {
@@ -70,3 +177,8 @@ config = {
     'default': DevelopmentConfig
 }
 
+
+def load_settings(env: str) -> dict:
+    """Collect the upper-case settings of a config class, like Flask's from_object"""
+    config_class = config[env]
+    return {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
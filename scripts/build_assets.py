@@ -0,0 +1,51 @@
+"""
+Static Assets Build Step
+========================
+
+Writes a content-hashed copy of every file in static/ to static/dist/,
+together with its gzip and (when the ``brotli`` package is installed)
+brotli variants, so the server does not have to compress them at startup
+(see utils/assets.py). Re-run after editing the static files; variants of an
+older version are never served, so forgetting this step only costs the
+compression time on the first request.
+
+Usage:
+    python scripts/build_assets.py
+    python scripts/build_assets.py --static-dir static --output static/dist
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Make the project root importable when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import ASSETS_BUILD_DIR, STATIC_DIR
+from utils import build_assets
+from utils.assets import load_brotli
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress the static files.')
+    parser.add_argument('--static-dir', type=Path, default=STATIC_DIR,
+                        help='Directory containing the static files (default: static/)')
+    parser.add_argument('-o', '--output', type=Path, default=ASSETS_BUILD_DIR,
+                        help='Output directory (default: static/dist/)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    if load_brotli() is None:
+        logging.warning("brotli is not installed: only gzip variants are written")
+
+    for summary in build_assets(args.static_dir, args.output):
+        sizes = ', '.join(f"{encoding} {size}" for encoding, size in summary['sizes'].items())
+        print(f"{summary['name']} -> {summary['url_name']} ({sizes} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
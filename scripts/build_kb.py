@@ -0,0 +1,47 @@
+"""
+Knowledge Base Build Step
+=========================
+
+Compiles data/diseases.json and data/recommendations.json into the versioned
+binary artifact that the application memory-maps at startup (see
+utils/kb_artifact.py). Re-run after editing the JSON files; a stale artifact
+is detected and ignored, so forgetting this step only costs startup time.
+
+Usage:
+    python scripts/build_kb.py
+    python scripts/build_kb.py --data-dir data --output data/knowledge_base.bin
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Make the project root importable when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import DATA_DIR, KB_ARTIFACT
+from utils import build_artifact
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the knowledge base into a binary artifact.')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='Directory containing the JSON data files (default: data/)')
+    parser.add_argument('-o', '--output', type=Path, default=KB_ARTIFACT,
+                        help='Artifact path (default: data/knowledge_base.bin)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    summary = build_artifact(args.data_dir, args.output)
+    print(
+        f"Wrote {args.output} ({summary['bytes']} bytes): knowledge base {summary['version']}, "
+        f"{summary['diseases']} diseases x {summary['symptoms']} symptoms"
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
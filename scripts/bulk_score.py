@@ -0,0 +1,255 @@
+"""
+Bulk Symptom Scoring CLI
+========================
+
+Re-scores large CSV or JSONL files of patient symptom records offline, using
+the same DiagnosisEngine and RecommendationEngine as the web application.
+
+Rows are read lazily, grouped into chunks and spread across a process pool.
+At most a few chunks per worker are in flight at any time, so memory use is
+bounded by the chunk size rather than the size of the input file. Results are
+written incrementally, in input order.
+
+Usage:
+    python scripts/bulk_score.py intake.csv -o scored.jsonl
+    python scripts/bulk_score.py intake.jsonl -o scored.csv --workers 8 --chunk-size 2000
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Make the project root importable when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import config, DATA_DIR, load_settings
+from utils import DiagnosisPipeline
+
+logger = logging.getLogger('bulk_score')
+
+# Columns written when the output format is CSV
+CSV_COLUMNS = [
+    'row', 'top_diagnosis', 'top_confidence', 'diagnoses',
+    'overall_severity', 'critical_warning', 'error'
+]
+
+# Pipeline built once per worker process by _init_worker
+_pipeline = None
+
+
+def detect_format(path: str, explicit: str = None) -> str:
+    """Infer 'csv' or 'jsonl' from an explicit choice or the file extension"""
+    if explicit:
+        return explicit
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_records(path: str, fmt: str):
+    """
+    Yield (row_number, record) pairs from a CSV or JSONL file
+
+    JSONL lines are passed through undecoded so parsing happens in the
+    workers; CSV rows are passed as dicts with empty cells removed so the
+    usual defaults apply.
+    """
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        if fmt == 'csv':
+            for row_number, row in enumerate(csv.DictReader(stream), start=1):
+                yield row_number, {k: v for k, v in row.items() if k and v not in (None, '')}
+        else:
+            row_number = 0
+            for line in stream:
+                if line.strip():
+                    row_number += 1
+                    yield row_number, line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_chunks(records, chunk_size: int):
+    """Group an iterator of records into lists of at most chunk_size items"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(data_dir: str, settings: dict):
+    """Build the engines once per worker process"""
+    global _pipeline
+    logging.getLogger().setLevel(logging.WARNING)
+    _pipeline = DiagnosisPipeline.from_data_dir(Path(data_dir), settings)
+
+
+def score_record(row_number: int, record) -> dict:
+    """Score a single record, reporting failures inline"""
+    try:
+        if isinstance(record, str):
+            record = json.loads(record)
+        if not isinstance(record, dict):
+            raise ValueError("Invalid input data: each record must be a JSON object")
+        return {'row': row_number, **_pipeline.diagnose(record)}
+    except json.JSONDecodeError as e:
+        return {'row': row_number, 'error': f"Invalid JSON: {e}"}
+    except ValueError as e:
+        return {'row': row_number, 'error': str(e)}
+
+
+def score_chunk(chunk: list) -> list:
+    """Score one chunk of (row_number, record) pairs in a worker process"""
+    return [score_record(row_number, record) for row_number, record in chunk]
+
+
+def to_csv_row(result: dict) -> dict:
+    """Flatten a pipeline result into the summary CSV columns"""
+    if 'error' in result:
+        return {'row': result['row'], 'error': result['error']}
+
+    diagnoses = result['diagnoses']
+    top = diagnoses[0] if diagnoses else {}
+    return {
+        'row': result['row'],
+        'top_diagnosis': top.get('disease', ''),
+        'top_confidence': top.get('confidence', ''),
+        'diagnoses': ';'.join(f"{d['disease']}:{d['confidence']}" for d in diagnoses),
+        'overall_severity': result['overall_severity'],
+        'critical_warning': result['critical_warning'],
+        'error': ''
+    }
+
+
+class ResultWriter:
+    """Writes scored results incrementally as JSONL or CSV"""
+
+    def __init__(self, path: str, fmt: str):
+        self.stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        self.fmt = fmt
+        self.csv_writer = None
+        if fmt == 'csv':
+            self.csv_writer = csv.DictWriter(self.stream, fieldnames=CSV_COLUMNS)
+            self.csv_writer.writeheader()
+
+    def write(self, results: list):
+        if self.csv_writer is not None:
+            self.csv_writer.writerows(to_csv_row(result) for result in results)
+        else:
+            self.stream.writelines(
+                json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for result in results
+            )
+
+    def close(self):
+        if self.stream is sys.stdout:
+            self.stream.flush()
+        else:
+            self.stream.close()
+
+
+def run(args) -> dict:
+    """
+    Score an input file and return a throughput summary
+
+    Returns:
+        Dictionary with row, error and timing counts
+    """
+    settings = load_settings(args.env)
+    input_format = detect_format(args.input, args.input_format)
+    output_format = detect_format(args.output, args.output_format)
+
+    chunks = iter_chunks(read_records(args.input, input_format), args.chunk_size)
+    writer = ResultWriter(args.output, output_format)
+
+    rows = errors = 0
+    start = time.perf_counter()
+
+    def consume(results):
+        nonlocal rows, errors
+        writer.write(results)
+        rows += len(results)
+        errors += sum(1 for result in results if 'error' in result)
+
+    try:
+        if args.workers <= 1:
+            _init_worker(str(args.data_dir), settings)
+            for chunk in chunks:
+                consume(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=args.workers,
+                initializer=_init_worker,
+                initargs=(str(args.data_dir), settings)
+            ) as executor:
+                # Keep a bounded window of chunks in flight; results are
+                # written in submission order as they complete
+                max_in_flight = args.workers * 2
+                in_flight = deque()
+                for chunk in chunks:
+                    in_flight.append(executor.submit(score_chunk, chunk))
+                    if len(in_flight) >= max_in_flight:
+                        consume(in_flight.popleft().result())
+                while in_flight:
+                    consume(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        'workers': max(args.workers, 1)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Score a CSV or JSONL file of symptom records offline.'
+    )
+    parser.add_argument('input', help="Input CSV or JSONL file ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="Output file ('-' for stdout)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'],
+                        help='Input format (default: from file extension)')
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'],
+                        help='Output format (default: from file extension, JSONL for stdout)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: all cores)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=1000,
+                        help='Rows per chunk sent to a worker (default: 1000)')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='Knowledge base directory (default: data/)')
+    parser.add_argument('--env', default='production', choices=sorted(config),
+                        help='Configuration to take thresholds from (default: production)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+    args = parse_args(argv)
+    summary = run(args)
+    print(
+        f"Scored {summary['rows']} rows ({summary['errors']} errors) in "
+        f"{summary['elapsed_seconds']}s using {summary['workers']} workers: "
+        f"{summary['rows_per_second']} rows/s",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
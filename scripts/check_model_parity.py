@@ -0,0 +1,149 @@
+"""
+Client/Server Scoring Parity Check
+==================================
+
+Scores random symptom records with the server pipeline and with
+static/scorer.js (under Node.js) on the model export served by /model, and
+reports every record whose responses differ. The timestamp is the only field
+left out of the comparison.
+
+Records cover the whole form: every temperature the input accepts (one
+decimal, plus each disease's temperature range bounds and the points 1°C
+away from them), sparse and dense symptom profiles, and all-zero records.
+
+Usage:
+    python scripts/check_model_parity.py
+    python scripts/check_model_parity.py --count 100000 --seed 7
+    python scripts/check_model_parity.py --data-dir /tmp/synthetic_kb
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Make the project root importable when run as a script
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import DATA_DIR, STATIC_DIR, load_settings
+from utils import DiagnosisPipeline
+
+# Reads the model and the records, writes one response per line
+NODE_DRIVER = """
+const fs = require('fs');
+const { LocalScorer } = require(process.argv[1]);
+const scorer = new LocalScorer(JSON.parse(fs.readFileSync(process.argv[2], 'utf8')));
+const records = JSON.parse(fs.readFileSync(process.argv[3], 'utf8'));
+fs.writeFileSync(process.argv[4], records.map(record => JSON.stringify(scorer.score(record))).join('\\n'));
+"""
+
+# Responses shown in full when records differ
+MAX_REPORTED = 5
+
+
+def random_records(pipeline: DiagnosisPipeline, count: int, seed: int):
+    """
+    Generate form-like records
+
+    Args:
+        pipeline: Pipeline whose registry and temperature range to cover
+        count: Number of records
+        seed: Random seed
+
+    Returns:
+        List of record dicts
+    """
+    rng = random.Random(seed)
+    names = pipeline.registry.names
+    low, high = pipeline.min_temperature, pipeline.max_temperature
+
+    # Temperatures where the adjustment and the severity tiers change
+    edges = set()
+    for disease_info in pipeline.diagnosis_engine.disease_database.values():
+        temp_range = disease_info.get('temp_range', [0, 100])
+        for value in (temp_range[0], temp_range[1], temp_range[1] - 1.0, temp_range[1] + 1.0):
+            if low <= value <= high:
+                edges.add(round(value, 1))
+    edges = sorted(edges)
+    steps = int(round((high - low) * 10))
+
+    records = []
+    for _ in range(count):
+        if edges and rng.random() < 0.25:
+            temperature = rng.choice(edges)
+        else:
+            temperature = round(low + rng.randint(0, steps) / 10, 1)
+
+        density = rng.choice((0.0, 0.1, 0.3, 0.6, 1.0))
+        record = {'temperature': temperature}
+        for name in names:
+            record[name] = rng.randint(1, 10) if rng.random() < density else 0
+        records.append(record)
+    return records
+
+
+def score_in_node(model: bytes, records, node: str):
+    """Score records with static/scorer.js; returns the decoded responses"""
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        (directory / 'model.json').write_bytes(model)
+        (directory / 'records.json').write_text(json.dumps(records))
+        subprocess.run(
+            [node, '-e', NODE_DRIVER, str(STATIC_DIR / 'scorer.js'),
+             str(directory / 'model.json'), str(directory / 'records.json'), str(directory / 'out.jsonl')],
+            check=True
+        )
+        with open(directory / 'out.jsonl', encoding='utf-8') as output:
+            return [json.loads(line) for line in output]
+
+
+def comparable(response):
+    """A response as decoded JSON, without its timestamp"""
+    decoded = json.loads(json.dumps(response))
+    decoded.pop('timestamp', None)
+    return decoded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that client-side scoring matches the server.')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR,
+                        help='Directory containing the JSON data files (default: data/)')
+    parser.add_argument('-n', '--count', type=int, default=20000,
+                        help='Random records to score (default: 20000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--node', default='node', help='Node.js executable (default: node)')
+    args = parser.parse_args(argv)
+
+    pipeline = DiagnosisPipeline.from_data_dir(args.data_dir, load_settings('production'))
+    model = pipeline.model()
+    records = random_records(pipeline, args.count, args.seed)
+
+    try:
+        client = score_in_node(model.variants['identity'], records, args.node)
+    except FileNotFoundError:
+        print(f"Node.js executable not found: {args.node}", file=sys.stderr)
+        return 2
+
+    mismatches = 0
+    for record, local in zip(records, client):
+        server = comparable(pipeline.run(record['temperature'], pipeline.registry.parse(record)))
+        local.pop('timestamp', None)
+        if local != server:
+            mismatches += 1
+            if mismatches <= MAX_REPORTED:
+                print(f"Mismatch for {json.dumps(record)}:\n  server {json.dumps(server)}\n  client {json.dumps(local)}")
+
+    print(
+        f"Model {model.digest} ({len(model.variants['identity'])} bytes), knowledge base {pipeline.version}: "
+        f"{len(records) - mismatches}/{len(records)} records match"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
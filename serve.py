@@ -0,0 +1,340 @@
+"""
+Medical Symptom Checker - Prefork Server
+========================================
+
+Production entry point that runs the Flask application (app.py) in several
+worker processes forked from one master process, all accepting connections
+on one shared listening socket.
+
+With SERVER_PRELOAD (the default) the workers share one copy of the loaded
+application instead of each building their own:
+
+1. The master imports the application and loads the knowledge base, the
+   compiled engines and the static assets once.
+2. gc.freeze() then moves every object allocated so far into the garbage
+   collector's permanent generation, so collections in the workers never
+   visit (and thereby copy) the pages holding them.
+3. The workers are forked and share that memory copy-on-write; a page is
+   only copied when a worker writes to it.
+
+The master restarts workers that die and, on SIGTERM or Ctrl-C, stops them
+gracefully. It logs each worker's memory (RSS, PSS, USS and shared bytes)
+shortly after startup, every SERVER_MEMORY_REPORT_INTERVAL seconds and on
+SIGUSR1; USS is what a worker costs on its own, so it shows the savings of
+preloading. Memory reports need Linux (/proc/<pid>/smaps_rollup).
+
+Diagnosis sessions live in one process's memory, so with more than one
+worker the session API is turned off and the web form uses /diagnose.
+Knowledge base hot reload runs in every worker; a reloaded knowledge base
+is no longer shared until the server is restarted.
+
+Usage:
+    python serve.py
+    python serve.py --workers 4 --port 8000
+    python serve.py --no-preload        # every worker loads its own copy
+    kill -USR1 <master pid>             # log per-worker memory now
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+from config import load_settings
+from utils import configure_logging
+
+logger = logging.getLogger('serve')
+
+# Seconds after startup before the first memory report (workers warm up)
+FIRST_REPORT_DELAY = 2.0
+
+# A worker that exits sooner than this after starting is restarted with a delay
+MIN_WORKER_LIFETIME = 1.0
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    Memory of a process in bytes, from /proc/<pid>/smaps_rollup
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        Dict with rss, pss, uss (private pages) and shared, or None where
+        the kernel does not provide the figures
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as rollup:
+            for line in rollup:
+                key, _, rest = line.partition(':')
+                parts = rest.split()
+                if len(parts) == 2 and parts[1] == 'kB':
+                    fields[key] = int(parts[0]) * 1024
+    except OSError:
+        return None
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+    }
+
+
+def _mib(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f}"
+
+
+class PreforkServer:
+    """Master process: binds the socket, preloads the app and supervises workers"""
+
+    def __init__(self, settings: Dict, host: str, port: int, workers: int, preload: bool):
+        self.settings = settings
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, workers)
+        self.preload = preload
+        self.log_pipeline = configure_logging(settings)
+        self.application = None
+        self.listener = None
+        # pid -> (worker number, start time)
+        self.workers = {}
+        self.running = False
+        self.report_requested = False
+
+    def run(self) -> int:
+        if not hasattr(os, 'fork'):
+            logger.error("serve.py needs fork(); on this platform run app:app under a WSGI server instead")
+            return 1
+
+        self.listener = self._bind()
+        if self.preload:
+            self.application = self._load_application()
+            # Everything loaded so far is shared with the workers: keep the
+            # collector away from it so the pages stay shared
+            gc.collect()
+            gc.freeze()
+            logger.info(f"Preloaded application; froze {gc.get_freeze_count()} objects before forking")
+        gc.enable()
+
+        self.running = True
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGUSR1, self._handle_report)
+
+        for number in range(1, self.worker_count + 1):
+            self._spawn(number)
+        logger.info(
+            f"Serving on http://{self.host}:{self.port} with {self.worker_count} worker(s) "
+            f"(preload {'on' if self.preload else 'off'}, master pid {os.getpid()})"
+        )
+
+        interval = self.settings['SERVER_MEMORY_REPORT_INTERVAL']
+        next_report = time.monotonic() + FIRST_REPORT_DELAY
+        while self.running:
+            self._reap()
+            now = time.monotonic()
+            if self.report_requested or now >= next_report:
+                self.report_requested = False
+                self.report_memory()
+                next_report = now + interval if interval > 0 else float('inf')
+            time.sleep(0.2)
+
+        self._stop_workers()
+        self.listener.close()
+        logger.info("Server stopped")
+        self.log_pipeline.stop()
+        return 0
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        listener = socket.socket(family, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(self.settings['SERVER_BACKLOG'])
+        listener.set_inheritable(True)
+        # Report the real port when 0 asked for any free one
+        self.port = listener.getsockname()[1]
+        return listener
+
+    def _load_application(self):
+        """Import app.py and load everything a request would otherwise load lazily"""
+        import app as application
+
+        application.knowledge_base.get().pipeline.model()
+        application.static_assets.assets()
+        # The watcher thread would not survive the fork; workers start their own
+        application.knowledge_base.stop_watcher()
+        return application
+
+    def _spawn(self, number: int):
+        # No thread may hold the log queue's lock across fork()
+        self.log_pipeline.stop()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._serve(number)
+            except Exception as e:
+                logger.error(f"Worker {number} failed: {e}", exc_info=True)
+            finally:
+                self.log_pipeline.stop()
+                os._exit(code)
+        self.log_pipeline.start()
+        self.workers[pid] = (number, time.monotonic())
+
+    def _serve(self, number: int) -> int:
+        """Worker process: serve requests from the shared socket until SIGTERM"""
+        from werkzeug.serving import make_server
+
+        signal.signal(signal.SIGTERM, _interrupt)
+        # Ctrl-C and kill -USR1 may reach the whole process group; the master decides
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+        self.log_pipeline.start()
+
+        application = self.application
+        if application is None:
+            import app as application
+
+        if self.worker_count > 1 and application.session_store is not None:
+            # A session's requests would be spread over workers that do not share it
+            application.session_store = None
+            if number == 1:
+                logger.warning("Diagnosis sessions are disabled with more than one worker")
+
+        knowledge_base = application.knowledge_base
+        if self.settings['KB_RELOAD_INTERVAL'] > 0:
+            knowledge_base.start_watcher(self.settings['KB_RELOAD_INTERVAL'])
+
+        server = make_server(
+            self.host, self.port, application.app, threaded=True, fd=self.listener.fileno()
+        )
+        logger.info(f"Worker {number} started (pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        finally:
+            knowledge_base.stop_watcher()
+            if application.session_store is not None:
+                application.session_store.close_all('shutdown')
+            # os._exit() skips atexit, so commit the queued history here
+            if application.history is not None:
+                application.history.close()
+        return 0
+
+    def _reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            number, started = self.workers.pop(pid, (None, 0.0))
+            if number is None or not self.running:
+                continue
+            logger.warning(f"Worker {number} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                # Do not spin when workers fail at startup
+                time.sleep(MIN_WORKER_LIFETIME)
+            self._spawn(number)
+
+    def _stop_workers(self):
+        timeout = self.settings['SERVER_GRACEFUL_TIMEOUT']
+        for pid in list(self.workers):
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        while self.workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.05)
+        for pid in list(self.workers):
+            logger.warning(f"Worker pid {pid} did not stop within {timeout}s; killing it")
+            _signal(pid, signal.SIGKILL)
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.workers.clear()
+
+    def report_memory(self):
+        """Log RSS, PSS, USS and shared memory of the master and every worker"""
+        master = process_memory(os.getpid())
+        if master is None:
+            logger.info("Memory report unavailable on this platform (needs /proc/<pid>/smaps_rollup)")
+            return
+
+        total_pss = master['pss']
+        lines = [f"master pid {os.getpid()}: " + _format_memory(master)]
+        for pid, (number, _) in sorted(self.workers.items(), key=lambda item: item[1][0]):
+            memory = process_memory(pid)
+            if memory is None:
+                continue
+            total_pss += memory['pss']
+            lines.append(f"worker {number} pid {pid}: " + _format_memory(memory))
+        logger.info(
+            f"Memory (MiB), total PSS {_mib(total_pss)}:\n  " + '\n  '.join(lines)
+        )
+
+    def _handle_stop(self, signum, frame):
+        self.running = False
+
+    def _handle_report(self, signum, frame):
+        self.report_requested = True
+
+
+def _format_memory(memory: Dict[str, int]) -> str:
+    return (
+        f"RSS {_mib(memory['rss'])}, PSS {_mib(memory['pss'])}, "
+        f"USS {_mib(memory['uss'])}, shared {_mib(memory['shared'])}"
+    )
+
+
+def _interrupt(signum, frame):
+    # serve_forever() returns on KeyboardInterrupt and closes the server
+    raise KeyboardInterrupt
+
+
+def _signal(pid: int, signum: int):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def main(argv=None):
+    env = os.environ.get('FLASK_ENV', 'production')
+    os.environ['FLASK_ENV'] = env
+    settings = load_settings(env)
+
+    parser = argparse.ArgumentParser(description='Run the application on prefork worker processes.')
+    parser.add_argument('--host', default=settings['SERVER_HOST'],
+                        help=f"Address to listen on (default: {settings['SERVER_HOST']})")
+    parser.add_argument('--port', type=int, default=settings['SERVER_PORT'],
+                        help=f"Port to listen on (default: {settings['SERVER_PORT']})")
+    parser.add_argument('-w', '--workers', type=int, default=settings['SERVER_WORKERS'],
+                        help=f"Worker processes (default: {settings['SERVER_WORKERS']})")
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction, default=settings['SERVER_PRELOAD'],
+                        help='Load the application once in the master and share it with the workers')
+    args = parser.parse_args(argv)
+
+    server = PreforkServer(settings, args.host, args.port, args.workers, args.preload)
+    return server.run()
+
+
+if __name__ == '__main__':
+    # No collections while loading: everything allocated before gc.freeze()
+    # stays alive anyway (collection is re-enabled before forking)
+    gc.disable()
+    exit_code = main()
+    sys.exit(exit_code)
@@ -0,0 +1,241 @@
+// Client-side scoring with the model export served by /model.
+//
+// Mirrors DiagnosisEngine.analyze_symptoms, assess_overall_severity,
+// RecommendationEngine.generate_recommendations and the response summary of
+// DiagnosisPipeline.build_response step by step, in the same floating point
+// order, so a local result equals the server's (apart from the timestamp).
+// scripts/check_model_parity.py verifies this over random records.
+
+// Python's round(x, 1): exact halves (x * 4 odd) go to the even digit,
+// where toFixed would round up
+function roundOne(x) {
+    const quarters = x * 4;
+    if (Number.isInteger(quarters) && quarters % 2 !== 0) {
+        let tenths = Math.floor(x * 10);
+        if (tenths % 2 !== 0) {
+            tenths += 1;
+        }
+        return tenths / 10;
+    }
+    return Number(x.toFixed(1));
+}
+
+// Python's str(float) for the temperatures the form accepts
+function formatTemperature(temperature) {
+    const text = String(temperature);
+    return Number.isInteger(temperature) ? `${text}.0` : text;
+}
+
+// dict.get(key, ()) for message tables keyed by arbitrary names
+function lookup(table, key) {
+    return Object.prototype.hasOwnProperty.call(table, key) ? table[key] : [];
+}
+
+class LocalScorer {
+    constructor(model) {
+        this.model = model;
+        this.version = model.kb_version;
+        this.settings = model.settings;
+        this.index = {};
+        model.symptoms.forEach((name, position) => {
+            this.index[name] = position;
+        });
+
+        const rules = model.recommendations;
+        this.critical = rules.critical.map(([tempThreshold, symptom, symptomThreshold, message]) => ({
+            tempThreshold,
+            position: symptom === null ? null : this.index[symptom],
+            symptomThreshold,
+            message
+        }));
+        this.symptomRules = rules.symptom_rules.map(([symptom, threshold, recommendations]) => ({
+            position: this.index[symptom],
+            threshold,
+            recommendations
+        }));
+        this.generalPositions = rules.general.symptoms.map(symptom => this.index[symptom]);
+    }
+
+    // Severities in registry order; missing fields are 0, like SymptomRegistry.parse
+    severities(formData) {
+        return this.model.symptoms.map(name => formData[name] || 0);
+    }
+
+    // Whether the server would accept the record; anything else is left to it
+    accepts(formData) {
+        const temperature = formData.temperature;
+        if (!(temperature >= this.settings.min_temperature && temperature <= this.settings.max_temperature)) {
+            return false;
+        }
+        return this.model.symptoms.every(name => {
+            const value = formData[name] === undefined ? 0 : formData[name];
+            return Number.isInteger(value) && value >= 0 && value <= 10;
+        });
+    }
+
+    diagnoses(severities, temperature) {
+        const labels = this.model.labels;
+        const matches = [];
+        this.model.diseases.forEach((disease, row) => {
+            const [name, description, urgency, severity, incubation, tempRange, totalPossible, weights] = disease;
+            let matchedScore = 0;
+            const matchedSymptoms = [];
+            for (let i = 0; i < weights.length; i += 2) {
+                const value = severities[weights[i]];
+                if (value > 0) {
+                    matchedScore += value * weights[i + 1];
+                    if (value >= 5) {
+                        matchedSymptoms.push(labels[weights[i]]);
+                    }
+                }
+            }
+
+            let probability = totalPossible > 0 ? (matchedScore / totalPossible) * 100 : 0;
+            if (tempRange[0] <= temperature && temperature <= tempRange[1]) {
+                probability *= 1.2;
+            } else if (Math.abs(temperature - tempRange[1]) <= 1.0) {
+                probability *= 1.1;
+            }
+            probability = Math.min(probability, 100);
+
+            if (probability < this.settings.min_confidence) {
+                return;
+            }
+            matches.push({
+                row,
+                entry: {
+                    disease: name,
+                    description,
+                    confidence: roundOne(probability),
+                    urgency,
+                    severity,
+                    matched_symptoms: matchedSymptoms,
+                    incubation
+                }
+            });
+        });
+
+        // Highest confidence first; ties keep database order
+        matches.sort((a, b) => b.entry.confidence - a.entry.confidence || a.row - b.row);
+        const limit = this.settings.max_results === null ? matches.length : this.settings.max_results;
+        return matches.slice(0, Math.max(limit, 0)).map(match => match.entry);
+    }
+
+    overallSeverity(diagnoses, severities, temperature) {
+        let score = 0;
+        if (temperature >= 40.0) {
+            score += 4;
+        } else if (temperature >= 39.0) {
+            score += 3;
+        } else if (temperature >= 38.0) {
+            score += 2;
+        } else if (temperature >= 37.5) {
+            score += 1;
+        }
+
+        this.model.high_severity.forEach(position => {
+            if (severities[position] >= 7) {
+                score += 3;
+            } else if (severities[position] >= 5) {
+                score += 2;
+            }
+        });
+
+        if (severities.length > 0) {
+            const average = severities.reduce((sum, value) => sum + value, 0) / severities.length;
+            if (average >= 7) {
+                score += 3;
+            } else if (average >= 5) {
+                score += 2;
+            } else if (average >= 3) {
+                score += 1;
+            }
+        }
+
+        if (diagnoses.length > 0 && diagnoses[0].confidence >= 80) {
+            if (diagnoses[0].urgency === 'urgent') {
+                score += 2;
+            } else if (diagnoses[0].urgency === 'warning') {
+                score += 1;
+            }
+        }
+        return Math.min(score, 10);
+    }
+
+    recommendations(diagnoses, severities, temperature) {
+        const rules = this.model.recommendations;
+
+        const critical = this.critical.filter(rule =>
+            !(rule.tempThreshold !== null && temperature < rule.tempThreshold) &&
+            !(rule.position !== null && severities[rule.position] < rule.symptomThreshold)
+        );
+        if (critical.length > 0) {
+            return {
+                immediate: [rules.emergency_header, ...critical.map(rule => rule.message)],
+                medical: [],
+                home_care: [],
+                prevention: []
+            };
+        }
+
+        let medical = [];
+        if (diagnoses.length > 0 && diagnoses[0].confidence >= 60) {
+            medical = [
+                ...lookup(rules.urgency_messages, diagnoses[0].urgency),
+                ...lookup(rules.disease_messages, diagnoses[0].disease)
+            ];
+        }
+
+        // Temperature tiers: the first match wins
+        let homeCare = [];
+        const tier = rules.temperature_tiers.find(([threshold]) => temperature >= threshold);
+        if (tier) {
+            const temp = formatTemperature(temperature);
+            homeCare = tier[1].map(rec => rec.split('{temp}').join(temp));
+        }
+
+        this.symptomRules.forEach(rule => {
+            if (severities[rule.position] >= rule.threshold) {
+                homeCare.push(...rule.recommendations);
+            }
+        });
+
+        if (this.generalPositions.some(position => severities[position] >= rules.general.threshold)) {
+            homeCare.push(...rules.general.recommendations);
+        }
+
+        return {
+            immediate: [],
+            medical,
+            home_care: homeCare,
+            prevention: [...rules.prevention]
+        };
+    }
+
+    // Full response for one record, shaped like the /diagnose response
+    score(formData) {
+        const temperature = formData.temperature;
+        const severities = this.severities(formData);
+        const diagnoses = this.diagnoses(severities, temperature);
+        const recommendations = this.recommendations(diagnoses, severities, temperature);
+
+        const active = severities.filter(value => value > 0);
+        const average = active.length > 0 ? active.reduce((sum, value) => sum + value, 0) / active.length : 0;
+
+        return {
+            diagnoses,
+            overall_severity: this.overallSeverity(diagnoses, severities, temperature),
+            symptom_average: roundOne(average),
+            temperature,
+            active_symptom_count: active.length,
+            recommendations,
+            timestamp: null,
+            critical_warning: recommendations.immediate.length > 0,
+            kb_version: this.version
+        };
+    }
+}
+
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { LocalScorer, roundOne, formatTemperature };
+}
@@ -16,10 +16,13 @@ symptoms.forEach(symptom => {
         slider.addEventListener('input', function() {
             valueDisplay.textContent = this.value;
             updateValueColor(valueDisplay, this.value);
+            formChanged();
         });
     }
 });
 
+document.getElementById('temperature').addEventListener('input', formChanged);
+
 function updateValueColor(element, value) {
     const val = parseInt(value);
     if (val >= 7) {
@@ -31,10 +34,68 @@ function updateValueColor(element, value) {
     }
 }
 
-// Handle form submission
-document.getElementById('symptomForm').addEventListener('submit', async function(e) {
-    e.preventDefault();
-    
+// Local scoring (static/scorer.js): results follow the form instantly, and
+// submitting fetches the authoritative result from the server. The model is
+// revalidated with its ETag, so a returning visitor downloads it only when
+// the knowledge base changed.
+let scorer = null;
+
+async function loadModel() {
+    try {
+        const response = await fetch('/model', { cache: 'no-cache' });
+        if (response.ok) {
+            scorer = new LocalScorer(await response.json());
+        }
+    } catch (error) {
+        // No local preview; submitting still works
+    }
+}
+
+function previewResults(formData) {
+    if (scorer && scorer.accepts(formData)) {
+        displayResults(scorer.score(formData), true);
+    }
+}
+
+loadModel();
+
+// Live updates: once the form has been analyzed, changes are also sent to
+// the server, but only after the sliders rest for CONFIRM_DELAY_MS. A newer
+// change cancels the stale request instead of queueing behind it.
+const CONFIRM_DELAY_MS = 300;
+let liveUpdates = false;
+let confirmTimer = null;
+let inflight = null;  // AbortController of the running /session or /diagnose request
+
+function formChanged() {
+    const formData = collectFormData();
+    previewResults(formData);
+    if (!liveUpdates || (scorer && !scorer.accepts(formData))) {
+        return;
+    }
+    clearTimeout(confirmTimer);
+    confirmTimer = setTimeout(() => {
+        confirmTimer = null;
+        // The preview stays up if the server cannot be reached
+        analyze(collectFormData()).catch(error => console.warn('Live update failed:', error.message));
+    }, CONFIRM_DELAY_MS);
+}
+
+function cancelPending() {
+    clearTimeout(confirmTimer);
+    confirmTimer = null;
+    if (inflight) {
+        inflight.abort();
+        inflight = null;
+    }
+}
+
+// Incremental diagnosis session: after the first analysis only the changed
+// fields are sent, and updated results arrive over Server-Sent Events
+let session = null;
+let sessionsAvailable = true;
+
+function collectFormData() {
     const formData = {
         temperature: parseFloat(document.getElementById('temperature').value)
     };
@@ -44,6 +105,137 @@ document.getElementById('symptomForm').addEventListener('submit', async function
         const element = document.getElementById(symptom);
         formData[symptom] = element ? parseInt(element.value) : 0;
     });
+    return formData;
+}
+
+async function postJson(url, method, data, signal) {
+    const response = await fetch(url, {
+        method: method,
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data),
+        signal
+    });
+    return { response, result: await response.json() };
+}
+
+function openSession(result, sent) {
+    // The stream resumes after the diagnosis we already have
+    const events = new EventSource(`/session/${result.session_id}/events?last_event_id=${result.seq}`);
+    events.addEventListener('diagnosis', event => displayResults(JSON.parse(event.data)));
+    events.addEventListener('closed', () => closeSession(false));
+    events.onerror = () => {
+        if (events.readyState === EventSource.CLOSED) {
+            closeSession(false);
+        }
+    };
+    session = { id: result.session_id, sent, events, latest: null, busy: false };
+}
+
+function closeSession(remove) {
+    if (!session) {
+        return;
+    }
+    session.events.close();
+    if (remove) {
+        fetch(`/session/${session.id}`, { method: 'DELETE', keepalive: true }).catch(() => {});
+    }
+    session = null;
+}
+
+// One PATCH at a time per session: changes made while one is running are
+// sent together afterwards, as the difference to the latest form state
+async function updateSession(current, formData) {
+    current.latest = formData;
+    if (current.busy) {
+        return;
+    }
+    current.busy = true;
+    try {
+        while (current.latest && session === current) {
+            const next = current.latest;
+            current.latest = null;
+            const changes = {};
+            Object.keys(next).forEach(key => {
+                if (next[key] !== current.sent[key]) {
+                    changes[key] = next[key];
+                }
+            });
+            if (Object.keys(changes).length === 0) {
+                continue;
+            }
+            
+            const { response, result } = await postJson(`/session/${current.id}`, 'PATCH', changes);
+            if (response.status === 404) {
+                // Session expired: start a new one
+                closeSession(false);
+                return analyze(current.latest || next);
+            }
+            if (!response.ok) {
+                throw new Error(result.error || 'Something went wrong');
+            }
+            // The new diagnosis arrives on the event stream
+            current.sent = next;
+        }
+    } finally {
+        current.busy = false;
+    }
+}
+
+async function analyze(formData) {
+    if (session) {
+        return updateSession(session, formData);
+    }
+    
+    // A newer request supersedes the running one
+    if (inflight) {
+        inflight.abort();
+    }
+    const controller = inflight = new AbortController();
+    try {
+        let response = null;
+        let result = null;
+        if (sessionsAvailable) {
+            ({ response, result } = await postJson('/session', 'POST', formData, controller.signal));
+            if (response.status === 404) {
+                // Sessions are disabled on this deployment
+                sessionsAvailable = false;
+            }
+        }
+        if (!sessionsAvailable) {
+            ({ response, result } = await postJson('/diagnose', 'POST', formData, controller.signal));
+        }
+        if (controller.signal.aborted) {
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(result.error || 'Something went wrong');
+        }
+        displayResults(result);
+        liveUpdates = true;
+        if (result.session_id) {
+            openSession(result, formData);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            throw error;
+        }
+    } finally {
+        if (inflight === controller) {
+            inflight = null;
+        }
+    }
+}
+
+// Handle form submission
+document.getElementById('symptomForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    
+    // Submitting sends the current form right away
+    clearTimeout(confirmTimer);
+    confirmTimer = null;
+    const formData = collectFormData();
     
     // Show loading state
     const submitBtn = e.target.querySelector('.submit-btn');
@@ -52,38 +244,39 @@ document.getElementById('symptomForm').addEventListener('submit', async function
     submitBtn.disabled = true;
     
     try {
-        const response = await fetch('/diagnose', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(formData)
-        });
-        
-        const result = await response.json();
+        await analyze(formData);
         
-        if (response.ok) {
-            displayResults(result);
-        } else {
-            alert('Error: ' + (result.error || 'Something went wrong'));
+        // Scroll to results
+        const resultsDiv = document.getElementById('results');
+        if (!resultsDiv.classList.contains('hidden')) {
+            resultsDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
         }
     } catch (error) {
-        alert('Error connecting to server: ' + error.message);
+        if (error instanceof TypeError) {
+            alert('Error connecting to server: ' + error.message);
+        } else {
+            alert('Error: ' + error.message);
+        }
     } finally {
         submitBtn.textContent = originalText;
         submitBtn.disabled = false;
     }
 });
 
-// Display comprehensive results
-function displayResults(result) {
+// Display comprehensive results (preview: scored locally, not yet by the server)
+function displayResults(result, preview = false) {
     const resultsDiv = document.getElementById('results');
     
     // Show results section
     resultsDiv.classList.remove('hidden');
     
     // Update timestamp
-    document.getElementById('timestamp').textContent = result.timestamp;
+    document.getElementById('timestamp').textContent = preview ?
+        'Preview - analyze to confirm' : result.timestamp;
+    if (!preview && scorer && result.kb_version !== scorer.version) {
+        // The knowledge base changed since the model was loaded
+        loadModel();
+    }
     
     // Handle critical warning
     const criticalWarning = document.getElementById('critical-warning');
@@ -109,9 +302,7 @@ function displayResults(result) {
     
     // Display recommendations
     displayRecommendations(result.recommendations);
-    
-    // Scroll to results
-    resultsDiv.scrollIntoView({ behavior: 'smooth', block: 'start' });
+
 }
 
 function updateSummaryCards(result) {
@@ -251,6 +442,9 @@ function displayRecommendations(recommendations) {
 
 // Reset form
 document.getElementById('reset-btn').addEventListener('click', function() {
+    cancelPending();
+    liveUpdates = false;
+    closeSession(true);
     document.getElementById('symptomForm').reset();
     document.getElementById('results').classList.add('hidden');
     
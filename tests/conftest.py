@@ -0,0 +1,52 @@
+"""
+Test Configuration
+==================
+
+Shared fixtures for the test suite.
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make the project root importable however pytest is invoked
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# app.py reads its configuration at import time
+os.environ['FLASK_ENV'] = 'testing'
+
+from config import DATA_DIR, load_settings
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Private copy of the JSON data files, safe to edit"""
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    for path in DATA_DIR.glob('*.json'):
+        shutil.copy(path, directory / path.name)
+    return directory
+
+
+@pytest.fixture
+def settings():
+    """Testing settings, without the precompiled artifact"""
+    return dict(load_settings('testing'), KB_ARTIFACT_PATH=None)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The Flask application module, imported with the testing configuration"""
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    """Flask test client"""
+    return app_module.app.test_client()
@@ -0,0 +1,124 @@
+"""
+Admission Control Tests
+=======================
+
+Token bucket, bounded wait queue and critical bypass of AdmissionController,
+driven by a fake clock, and the 429 response of /diagnose.
+"""
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected
+
+
+class FakeClock:
+    """Monotonic clock that only moves when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_limit_rejects_until_a_token_is_refilled():
+    clock = FakeClock()
+    controller = AdmissionController(rate=2, burst=1, clock=clock)
+
+    controller.acquire()
+    controller.release()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'rate'
+    assert rejected.value.retry_after == pytest.approx(0.5)
+
+    clock.now = 0.5
+    controller.acquire()
+    assert controller.stats()['rejected']['rate'] == 1
+
+
+@pytest.mark.parametrize('retry_after, header', [(0.001, '1'), (0.5, '1'), (1.0, '1'), (2.5, '3'), (4.0, '4')])
+def test_retry_after_header_rounds_up_to_whole_seconds(retry_after, header):
+    assert AdmissionRejected('rate', retry_after).retry_after_header == header
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=2.0)
+
+    controller.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire()
+
+    assert rejected.value.reason == 'queue_full'
+    assert rejected.value.retry_after == 2.0
+    stats = controller.stats()
+    assert stats['queued'] == 0
+    assert stats['rejected'] == {'rate': 0, 'queue_full': 1, 'queue_timeout': 0}
+
+
+def test_queued_request_times_out_without_a_free_slot():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.01)
+
+    controller.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire()
+
+    assert rejected.value.reason == 'queue_timeout'
+    stats = controller.stats()
+    assert stats['queued'] == 1
+    assert stats['waiting'] == 0
+    assert stats['active'] == 1
+    assert stats['rejected']['queue_timeout'] == 1
+
+
+def test_shed_request_refunds_its_token():
+    clock = FakeClock()
+    controller = AdmissionController(rate=1, burst=2, max_concurrency=1, max_queue=0, clock=clock)
+
+    controller.acquire()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'queue_full'
+    controller.release()
+
+    # The clock has not moved: only the refunded token can admit this one
+    controller.acquire()
+    controller.release()
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire()
+    assert rejected.value.reason == 'rate'
+
+
+def test_critical_request_bypasses_the_limits_and_counts_as_active():
+    clock = FakeClock()
+    controller = AdmissionController(rate=1, burst=1, max_concurrency=1, max_queue=0, clock=clock)
+
+    controller.acquire()
+    controller.acquire(critical=True)
+
+    stats = controller.stats()
+    assert stats['active'] == 2
+    assert stats['admitted'] == 1
+    assert stats['admitted_critical'] == 1
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+
+    controller.release()
+    controller.release()
+    assert controller.stats()['active'] == 0
+
+
+def test_diagnose_sheds_with_429_and_retry_after(app_module, client, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(app_module, 'admission', AdmissionController(rate=0.5, burst=1, clock=clock))
+    record = {'temperature': 37.0, 'cough': 5}
+
+    assert client.post('/diagnose', json=record).status_code == 200
+
+    response = client.post('/diagnose', json=record)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert 'error' in response.get_json()
+
+    # A record that trips a critical rule is still admitted
+    assert client.post('/diagnose', json={'temperature': 40.5, 'cough': 5}).status_code == 200
@@ -0,0 +1,126 @@
+"""
+Traffic Aggregates Tests
+========================
+
+Ring buffer reuse, windows and step-aligned series of TrafficAggregates,
+driven by a fake clock, and parameter errors of /aggregates.
+"""
+
+import pytest
+
+from utils.aggregates import PARAMETERS_ERROR, TrafficAggregates
+
+
+class FakeClock:
+    """Wall clock that only moves when told to"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def response(severity=3, disease='Common Cold', critical=False):
+    return {
+        'overall_severity': severity,
+        'critical_warning': critical,
+        'diagnoses': [{'disease': disease}],
+    }
+
+
+NAMES = ['fever', 'cough', 'headache']
+
+
+def test_record_and_query_the_current_window():
+    aggregates = TrafficAggregates(bucket_seconds=60, bucket_count=10, clock=FakeClock(6000))
+
+    aggregates.record(response(4, 'Influenza'), {'fever': 8, 'cough': 0, 'headache': 2}, NAMES)
+    aggregates.record(response(2), {'fever': 0, 'cough': 5, 'headache': 0}, NAMES)
+    aggregates.record(response(9, 'Influenza', critical=True), {'fever': 10, 'cough': 0, 'headache': 0}, NAMES)
+
+    summary = aggregates.query(60)
+    assert summary['requests'] == 3
+    assert summary['critical'] == 1
+    assert summary['mean_severity'] == 5.0
+    assert summary['severity_histogram'][4] == summary['severity_histogram'][2] == summary['severity_histogram'][9] == 1
+    assert summary['diseases'] == {
+        'Influenza': {'count': 2, 'share': 0.6667},
+        'Common Cold': {'count': 1, 'share': 0.3333},
+    }
+    assert summary['symptoms'] == {
+        'fever': {'count': 2, 'mean_severity': 6.5},
+        'cough': {'count': 1, 'mean_severity': 2.0},
+        'headache': {'count': 1, 'mean_severity': 4.0},
+    }
+
+
+def test_ring_wraparound_reuses_buckets():
+    clock = FakeClock(6000)
+    aggregates = TrafficAggregates(bucket_seconds=60, bucket_count=3, clock=clock)
+    symptoms = {'fever': 1, 'cough': 0, 'headache': 0}
+
+    for _ in range(5):
+        aggregates.record(response(), symptoms, NAMES)
+    # Three buckets later the ring is back at the same slot, which starts empty
+    clock.now += 3 * 60
+    aggregates.record(response(), symptoms, NAMES)
+    assert aggregates.query(aggregates.retention)['requests'] == 1
+
+    clock.now += 60
+    aggregates.record(response(), symptoms, NAMES)
+    assert aggregates.query(60)['requests'] == 1
+    assert aggregates.query(120)['requests'] == 2
+    assert len(aggregates._buckets) == 3
+
+
+def test_step_series_is_aligned_and_marks_the_partial_first_step():
+    # 10 buckets of 60 s; now is 30 s into bucket 105, so buckets 96..105 are kept
+    clock = FakeClock(105 * 60 + 30)
+    aggregates = TrafficAggregates(bucket_seconds=60, bucket_count=10, clock=clock)
+    symptoms = {'fever': 1, 'cough': 0, 'headache': 0}
+    for bucket in range(96, 106):
+        clock.now = bucket * 60 + 30
+        aggregates.record(response(), symptoms, NAMES)
+
+    summary = aggregates.query(600, step=300)
+
+    # Steps start on 5-bucket boundaries: 95, 100 and 105
+    series = summary['series']
+    assert [step['requests'] for step in series] == [4, 5, 1]
+    assert [step['partial'] for step in series] == [True, False, False]
+    # The partial step and the whole window start at the oldest bucket kept
+    assert series[0]['start'] == summary['start']
+    assert series[0]['end'] == series[1]['start']
+    assert summary['requests'] == 10
+    assert 'symptoms' not in series[0]
+
+
+@pytest.mark.parametrize('window, step, message', [
+    (0, None, 'window'),
+    (-60, None, 'window'),
+    (601, None, 'window'),
+    (600, 90, 'step'),
+    (600, 0, 'step'),
+    (600, -300, 'step'),
+])
+def test_invalid_window_or_step_is_rejected(window, step, message):
+    aggregates = TrafficAggregates(bucket_seconds=60, bucket_count=10, clock=FakeClock(6000))
+
+    with pytest.raises(ValueError, match=message):
+        aggregates.query(window, step)
+
+
+@pytest.mark.parametrize('query', ['window=abc', 'window=3600&step=1.5', 'step=hourly'])
+def test_endpoint_rejects_non_integer_parameters(client, query):
+    response = client.get(f'/aggregates?{query}')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': PARAMETERS_ERROR}
+
+
+def test_endpoint_reports_range_errors(client):
+    response = client.get('/aggregates?window=3600&step=7')
+
+    assert response.status_code == 400
+    assert 'step must be a positive multiple' in response.get_json()['error']
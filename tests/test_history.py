@@ -0,0 +1,117 @@
+"""
+Diagnosis History Tests
+=======================
+
+Group commit, overflow policy, shutdown flush and row encoding of
+HistoryStore against a temporary SQLite database.
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from utils import DiagnosisPipeline
+from utils.history import HistoryStore
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    from config import DATA_DIR, load_settings
+    return DiagnosisPipeline.from_data_dir(DATA_DIR, load_settings('testing'))
+
+
+def record_many(store, pipeline, count):
+    """Record count distinct diagnoses; returns their symptom vectors"""
+    names = pipeline.registry.names
+    vectors = []
+    for index in range(count):
+        symptoms_data = pipeline.registry.parse({names[index % len(names)]: index % 10 + 1})
+        store.record(pipeline, 37.0, symptoms_data, pipeline.run(37.0, symptoms_data))
+        vectors.append(symptoms_data)
+    return vectors
+
+
+def read_rows(path):
+    with sqlite3.connect(str(path)) as connection:
+        return connection.execute(
+            'SELECT kb_version, temperature, symptoms, diagnoses, overall_severity, critical '
+            'FROM diagnoses ORDER BY id'
+        ).fetchall()
+
+
+def test_rows_are_committed_in_batches(tmp_path, pipeline):
+    path = tmp_path / 'history.sqlite3'
+    # A long flush interval: batches are cut by size, and the last by close()
+    store = HistoryStore(path, queue_size=100, batch_size=3, flush_interval=30.0)
+
+    record_many(store, pipeline, 7)
+    store.close()
+
+    stats = store.stats()
+    assert stats['written'] == 7
+    assert stats['batches'] == 3
+    assert stats['dropped'] == 0
+    assert len(read_rows(path)) == 7
+
+
+def test_full_queue_drops_new_records_and_close_flushes_the_rest(tmp_path, pipeline, monkeypatch):
+    path = tmp_path / 'history.sqlite3'
+    store = HistoryStore(path, queue_size=2, batch_size=10, flush_interval=30.0)
+
+    # Hold the writer back so the queue fills up
+    monkeypatch.setattr(store, '_start', lambda: None)
+    vectors = record_many(store, pipeline, 5)
+    assert store.stats()['queued'] == 2
+    assert store.stats()['dropped'] == 3
+    monkeypatch.undo()
+
+    store._start()
+    store.close()
+
+    assert store.stats()['written'] == 2
+    rows = read_rows(path)
+    assert [row[2] for row in rows] == [bytes(vector.values()) for vector in vectors[:2]]
+
+
+def test_symptoms_blob_decodes_through_the_registry(tmp_path, pipeline):
+    path = tmp_path / 'history.sqlite3'
+    store = HistoryStore(path, batch_size=10, flush_interval=30.0)
+    symptoms_data = pipeline.registry.parse({'fever': 8, 'cough': 5, 'headache': 9})
+    response = pipeline.run(39.5, symptoms_data)
+
+    store.record(pipeline, 39.5, symptoms_data, response)
+    store.close()
+
+    (version, temperature, symptoms, diagnoses, overall_severity, critical), = read_rows(path)
+    with sqlite3.connect(str(path)) as connection:
+        (names,), = connection.execute(
+            'SELECT symptoms FROM symptom_registries WHERE kb_version = ?', (version,)
+        ).fetchall()
+
+    decoded = {name: value for name, value in zip(json.loads(names), symptoms) if value}
+    assert decoded == {'fever': 8, 'cough': 5, 'headache': 9}
+    assert version == pipeline.version
+    assert temperature == 39.5
+    assert json.loads(diagnoses) == [[d['disease'], d['confidence']] for d in response['diagnoses']]
+    assert overall_severity == response['overall_severity']
+    assert critical == int(response['critical_warning'])
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+def test_forked_child_starts_without_the_parent_writer(tmp_path, pipeline):
+    path = tmp_path / 'history.sqlite3'
+    store = HistoryStore(path, batch_size=10, flush_interval=30.0)
+    record_many(store, pipeline, 2)
+    assert store._writer is not None
+
+    pid = os.fork()
+    if pid == 0:
+        # The child must not inherit the parent's writer thread or queue
+        os._exit(0 if store._writer is None and store._queue.qsize() == 0 else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    store.close()
+    assert len(read_rows(path)) == 2
@@ -0,0 +1,45 @@
+"""
+Knowledge Base Tests
+====================
+
+Versioning and hot reload of knowledge base snapshots.
+"""
+
+import json
+
+from utils.kb_artifact import build_artifact
+from utils.knowledge_base import KnowledgeBase, KnowledgeBaseManager
+
+
+def test_recommendations_edit_changes_version_and_swaps(data_dir, settings):
+    manager = KnowledgeBaseManager(data_dir, settings)
+    before = manager.load()
+
+    path = data_dir / 'recommendations.json'
+    config = json.loads(path.read_text(encoding='utf-8'))
+    config['prevention'].append('Stay hydrated')
+    path.write_text(json.dumps(config), encoding='utf-8')
+
+    assert manager.check_for_changes()
+    after = manager.get()
+    assert after.version != before.version
+    response = after.pipeline.run(36.6, after.pipeline.registry.parse({}))
+    assert 'Stay hydrated' in response['recommendations']['prevention']
+
+
+def test_artifact_and_json_agree(data_dir, settings, tmp_path):
+    # Integer weights must come back as integers, or the /model export changes
+    path = data_dir / 'diseases.json'
+    data = json.loads(path.read_text(encoding='utf-8'))
+    symptoms = next(iter(data['diseases'].values()))['symptoms']
+    symptoms[next(iter(symptoms))] = 1
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+    from_json = KnowledgeBase.load(data_dir, settings)
+
+    artifact_path = tmp_path / 'knowledge_base.bin'
+    build_artifact(data_dir, artifact_path)
+    from_artifact = KnowledgeBase.load(data_dir, dict(settings, KB_ARTIFACT_PATH=str(artifact_path)))
+
+    assert from_artifact.version == from_json.version
+    assert from_artifact.pipeline.model().variants['identity'] == from_json.pipeline.model().variants['identity']
@@ -0,0 +1,33 @@
+"""
+Model Parity Tests
+==================
+
+Client-side scoring (static/scorer.js on the /model export) must reproduce
+the server's responses; runs scripts/check_model_parity.py under Node.js.
+"""
+
+import importlib.util
+import shutil
+from pathlib import Path
+
+import pytest
+
+PARITY_SCRIPT = Path(__file__).resolve().parent.parent / 'scripts' / 'check_model_parity.py'
+
+NODE = shutil.which('node')
+
+
+def load_parity_script():
+    spec = importlib.util.spec_from_file_location('check_model_parity', PARITY_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.skipif(NODE is None, reason='Node.js is not installed')
+def test_client_scoring_matches_server(capsys):
+    parity = load_parity_script()
+
+    status = parity.main(['--count', '5000', '--seed', '0', '--node', NODE])
+
+    assert status == 0, capsys.readouterr().out
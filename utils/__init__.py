@@ -8,6 +8,45 @@ Helper modules for the Medical Symptom Checker application.
 from .data_loader import DataLoader
 from .diagnosis_engine import DiagnosisEngine
 from .recommendation_engine import RecommendationEngine
+from .symptom_registry import SymptomRegistry, SymptomVector
+from .vector_engine import VectorizedDiagnosisEngine
+from .pipeline import DiagnosisPipeline, create_diagnosis_engine, create_engines
+from .result_cache import ResultCache
+from .knowledge_base import KnowledgeBase, KnowledgeBaseManager
+from .kb_artifact import build_artifact, load_artifact
+from .metrics import Metrics
+from .sessions import DiagnosisSession, SessionClosed, SessionStore
+from .log_pipeline import LoggingPipeline, configure_logging
+from .assets import StaticAssets, build_assets
+from .model_export import export_model
+from .single_flight import SingleFlight
+from .aggregates import TrafficAggregates
 
-__all__ = ['DataLoader', 'DiagnosisEngine', 'RecommendationEngine']
+__all__ = [
+    'DataLoader',
+    'DiagnosisEngine',
+    'RecommendationEngine',
+    'SymptomRegistry',
+    'SymptomVector',
+    'VectorizedDiagnosisEngine',
+    'DiagnosisPipeline',
+    'create_diagnosis_engine',
+    'create_engines',
+    'ResultCache',
+    'KnowledgeBase',
+    'KnowledgeBaseManager',
+    'build_artifact',
+    'load_artifact',
+    'Metrics',
+    'DiagnosisSession',
+    'SessionClosed',
+    'SessionStore',
+    'LoggingPipeline',
+    'configure_logging',
+    'StaticAssets',
+    'build_assets',
+    'export_model',
+    'SingleFlight',
+    'TrafficAggregates',
+]
 
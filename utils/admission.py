@@ -0,0 +1,184 @@
+"""
+Admission Control Module
+========================
+
+Load shedding in front of /diagnose.
+
+A request is admitted in two steps:
+
+1. A token bucket caps the sustained request rate (``rate`` per second,
+   bursts of up to ``burst``).
+2. A concurrency limit caps the requests being scored at once. Requests over
+   the limit wait in a bounded queue for at most ``queue_timeout`` seconds.
+
+A request that fails either step is rejected at once with the number of
+seconds after which a retry can succeed (sent as a 429 with Retry-After), so
+excess work costs a few microseconds instead of a thread stuck behind a
+queue. Requests whose symptoms already cross a critical threshold of
+recommendations.json skip both steps: they are always admitted, still count
+towards the requests in flight, and never wait.
+"""
+
+from typing import Any, Callable, Dict, Optional
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Reasons a request is shed, as reported by AdmissionRejected and stats()
+REJECT_REASONS = ('rate', 'queue_full', 'queue_timeout')
+
+
+class AdmissionRejected(Exception):
+    """A request was shed; retry after ``retry_after`` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Request rejected ({reason}); retry after {retry_after:.3f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value: whole seconds, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    """Thread-safe token bucket and concurrency limit with a bounded wait queue"""
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        max_concurrency: Optional[int] = None,
+        max_queue: int = 0,
+        queue_timeout: float = 0.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Sustained requests per second (None: no rate limit)
+            burst: Requests admitted back to back after an idle period
+            max_concurrency: Requests admitted at once (None: no limit)
+            max_queue: Requests allowed to wait for a free slot
+            queue_timeout: Seconds a request waits before it is rejected
+            clock: Monotonic clock, in seconds
+        """
+        self.rate = rate or None
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency or None
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._refilled = clock()
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.admitted_critical = 0
+        self.queued = 0
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+
+    def acquire(self, critical: bool = False):
+        """
+        Admit a request or raise AdmissionRejected
+
+        Every successful acquire must be paired with a release().
+
+        Args:
+            critical: Bypass the rate and concurrency limits
+        """
+        with self._condition:
+            if critical:
+                self.active += 1
+                self.admitted_critical += 1
+                return
+
+            if self.rate is not None:
+                retry_after = self._take_token()
+                if retry_after:
+                    self._reject('rate', retry_after)
+
+            if self.max_concurrency is not None and self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    self._refund_token()
+                    self._reject('queue_full', self.queue_timeout)
+                self.waiting += 1
+                self.queued += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.active < self.max_concurrency, self.queue_timeout
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self._refund_token()
+                    self._reject('queue_timeout', self.queue_timeout)
+
+            self.active += 1
+            self.admitted += 1
+
+    def release(self):
+        """Free the slot of an admitted request"""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def _take_token(self) -> float:
+        """Take a token; returns 0, or the seconds until one is available"""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _refund_token(self):
+        # A request shed by the concurrency limit did not use its share of the rate
+        if self.rate is not None:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected[reason] += 1
+        raise AdmissionRejected(reason, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests in flight and waiting, and admit/shed counters"""
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'admitted_critical': self.admitted_critical,
+                'queued': self.queued,
+                'rejected': dict(self.rejected),
+            }
+
+
+def create_admission_controller(settings: Dict[str, Any], wait: bool = True) -> Optional[AdmissionController]:
+    """
+    Build the controller described by the ADMISSION_* settings
+
+    Args:
+        settings: Configuration mapping (e.g. Flask app.config)
+        wait: Whether requests may wait for a slot; servers that score on an
+            event loop pass False and get no concurrency limit
+
+    Returns:
+        AdmissionController, or None when no limit is configured
+    """
+    rate = settings.get('ADMISSION_RATE')
+    max_concurrency = settings.get('ADMISSION_MAX_CONCURRENCY') if wait else None
+    if not rate and not max_concurrency:
+        return None
+    return AdmissionController(
+        rate=rate,
+        burst=settings.get('ADMISSION_BURST', 1),
+        max_concurrency=max_concurrency,
+        max_queue=settings.get('ADMISSION_MAX_QUEUE', 0),
+        queue_timeout=settings.get('ADMISSION_QUEUE_TIMEOUT', 0.0)
+    )
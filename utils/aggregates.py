@@ -0,0 +1,227 @@
+"""
+Traffic Aggregates Module
+=========================
+
+Live, time-bucketed statistics over diagnosis traffic, updated as each
+diagnosis completes.
+
+Time is cut into fixed buckets (``bucket_seconds``, aligned to the epoch so
+that e.g. hourly steps start on the hour), and the last ``bucket_count``
+buckets are kept in a ring buffer. A completed diagnosis adds to the counters
+of the current bucket only:
+
+- requests, critical warnings, and a histogram of ``overall_severity``
+- per disease: how often it was the top diagnosis
+- per symptom: how often it was reported, and the sum of ``overall_severity``
+  of those requests (for the mean severity by symptom)
+
+A bucket is cleared when the ring wraps around to it, so memory is
+O(buckets x (diseases + symptoms)) however much traffic there is, and no raw
+records are kept. Queries merge the buckets inside the requested window.
+
+Counters live in process memory: with several worker processes each one
+reports the traffic it served.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# overall_severity is on a 0-10 scale
+SEVERITY_LEVELS = 11
+
+# Error message for a window or step that is not an integer
+PARAMETERS_ERROR = 'window and step must be whole numbers of seconds'
+
+
+def _format_time(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class _Bucket:
+    """Counters of one time bucket"""
+
+    __slots__ = ('index', 'requests', 'critical', 'severity_counts', 'diseases',
+                 'symptom_counts', 'symptom_severity')
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, index: Optional[int]):
+        self.index = index
+        self.requests = 0
+        self.critical = 0
+        self.severity_counts = [0] * SEVERITY_LEVELS
+        self.diseases = {}
+        self.symptom_counts = {}
+        self.symptom_severity = {}
+
+
+class TrafficAggregates:
+    """Thread-safe ring buffer of per-bucket diagnosis counters"""
+
+    def __init__(
+        self,
+        bucket_seconds: int = 300,
+        bucket_count: int = 288,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            bucket_seconds: Width of one bucket
+            bucket_count: Buckets kept; bucket_seconds x bucket_count is the
+                longest window that can be queried
+            clock: Wall clock, in seconds since the epoch
+        """
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.bucket_count = max(1, int(bucket_count))
+        self._clock = clock
+        self._buckets = [_Bucket() for _ in range(self.bucket_count)]
+        self._lock = threading.Lock()
+
+    @property
+    def retention(self) -> int:
+        """Seconds of traffic kept"""
+        return self.bucket_seconds * self.bucket_count
+
+    def record(self, response: Mapping[str, Any], symptoms_data: Mapping[str, int], names: Sequence[str]):
+        """
+        Add a completed diagnosis to the current bucket
+
+        Args:
+            response: Pipeline response
+            symptoms_data: Validated symptom severities, in registry order
+            names: Symptom names of the registry positions
+        """
+        index = int(self._clock() // self.bucket_seconds)
+        severity = response['overall_severity']
+        diagnoses = response['diagnoses']
+        top = diagnoses[0]['disease'] if diagnoses else None
+
+        with self._lock:
+            bucket = self._buckets[index % self.bucket_count]
+            if bucket.index != index:
+                bucket.reset(index)
+            bucket.requests += 1
+            if response['critical_warning']:
+                bucket.critical += 1
+            bucket.severity_counts[severity] += 1
+            if top is not None:
+                bucket.diseases[top] = bucket.diseases.get(top, 0) + 1
+            symptom_counts = bucket.symptom_counts
+            symptom_severity = bucket.symptom_severity
+            for position, value in enumerate(symptoms_data.values()):
+                if value:
+                    name = names[position]
+                    symptom_counts[name] = symptom_counts.get(name, 0) + 1
+                    symptom_severity[name] = symptom_severity.get(name, 0) + severity
+
+    def query(self, window: int, step: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Aggregates over the most recent window, optionally as a time series
+
+        Args:
+            window: Seconds to cover, ending with the current bucket; rounded
+                up to whole buckets
+            step: Also split the window into consecutive steps of this many
+                seconds (a multiple of bucket_seconds), e.g. 3600 for hourly;
+                the window is then extended back to a step boundary. A step
+                that starts before the oldest bucket kept is marked partial.
+
+        Returns:
+            Summary dictionary; raises ValueError for an invalid window or step
+        """
+        if window <= 0 or window > self.retention:
+            raise ValueError(f"window must be between 1 and {self.retention} seconds")
+        buckets_per_step = None
+        if step is not None:
+            if step <= 0 or step % self.bucket_seconds:
+                raise ValueError(f"step must be a positive multiple of {self.bucket_seconds} seconds")
+            buckets_per_step = step // self.bucket_seconds
+
+        current = int(self._clock() // self.bucket_seconds)
+        oldest = current - self.bucket_count + 1
+        span = -(-window // self.bucket_seconds)
+        first = current - span + 1
+        if buckets_per_step is not None:
+            # Align the window so every step starts on a step boundary
+            first -= first % buckets_per_step
+
+        with self._lock:
+            snapshot = [
+                (bucket.index, bucket.requests, bucket.critical, list(bucket.severity_counts),
+                 dict(bucket.diseases), dict(bucket.symptom_counts), dict(bucket.symptom_severity))
+                for bucket in self._buckets
+                if bucket.index is not None and first <= bucket.index <= current and bucket.requests
+            ]
+
+        # Buckets older than the ring are gone; report only the span still kept
+        summary = self._summarize(snapshot, max(first, oldest), current + 1)
+        if buckets_per_step is not None:
+            series = []
+            for start in range(first, current + 1, buckets_per_step):
+                end = start + buckets_per_step
+                part = [entry for entry in snapshot if start <= entry[0] < end]
+                step_summary = self._summarize(part, max(start, oldest), end)
+                del step_summary['symptoms']
+                step_summary['partial'] = start < oldest
+                series.append(step_summary)
+            summary['series'] = series
+        return summary
+
+    def _summarize(self, entries: List[tuple], first: int, end: int) -> Dict[str, Any]:
+        """Merge bucket snapshots covering bucket indices [first, end)"""
+        requests = critical = 0
+        severity_counts = [0] * SEVERITY_LEVELS
+        diseases = {}
+        symptom_counts = {}
+        symptom_severity = {}
+        for _, bucket_requests, bucket_critical, counts, bucket_diseases, counts_by_symptom, severity_by_symptom in entries:
+            requests += bucket_requests
+            critical += bucket_critical
+            for level, count in enumerate(counts):
+                severity_counts[level] += count
+            for name, count in bucket_diseases.items():
+                diseases[name] = diseases.get(name, 0) + count
+            for name, count in counts_by_symptom.items():
+                symptom_counts[name] = symptom_counts.get(name, 0) + count
+            for name, total in severity_by_symptom.items():
+                symptom_severity[name] = symptom_severity.get(name, 0) + total
+
+        severity_total = sum(level * count for level, count in enumerate(severity_counts))
+        return {
+            'start': _format_time(first * self.bucket_seconds),
+            'end': _format_time(end * self.bucket_seconds),
+            'requests': requests,
+            'critical': critical,
+            'mean_severity': round(severity_total / requests, 2) if requests else None,
+            'severity_histogram': severity_counts,
+            'diseases': {
+                name: {'count': count, 'share': round(count / requests, 4)}
+                for name, count in sorted(diseases.items(), key=lambda item: -item[1])
+            },
+            'symptoms': {
+                name: {'count': count, 'mean_severity': round(symptom_severity[name] / count, 2)}
+                for name, count in sorted(symptom_counts.items(), key=lambda item: -item[1])
+            }
+        }
+
+
+def create_traffic_aggregates(settings: Mapping[str, Any]) -> Optional[TrafficAggregates]:
+    """
+    Build the aggregates described by the AGGREGATE_* settings
+
+    Args:
+        settings: Configuration mapping (e.g. Flask app.config)
+
+    Returns:
+        TrafficAggregates, or None when AGGREGATE_BUCKETS is 0
+    """
+    bucket_count = settings.get('AGGREGATE_BUCKETS', 0)
+    if not bucket_count:
+        return None
+    return TrafficAggregates(settings.get('AGGREGATE_BUCKET_SECONDS', 300), bucket_count)
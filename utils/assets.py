@@ -0,0 +1,304 @@
+"""
+Static Assets Module
+====================
+
+Fingerprinted, precompressed static assets and the cached index page.
+
+Every file in static/ is published under a content-hashed name
+(``style.css`` -> ``style.3f2a9c1be07d.css``), so it can be cached by
+browsers forever (``Cache-Control: immutable``): a changed file gets a new
+URL. Each asset is held in memory in its original form and, for text types,
+gzip- and brotli-compressed; a request gets the smallest variant its
+Accept-Encoding allows. Brotli is optional and only used when the
+``brotli`` package is installed.
+
+The compressed variants are built ahead of time by scripts/build_assets.py.
+Because their file names contain the content hash, a variant that no longer
+matches its source is never found, and missing variants are compressed in
+memory on first use instead.
+
+The rendered index page is kept as an asset as well, with a strong ETag, so
+a returning browser revalidates it with a 304 instead of downloading it.
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Content types worth compressing; images and fonts are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Preferred encoding first
+ENCODINGS = ('br', 'gzip')
+
+FILE_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Characters of the SHA-256 hex digest used in fingerprinted names
+HASH_LENGTH = 12
+
+_brotli = None
+
+
+def load_brotli():
+    """
+    Import brotli on first use
+
+    Returns:
+        The brotli module, or None if it is not installed
+    """
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:  # pragma: no cover - brotli is optional
+            brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def fingerprint(name: str, digest: str) -> str:
+    """Insert the content hash before the extension: app.js -> app.<hash>.js"""
+    stem, dot, suffix = name.rpartition('.')
+    if not dot:
+        return f"{name}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def compress(body: bytes, encoding: str) -> Optional[bytes]:
+    """
+    Compress with the highest compression level
+
+    Returns:
+        Compressed bytes, or None if the encoding is unavailable
+    """
+    if encoding == 'gzip':
+        # mtime=0 keeps the output reproducible
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == 'br':
+        brotli = load_brotli()
+        if brotli is None:
+            return None
+        return brotli.compress(body, quality=11)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def accepted_encodings(header: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse an Accept-Encoding header
+
+    Args:
+        header: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        Encodings the client accepts (q > 0), lower case
+    """
+    if not header:
+        return ()
+    accepted = []
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.append(name)
+    return tuple(accepted)
+
+
+class Asset:
+    """One published file: its content type, ETag and encoded variants"""
+
+    __slots__ = ('name', 'content_type', 'digest', 'variants', 'mtime')
+
+    def __init__(self, name: str, content_type: str, body: bytes, mtime: float = 0.0):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.variants = {'identity': body}
+        self.mtime = mtime
+
+    @property
+    def compressible(self) -> bool:
+        return self.content_type.startswith(COMPRESSIBLE_TYPES)
+
+    @property
+    def url_name(self) -> str:
+        return fingerprint(self.name, self.digest)
+
+    def add_variants(self, prebuilt_dir: Optional[Path] = None):
+        """Attach compressed variants, from prebuilt_dir when present there"""
+        if not self.compressible:
+            return
+        body = self.variants['identity']
+        for encoding in ENCODINGS:
+            encoded = None
+            if prebuilt_dir is not None:
+                path = prebuilt_dir / (self.url_name + FILE_SUFFIXES[encoding])
+                if path.is_file():
+                    encoded = path.read_bytes()
+            if encoded is None:
+                encoded = compress(body, encoding)
+            # Tiny files can grow when compressed
+            if encoded is not None and len(encoded) < len(body):
+                self.variants[encoding] = encoded
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """
+        Pick the variant for a request
+
+        Args:
+            accept_encoding: The request's Accept-Encoding header
+
+        Returns:
+            Tuple of (encoding, body); encoding is 'identity' when uncompressed
+        """
+        if len(self.variants) > 1:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding in ENCODINGS:
+                if encoding in accepted and encoding in self.variants:
+                    return encoding, self.variants[encoding]
+        return 'identity', self.variants['identity']
+
+    def etag(self, encoding: str = 'identity') -> str:
+        """Strong ETag of one variant (each encoding is its own representation)"""
+        return self.digest if encoding == 'identity' else f"{self.digest}-{encoding}"
+
+
+class StaticAssets:
+    """In-memory, fingerprinted copies of the files in a static directory"""
+
+    def __init__(
+        self,
+        static_dir: Path,
+        prebuilt_dir: Optional[Path] = None,
+        url_prefix: str = '/assets/',
+        auto_reload: bool = False
+    ):
+        """
+        Args:
+            static_dir: Directory whose files are published (not recursive)
+            prebuilt_dir: Output directory of scripts/build_assets.py
+            url_prefix: URL path the fingerprinted names are served under
+            auto_reload: Pick up edited files (development servers)
+        """
+        self.static_dir = Path(static_dir)
+        self.prebuilt_dir = Path(prebuilt_dir) if prebuilt_dir is not None else None
+        self.url_prefix = url_prefix
+        self.auto_reload = auto_reload
+        self._assets = None
+        self._by_url = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Asset]:
+        assets = {}
+        for path in sorted(self.static_dir.iterdir()):
+            if not path.is_file():
+                continue
+            assets[path.name] = load_asset(path, self.prebuilt_dir)
+        logger.info(f"Published {len(assets)} static assets from {self.static_dir}")
+        return assets
+
+    def _stale(self) -> bool:
+        for name, asset in self._assets.items():
+            try:
+                if os.stat(self.static_dir / name).st_mtime != asset.mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def assets(self) -> Dict[str, Asset]:
+        """Published assets by source file name, loaded on first use"""
+        assets = self._assets
+        if assets is None or (self.auto_reload and self._stale()):
+            with self._lock:
+                if self._assets is assets:
+                    loaded = self._load()
+                    self._by_url = {asset.url_name: asset for asset in loaded.values()}
+                    self._assets = loaded
+                assets = self._assets
+        return assets
+
+    @property
+    def loaded(self) -> bool:
+        return self._assets is not None
+
+    def url(self, filename: str) -> str:
+        """URL of a static file's current version (plain /static/ URL if unknown)"""
+        asset = self.assets().get(filename)
+        if asset is None:
+            return f"/static/{filename}"
+        return self.url_prefix + asset.url_name
+
+    def get(self, url_name: str) -> Optional[Asset]:
+        """Asset served under a fingerprinted name, or None"""
+        self.assets()
+        return self._by_url.get(url_name)
+
+
+def load_asset(path: Path, prebuilt_dir: Optional[Path] = None) -> Asset:
+    """Read a file into an Asset with its compressed variants"""
+    content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+    asset = Asset(path.name, content_type, path.read_bytes(), path.stat().st_mtime)
+    asset.add_variants(prebuilt_dir)
+    return asset
+
+
+def page_asset(name: str, html: str) -> Asset:
+    """Wrap a rendered page so it is served with an ETag and compressed"""
+    asset = Asset(name, 'text/html', html.encode('utf-8'))
+    asset.add_variants()
+    return asset
+
+
+def build_assets(static_dir: Path, output_dir: Path) -> Iterable[Dict]:
+    """
+    Write fingerprinted files and their compressed variants
+
+    Files in output_dir that no longer belong to a current asset are removed.
+
+    Args:
+        static_dir: Directory with the source files
+        output_dir: Directory to write to (created if needed)
+
+    Returns:
+        One summary dict per asset: name, url_name and size per encoding
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summaries = []
+    written = set()
+    for path in sorted(Path(static_dir).iterdir()):
+        if not path.is_file():
+            continue
+        asset = load_asset(path)
+        sizes = {}
+        for encoding, body in asset.variants.items():
+            filename = asset.url_name + FILE_SUFFIXES.get(encoding, '')
+            _write_atomic(output_dir / filename, body)
+            written.add(filename)
+            sizes[encoding] = len(body)
+        summaries.append({'name': asset.name, 'url_name': asset.url_name, 'sizes': sizes})
+
+    for path in output_dir.iterdir():
+        if path.is_file() and path.name not in written:
+            path.unlink()
+    return summaries
+
+
+def _write_atomic(path: Path, body: bytes):
+    temporary = path.with_name(path.name + '.tmp')
+    temporary.write_bytes(body)
+    os.replace(temporary, path)
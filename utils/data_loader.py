@@ -5,19 +5,41 @@ Data Loader Module
 Handles loading and caching of JSON data files.
 """
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, List, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Files that make up the knowledge base
+DATA_FILES = ('diseases.json', 'recommendations.json')
+
+
+def combine_digests(digests: Dict[str, str]) -> str:
+    """
+    Combine per-file SHA-256 digests into a short knowledge base version
+
+    Args:
+        digests: Mapping of filename to hex digest
+
+    Returns:
+        Short hex digest identifying the whole set of files
+    """
+    combined = hashlib.sha256()
+    for filename in sorted(digests):
+        combined.update(f"{filename}:{digests[filename]}\n".encode('utf-8'))
+    return combined.hexdigest()[:12]
+
+
 class DataLoader:
     """Loads and caches JSON data files"""
 
     def __init__(self, data_dir: Path):
         self.data_dir = data_dir
         self._cache = {}
+        self._digests = {}
 
     def load_json(self, filename: str, use_cache: bool = True) -> Dict[str, Any]:
         """
@@ -37,21 +59,17 @@ class DataLoader:
         file_path = self.data_dir / filename
 
         try:
-            # Log the paths for debugging
-            logger.info(f"Attempting to load: {file_path}")
-            logger.info(f"File exists: {file_path.exists()}")
-            logger.info(f"Data dir exists: {self.data_dir.exists()}")
-            
-            if self.data_dir.exists():
-                logger.info(f"Files in data dir: {list(self.data_dir.iterdir())}")
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            logger.debug(f"Loading {file_path}")
+
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw.decode('utf-8'))
+            self._digests[filename] = hashlib.sha256(raw).hexdigest()
 
             if use_cache:
                 self._cache[filename] = data
 
-            logger.info(f"Loaded {filename} successfully ({len(str(data))} bytes)")
+            logger.info(f"Loaded {filename} successfully ({len(raw)} bytes)")
             return data
 
         except FileNotFoundError:
@@ -71,10 +89,28 @@ class DataLoader:
         data = self.load_json('diseases.json')
         return data.get('diseases', {})
 
+    def get_symptom_schema(self) -> List[str]:
+        """Symptom fields declared in diseases.json, in validation and display order"""
+        data = self.load_json('diseases.json')
+        return list(data.get('symptoms', []))
+
     def get_recommendations_config(self) -> Dict[str, Any]:
         """Load recommendations configuration"""
         return self.load_json('recommendations.json')
 
+    def get_version(self) -> str:
+        """
+        Content hash identifying the data files loaded so far
+
+        Returns:
+            Short hex digest combining the SHA-256 of every loaded file
+        """
+        return combine_digests(self._digests)
+
+    def get_digests(self) -> Dict[str, str]:
+        """SHA-256 of every data file loaded so far"""
+        return dict(self._digests)
+
     def clear_cache(self):
         """Clear the data cache"""
         self._cache.clear()
@@ -3,18 +3,77 @@ Diagnosis Engine Module
 ========================
 
 Core logic for symptom analysis and disease probability calculation.
+
+Disease symptoms are compiled against a SymptomRegistry, so scoring a
+request reads the severities by index instead of looking symptoms up by name.
 """
 
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Any
+import heapq
 import logging
 
+from .symptom_registry import MAX_SEVERITY, MIN_SEVERITY, SymptomRegistry
+
 logger = logging.getLogger(__name__)
 
+# Largest factor adjust_probability_by_temperature can apply
+MAX_TEMPERATURE_MULTIPLIER = 1.2
+
+# Slack for upper-bound pruning: partial scores are accumulated in a different
+# order than calculate_disease_probability, and confidences are rounded to one
+# decimal before ranking
+BOUND_TOLERANCE = 0.05 + 1e-6
+
+# IncrementalDiagnosis updates partial scores by deltas, which lets rounding
+# error accumulate; they are recomputed from scratch after this many updates
+# so the error stays far below BOUND_TOLERANCE
+RESYNC_INTERVAL = 1000
+
+# Symptoms that raise the overall severity on their own
+HIGH_SEVERITY_SYMPTOMS = ('difficulty_breathing', 'chest_pain', 'confusion')
+
+
 class DiagnosisEngine:
     """Handles disease probability calculations and diagnosis"""
 
-    def __init__(self, disease_database: Dict[str, Any]):
+    def __init__(
+        self,
+        disease_database: Dict[str, Any],
+        registry: Optional[SymptomRegistry] = None
+    ):
         self.disease_database = disease_database
+        self.registry = registry or SymptomRegistry.from_knowledge_base(
+            disease_database, rule_symptoms=HIGH_SEVERITY_SYMPTOMS
+        )
+        # Unregistered symptoms can never be reported, so they never count
+        self._high_severity_positions = tuple(
+            self.registry.index[symptom] for symptom in HIGH_SEVERITY_SYMPTOMS
+            if symptom in self.registry
+        )
+        self._build_symptom_index()
+
+    def _build_symptom_index(self):
+        """
+        Compile every disease's symptoms to registry positions and build the
+        symptom position -> [(row, weight)] inverted index over the database
+        """
+        self._diseases = list(self.disease_database.items())
+        self._total_possible = []
+        self._row_symptoms = []
+        self._symptom_index = [[] for _ in range(len(self.registry))]
+
+        for row, (disease_name, disease_info) in enumerate(self._diseases):
+            total_possible = 0
+            row_symptoms = []
+            for symptom, weight in disease_info.get('symptoms', {}).items():
+                position = self.registry.index.get(symptom)
+                if position is None:
+                    raise ValueError(f"Symptom '{symptom}' of {disease_name} is not in the symptom registry")
+                total_possible += weight * 10
+                row_symptoms.append((position, weight, symptom.replace('_', ' ').title()))
+                self._symptom_index[position].append((row, weight))
+            self._total_possible.append(total_possible)
+            self._row_symptoms.append(tuple(row_symptoms))
 
     def calculate_disease_probability(
         self,
@@ -75,58 +134,268 @@ class DiagnosisEngine:
 
         return min(probability, 100)
 
+    def _row_probability(self, row: int, severities: Sequence) -> Tuple[float, List[str]]:
+        """calculate_disease_probability over compiled symptom positions"""
+        matched_score = 0
+        matched_symptoms = []
+
+        for position, weight, label in self._row_symptoms[row]:
+            symptom_value = severities[position]
+            if symptom_value > 0:
+                matched_score += (symptom_value * weight)
+                if symptom_value >= 5:
+                    matched_symptoms.append(label)
+
+        total_possible = self._total_possible[row]
+        probability = (matched_score / total_possible) * 100 if total_possible > 0 else 0
+        return probability, matched_symptoms
+
+    def _match_disease(
+        self,
+        row: int,
+        severities: Sequence,
+        temperature: float,
+        min_confidence: float
+    ) -> Optional[Dict[str, Any]]:
+        """Score a single disease and build its diagnosis entry if above threshold"""
+        disease_name, disease_info = self._diseases[row]
+
+        # Calculate base probability
+        probability, matched_symptoms = self._row_probability(row, severities)
+
+        # Adjust for temperature
+        probability = self.adjust_probability_by_temperature(
+            probability, temperature, disease_info
+        )
+
+        # Only include if above threshold
+        if probability < min_confidence:
+            return None
+
+        return {
+            'disease': disease_name,
+            'description': disease_info.get('description', disease_name),
+            'confidence': round(probability, 1),
+            'urgency': disease_info.get('urgency', 'normal'),
+            'severity': disease_info.get('severity', 'medium'),
+            'matched_symptoms': matched_symptoms,
+            'incubation': disease_info.get('incubation', 'unknown')
+        }
+
     def analyze_symptoms(
         self,
-        symptoms_data: Dict[str, int],
+        symptoms_data: Mapping[str, int],
         temperature: float,
-        min_confidence: float = 20
+        min_confidence: float = 20,
+        limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Analyze symptoms and return potential diagnoses
 
+        Only diseases sharing at least one active symptom with the patient are
+        considered. Their partial score, multiplied by the largest possible
+        temperature adjustment, bounds the final confidence; diseases whose
+        bound cannot reach min_confidence (or the current top ``limit``) are
+        skipped without being scored.
+
         Args:
-            symptoms_data: Dictionary of symptom severities
+            symptoms_data: SymptomVector or dictionary of symptom severities
             temperature: Patient's temperature
             min_confidence: Minimum confidence threshold
+            limit: Maximum number of diagnoses to return (None for all)
 
         Returns:
             List of potential diagnoses sorted by confidence
         """
-        disease_matches = []
-
-        for disease_name, disease_info in self.disease_database.items():
-            # Calculate base probability
-            probability, matched_symptoms = self.calculate_disease_probability(
-                symptoms_data, disease_info
-            )
-
-            # Adjust for temperature
-            probability = self.adjust_probability_by_temperature(
-                probability, temperature, disease_info
-            )
-
-            # Only include if above threshold
-            if probability >= min_confidence:
-                disease_matches.append({
-                    'disease': disease_name,
-                    'description': disease_info.get('description', disease_name),
-                    'confidence': round(probability, 1),
-                    'urgency': disease_info.get('urgency', 'normal'),
-                    'severity': disease_info.get('severity', 'medium'),
-                    'matched_symptoms': matched_symptoms,
-                    'incubation': disease_info.get('incubation', 'unknown')
-                })
+        if limit is not None and limit <= 0:
+            return []
+
+        severities = self.registry.severities(symptoms_data)
+        if min_confidence <= 0:
+            # Diseases without active symptoms also qualify; score them all
+            candidates = ((row, float('inf')) for row in range(len(self._diseases)))
+        else:
+            candidates = self._bounded_candidates(severities, min_confidence)
+
+        heap = []
+        for row, bound in candidates:
+            if limit is not None and len(heap) >= limit and bound < heap[0][0]:
+                continue
+
+            match = self._match_disease(row, severities, temperature, min_confidence)
+            if match is None:
+                continue
+
+            # Ties keep database order, like a stable sort by confidence
+            entry = (match['confidence'], -row, match)
+            if limit is None or len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
 
         # Sort by confidence (highest first)
-        disease_matches.sort(key=lambda x: x['confidence'], reverse=True)
+        disease_matches = [entry[2] for entry in sorted(heap, reverse=True)]
 
-        logger.info(f"Found {len(disease_matches)} potential diagnoses")
+        logger.info("Found %d potential diagnoses", len(disease_matches))
         return disease_matches
 
+    def incremental(
+        self,
+        symptoms_data: Mapping[str, int],
+        temperature: float,
+        min_confidence: float = 20,
+        limit: Optional[int] = None
+    ) -> 'IncrementalDiagnosis':
+        """
+        Start an incrementally updated diagnosis of one patient
+
+        Args:
+            symptoms_data: SymptomVector or dictionary of symptom severities
+            temperature: Patient's temperature
+            min_confidence: Minimum confidence threshold
+            limit: Maximum number of diagnoses to return (None for all)
+
+        Returns:
+            IncrementalDiagnosis whose diagnoses() match analyze_symptoms
+        """
+        return IncrementalDiagnosis(
+            self, self.registry.severities(symptoms_data), temperature, min_confidence, limit
+        )
+
+    def explain(
+        self,
+        symptoms_data: Mapping[str, int],
+        temperature: float,
+        diseases: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Break disease confidences down by symptom and tabulate what-if changes
+
+        ``contributions`` lists the confidence points each active symptom adds
+        to a disease, largest first. ``sensitivity`` gives, for each of the
+        disease's symptoms, the confidence with that symptom set to each
+        severity from 0 to 10 and everything else unchanged, i.e. what
+        re-running analyze_symptoms once per symptom and severity would
+        report, computed in one pass over the disease's weights. The sums run
+        in a different order than analyze_symptoms, so a value can differ from
+        a reported confidence in the last (rounded) digit.
+
+        Args:
+            symptoms_data: SymptomVector or dictionary of symptom severities
+            temperature: Patient's temperature
+            diseases: Names of the diseases to explain (default: all)
+
+        Returns:
+            One dictionary per disease, in the requested order
+        """
+        severities = self.registry.severities(symptoms_data)
+        names = self.registry.names
+        levels = range(MIN_SEVERITY, MAX_SEVERITY + 1)
+
+        explanations = []
+        for row in self._rows(diseases):
+            disease_info = self._diseases[row][1]
+            total_possible = self._total_possible[row]
+            multiplier = self.adjust_probability_by_temperature(1.0, temperature, disease_info)
+            row_symptoms = self._row_symptoms[row]
+            score = self._row_score(row, severities)
+            confidence = self._row_confidence(row, severities, temperature)
+
+            contributions = []
+            sensitivity = {}
+            # Zero-weight diseases always score 0, like _row_probability
+            scale = 100 if total_possible > 0 else 0
+            total_possible = total_possible or 1
+            for position, weight, _ in row_symptoms:
+                value = severities[position]
+                if value > 0:
+                    contributions.append((value * weight / total_possible * scale * multiplier, names[position]))
+                others = score - value * weight
+                grid = [
+                    round(self.adjust_probability_by_temperature(
+                        (others + level * weight) / total_possible * scale, temperature, disease_info
+                    ), 1)
+                    for level in levels
+                ]
+                # The current severity is exactly the reported confidence
+                grid[value - MIN_SEVERITY] = confidence
+                sensitivity[names[position]] = grid
+            explanations.append(self._explanation(row, temperature, confidence, contributions, sensitivity))
+        return explanations
+
+    def _row_score(self, row: int, severities: Sequence) -> float:
+        """Partial score of one disease, summed like _row_probability"""
+        score = 0
+        for position, weight, _ in self._row_symptoms[row]:
+            value = severities[position]
+            if value > 0:
+                score += value * weight
+        return score
+
+    def _row_confidence(self, row: int, severities: Sequence, temperature: float) -> float:
+        """Rounded confidence of one disease, exactly as analyze_symptoms reports it"""
+        probability, _ = self._row_probability(row, severities)
+        probability = self.adjust_probability_by_temperature(
+            probability, temperature, self._diseases[row][1]
+        )
+        return round(probability, 1)
+
+    def _rows(self, diseases: Optional[Iterable[str]]) -> List[int]:
+        """Rows of the named diseases (all rows for None)"""
+        if diseases is None:
+            return list(range(len(self._diseases)))
+        rows = {name: row for row, (name, _) in enumerate(self._diseases)}
+        try:
+            return [rows[name] for name in diseases]
+        except KeyError as e:
+            raise ValueError(f"Unknown disease {e}")
+
+    def _explanation(
+        self,
+        row: int,
+        temperature: float,
+        confidence: float,
+        contributions: List[Tuple[float, str]],
+        sensitivity: Dict[str, List[float]]
+    ) -> Dict[str, Any]:
+        contributions.sort(key=lambda item: item[0], reverse=True)
+        disease_name, disease_info = self._diseases[row]
+        return {
+            'disease': disease_name,
+            'confidence': confidence,
+            'temperature_factor': self.adjust_probability_by_temperature(1.0, temperature, disease_info),
+            'contributions': [
+                {'symptom': symptom, 'points': round(points, 2)} for points, symptom in contributions
+            ],
+            'sensitivity': sensitivity,
+        }
+
+    def _bounded_candidates(self, severities: Sequence, min_confidence: float):
+        """
+        Yield (row, upper_bound) for diseases that can reach min_confidence
+
+        Partial scores are accumulated through the inverted index, so the cost
+        depends on the number of active symptoms rather than the database size.
+        """
+        partial_scores = {}
+        for position, value in enumerate(severities):
+            if value > 0:
+                for row, weight in self._symptom_index[position]:
+                    partial_scores[row] = partial_scores.get(row, 0) + value * weight
+
+        for row, score in partial_scores.items():
+            total_possible = self._total_possible[row]
+            if total_possible <= 0:
+                continue
+            bound = min(score / total_possible * 100 * MAX_TEMPERATURE_MULTIPLIER, 100)
+            bound += BOUND_TOLERANCE
+            if bound >= min_confidence:
+                yield row, bound
+
     def assess_overall_severity(
         self,
         diagnoses: List[Dict[str, Any]],
-        symptoms_data: Dict[str, int],
+        symptoms_data: Mapping[str, int],
         temperature: float
     ) -> int:
         """
@@ -153,17 +422,18 @@ class DiagnosisEngine:
             severity_score += 1
 
         # Critical symptoms
-        high_severity_symptoms = ['difficulty_breathing', 'chest_pain', 'confusion']
-        for symptom in high_severity_symptoms:
-            symptom_value = symptoms_data.get(symptom, 0)
+        severities = self.registry.severities(symptoms_data)
+        for position in self._high_severity_positions:
+            symptom_value = severities[position]
             if symptom_value >= 7:
                 severity_score += 3
             elif symptom_value >= 5:
                 severity_score += 2
 
         # Average symptom severity
-        if symptoms_data:
-            symptom_avg = sum(symptoms_data.values()) / len(symptoms_data)
+        values = symptoms_data.values()
+        if values:
+            symptom_avg = sum(values) / len(values)
             if symptom_avg >= 7:
                 severity_score += 3
             elif symptom_avg >= 5:
@@ -180,3 +450,154 @@ class DiagnosisEngine:
 
         return min(severity_score, 10)
 
+
+
+class IncrementalDiagnosis:
+    """
+    Diagnoses of one patient, kept up to date one change at a time
+
+    Each disease's partial score (sum of severity x weight) is kept and
+    updated by deltas: a symptom change touches only the diseases containing
+    that symptom. The partial scores only select candidates, like the bounds
+    of analyze_symptoms; the diagnoses themselves are scored with the same
+    calculation as analyze_symptoms, so the results are identical to a full
+    rescore. Exact entries are cached until a change affects their disease.
+    """
+
+    def __init__(
+        self,
+        engine: DiagnosisEngine,
+        severities: Sequence,
+        temperature: float,
+        min_confidence: float,
+        limit: Optional[int]
+    ):
+        self.engine = engine
+        self.severities = bytearray(severities)
+        self.temperature = temperature
+        self.min_confidence = min_confidence
+        self.limit = limit
+        self._updates = 0
+        self._resync()
+
+    def _resync(self):
+        """Recompute partial scores and active symptom counts from the severities"""
+        symptom_index = self.engine._symptom_index
+        # row -> partial score and row -> number of active symptoms, for rows
+        # that can qualify
+        self._scores = {}
+        self._active = {}
+        if self.min_confidence <= 0:
+            # Diseases without active symptoms also qualify; track them all
+            self._scores = dict.fromkeys(range(len(self.engine._diseases)), 0)
+            self._active = dict.fromkeys(self._scores, 0)
+
+        for position, value in enumerate(self.severities):
+            if value > 0:
+                for row, weight in symptom_index[position]:
+                    self._scores[row] = self._scores.get(row, 0) + value * weight
+                    self._active[row] = self._active.get(row, 0) + 1
+        self._reestimate()
+
+    def _reestimate(self):
+        """Re-derive every confidence estimate, e.g. after a temperature change"""
+        engine = self.engine
+        # Per row: partial score -> confidence at the current temperature
+        self._factors = [
+            (100 / total_possible if total_possible > 0 else 0)
+            * engine.adjust_probability_by_temperature(1.0, self.temperature, disease_info)
+            for total_possible, (_, disease_info) in zip(engine._total_possible, engine._diseases)
+        ]
+        # row -> diagnosis entry (or None) from the exact calculation
+        self._exact = {}
+        # row -> estimated confidence before rounding
+        factors = self._factors
+        self._estimates = {row: min(score * factors[row], 100) for row, score in self._scores.items()}
+
+    def update(self, changes: Mapping[int, int], temperature: Optional[float] = None):
+        """
+        Apply new severities and/or a new temperature
+
+        Args:
+            changes: Registry position -> new severity (0-10)
+            temperature: New temperature, or None to keep the current one
+        """
+        changed = []
+        for position, value in changes.items():
+            previous = self.severities[position]
+            if previous != value:
+                self.severities[position] = value
+                # (position, severity delta, +1/-1 when the symptom switches on/off)
+                changed.append((position, value - previous, (value > 0) - (previous > 0)))
+        if changed:
+            self._apply(changed)
+
+        if temperature is not None and temperature != self.temperature:
+            self.temperature = temperature
+            self._reestimate()
+
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _apply(self, changed: List[Tuple[int, int, int]]):
+        """Add severity deltas to the partial scores of the affected rows"""
+        scores, active = self._scores, self._active
+        affected = set()
+        for position, delta, switched in changed:
+            for row, weight in self.engine._symptom_index[position]:
+                scores[row] = scores.get(row, 0) + delta * weight
+                active[row] = active.get(row, 0) + switched
+                affected.add(row)
+
+        keep_all = self.min_confidence <= 0
+        exact, estimates, factors = self._exact, self._estimates, self._factors
+        for row in affected:
+            if active[row] == 0:
+                # Exactly zero, dropping accumulated rounding error
+                if keep_all:
+                    scores[row] = 0
+                else:
+                    del scores[row], active[row]
+            exact.pop(row, None)
+            if row in scores:
+                estimates[row] = min(scores[row] * factors[row], 100)
+            else:
+                estimates.pop(row, None)
+
+    def _candidates(self) -> Iterable[int]:
+        """Rows whose estimate can reach the current diagnoses"""
+        # Estimates are within 1e-6 of the exact probability, and within
+        # BOUND_TOLERANCE of the rounded confidence used for ranking
+        cutoff = self.min_confidence - 1e-6
+        if self.limit is not None:
+            top = heapq.nlargest(self.limit, self._estimates.values())
+            if len(top) == self.limit and top[-1] >= self.min_confidence + 1e-6:
+                # ``limit`` diseases surely qualify; nothing estimated more
+                # than 2 x BOUND_TOLERANCE below them can outrank them
+                cutoff = max(cutoff, top[-1] - 2 * BOUND_TOLERANCE)
+        return [row for row, estimate in self._estimates.items() if estimate >= cutoff]
+
+    def diagnoses(self) -> List[Dict[str, Any]]:
+        """Current diagnoses, ranked exactly like analyze_symptoms"""
+        if self.limit is not None and self.limit <= 0:
+            return []
+
+        engine, exact = self.engine, self._exact
+        entries = []
+        for row in self._candidates():
+            if row in exact:
+                match = exact[row]
+            else:
+                match = exact[row] = engine._match_disease(
+                    row, self.severities, self.temperature, self.min_confidence
+                )
+            if match is not None:
+                # Ties keep database order, like a stable sort by confidence
+                entries.append((match['confidence'], -row, match))
+
+        if self.limit is None:
+            ranked = sorted(entries, reverse=True)
+        else:
+            ranked = heapq.nlargest(self.limit, entries)
+        return [entry for _, _, entry in ranked]
@@ -0,0 +1,281 @@
+"""
+Diagnosis History Module
+========================
+
+Write-behind audit log of /diagnose results in a local SQLite database.
+
+The request path only puts a reference to the finished response on a
+bounded in-memory queue. A background writer thread turns queued results
+into rows and inserts them in batches, one transaction per batch (group
+commit): it waits at most ``flush_interval`` seconds after the first queued
+record, or until ``batch_size`` records are queued, before committing. The
+database runs in WAL mode with ``synchronous=NORMAL``, so a commit is one
+sequential append to the write-ahead log, and several server processes can
+write to the same file.
+
+Overflow policy: when the queue is full (the database cannot keep up, or is
+unavailable), new results are dropped, not the queued ones, and counted in
+``dropped``; requests never wait for the database. A warning is logged when
+dropping starts, and again after the writer has caught up and it starts
+again. A batch that fails to insert is logged and counted in ``failed``.
+
+Rows are compact:
+
+- ``symptoms``: the symptom vector packed one byte per severity, in the
+  order of the knowledge base's symptom registry; ``symptom_registries``
+  maps each ``kb_version`` to its symptom names, so rows stay decodable
+  after the knowledge base changes
+- ``diagnoses``: JSON array of ``[disease, confidence]`` pairs, best first
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS diagnoses (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    kb_version TEXT,
+    temperature REAL NOT NULL,
+    symptoms BLOB NOT NULL,
+    diagnoses TEXT NOT NULL,
+    overall_severity INTEGER NOT NULL,
+    critical INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS diagnoses_created ON diagnoses (created);
+CREATE TABLE IF NOT EXISTS symptom_registries (
+    kb_version TEXT PRIMARY KEY,
+    symptoms TEXT NOT NULL
+);
+"""
+
+INSERT_DIAGNOSIS = (
+    "INSERT INTO diagnoses (created, kb_version, temperature, symptoms, diagnoses, overall_severity, critical) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+INSERT_REGISTRY = "INSERT OR IGNORE INTO symptom_registries (kb_version, symptoms) VALUES (?, ?)"
+
+# Milliseconds a writer waits for another process's write lock
+BUSY_TIMEOUT_MS = 5000
+
+_STOP = object()
+
+
+class HistoryStore:
+    """Bounded queue of finished diagnoses and the thread that persists them"""
+
+    def __init__(
+        self,
+        path: Path,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0
+    ):
+        """
+        Args:
+            path: SQLite database file (created with its directory if needed)
+            queue_size: Results waiting for the writer before new ones are dropped
+            batch_size: Most rows inserted per transaction
+            flush_interval: Longest a queued result waits to be committed, in seconds
+        """
+        self.path = Path(path)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self._overflowing = False
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # A writer thread and its connection do not survive fork(); a
+            # child starts its own on its first record
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.close)
+
+    def _reset(self):
+        self._queue = queue.Queue(self.queue_size)
+        self._writer = None
+        self._start_lock = threading.Lock()
+
+    def record(
+        self,
+        pipeline,
+        temperature: float,
+        symptoms_data: Mapping[str, int],
+        response: Dict[str, Any]
+    ):
+        """
+        Queue a finished diagnosis; never blocks
+
+        Args:
+            pipeline: Pipeline of the snapshot that produced the response
+            temperature: Validated temperature
+            symptoms_data: Validated symptom severities
+            response: Pipeline response (read later by the writer, not copied)
+        """
+        if self._writer is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), pipeline, temperature, symptoms_data, response))
+        except queue.Full:
+            self.dropped += 1
+            if not self._overflowing:
+                self._overflowing = True
+                logger.warning(f"History queue full ({self.queue_size} results); dropping new results")
+
+    def _start(self):
+        with self._start_lock:
+            if self._writer is None:
+                writer = threading.Thread(
+                    target=self._run, args=(self._queue,), name='history-writer', daemon=True
+                )
+                writer.start()
+                self._writer = writer
+
+    def close(self, timeout: float = 5.0):
+        """Commit the queued results and stop the writer thread"""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("History writer is not keeping up; queued results are lost at shutdown")
+            return
+        writer.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Queued results and written/batched/dropped/failed counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _run(self, pending: queue.Queue):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = self._connect()
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"History database {self.path} unavailable, results are not recorded: {e}")
+            return
+
+        known_versions = set()
+        stopping = False
+        while not stopping:
+            item = pending.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(connection, batch, known_versions)
+        connection.close()
+
+    def _write(self, connection: sqlite3.Connection, batch: List[Tuple], known_versions: set):
+        """Insert one batch in a single transaction"""
+        try:
+            registries, rows = encode_rows(batch, known_versions)
+            connection.execute('BEGIN')
+            try:
+                if registries:
+                    connection.executemany(INSERT_REGISTRY, registries)
+                connection.executemany(INSERT_DIAGNOSIS, rows)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} history rows: {e}")
+            return
+        known_versions.update(version for version, _ in registries)
+        self.written += len(rows)
+        self.batches += 1
+        self._overflowing = False
+
+
+def encode_rows(batch: Iterable[Tuple], known_versions: set) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    Turn queued results into table rows
+
+    Args:
+        batch: Queued (created, pipeline, temperature, symptoms_data, response) tuples
+        known_versions: Knowledge base versions whose registry is already stored
+
+    Returns:
+        Tuple of (new symptom_registries rows, diagnoses rows)
+    """
+    registries = {}
+    rows = []
+    for created, pipeline, temperature, symptoms_data, response in batch:
+        version = pipeline.version
+        if version not in known_versions and version not in registries:
+            registries[version] = json.dumps(pipeline.registry.names, separators=(',', ':'))
+        rows.append((
+            created,
+            version,
+            temperature,
+            bytes(symptoms_data.values()),
+            json.dumps(
+                [[diagnosis['disease'], diagnosis['confidence']] for diagnosis in response['diagnoses']],
+                ensure_ascii=False, separators=(',', ':')
+            ),
+            response['overall_severity'],
+            int(response['critical_warning'])
+        ))
+    return list(registries.items()), rows
+
+
+def create_history_store(settings: Mapping[str, Any]) -> Optional[HistoryStore]:
+    """
+    Build the store described by the HISTORY_* settings
+
+    Args:
+        settings: Configuration mapping (e.g. Flask app.config)
+
+    Returns:
+        HistoryStore, or None when HISTORY_DB_PATH is unset
+    """
+    path = settings.get('HISTORY_DB_PATH')
+    if not path:
+        return None
+    return HistoryStore(
+        path,
+        queue_size=settings.get('HISTORY_QUEUE_SIZE', 10000),
+        batch_size=settings.get('HISTORY_BATCH_SIZE', 500),
+        flush_interval=settings.get('HISTORY_FLUSH_INTERVAL', 1.0)
+    )
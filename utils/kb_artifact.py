@@ -0,0 +1,266 @@
+"""
+Knowledge Base Artifact Module
+==============================
+
+Versioned binary format for the compiled knowledge base, loaded through a
+read-only memory map so that the weight matrix is used in place (zero-copy)
+and forked or co-located worker processes share one physical copy of it.
+
+File layout (little-endian):
+
+    magic       8 bytes   b'MSCKB\\x00\\x00\\x00'
+    format      uint32    FORMAT_VERSION
+    meta_size   uint32    size of the metadata block
+    metadata    JSON      names, symptom schema, disease fields,
+                          recommendation rules, source file digests and
+                          array offsets
+    padding     to an 8-byte boundary
+    arrays      float64 / int32 / int8 arrays at the offsets listed in metadata
+
+The artifact records the SHA-256 of the JSON files it was built from; it is
+ignored (and the JSON files are parsed instead) when missing, stale or
+written by a different format version.
+"""
+
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import logging
+
+from .data_loader import DataLoader, DATA_FILES
+from .recommendation_engine import RecommendationEngine
+from .vector_engine import CompiledDiseaseMatrix, load_numpy
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MSCKB\x00\x00\x00'
+FORMAT_VERSION = 3
+HEADER = struct.Struct('<8sII')
+
+# Element type of every array section
+ARRAY_TYPES = {
+    'weights': 'd',         # disease x symptom weight matrix, row-major
+    'total_possible': 'd',  # per-disease sum of weight * 10
+    'temp_low': 'd',        # per-disease temperature range
+    'temp_high': 'd',
+    'indptr': 'i',          # per-disease symptom lists (CSR, original order)
+    'indices': 'i',
+    'values': 'd',
+    'integer': 'b',         # 1 where the JSON weight in values was an integer
+}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _file_digest(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def build_artifact(data_dir: Path, output_path: Path) -> Dict[str, Any]:
+    """
+    Compile the JSON knowledge base into a binary artifact
+
+    Args:
+        data_dir: Directory containing the JSON data files
+        output_path: Where to write the artifact (replaced atomically)
+
+    Returns:
+        Summary with version, counts and artifact size
+    """
+    data_loader = DataLoader(data_dir)
+    disease_database = data_loader.get_diseases()
+    recommendations_config = data_loader.get_recommendations_config()
+
+    symptom_names = []
+    symptom_index = {}
+    for disease_info in disease_database.values():
+        for symptom in disease_info.get('symptoms', {}):
+            if symptom not in symptom_index:
+                symptom_index[symptom] = len(symptom_names)
+                symptom_names.append(symptom)
+
+    disease_count = len(disease_database)
+    symptom_count = len(symptom_names)
+    arrays = {name: array(code) for name, code in ARRAY_TYPES.items()}
+    arrays['weights'] = array('d', bytes(8 * disease_count * symptom_count))
+    arrays['indptr'].append(0)
+
+    diseases = []
+    for row, (disease_name, disease_info) in enumerate(disease_database.items()):
+        # Accumulate in the same order as calculate_disease_probability
+        total_possible = 0
+        for symptom, weight in disease_info.get('symptoms', {}).items():
+            arrays['weights'][row * symptom_count + symptom_index[symptom]] = weight
+            arrays['indices'].append(symptom_index[symptom])
+            arrays['values'].append(weight)
+            arrays['integer'].append(isinstance(weight, int))
+            total_possible += weight * 10
+        arrays['indptr'].append(len(arrays['indices']))
+        arrays['total_possible'].append(total_possible)
+
+        temp_range = disease_info.get('temp_range', [0, 100])
+        arrays['temp_low'].append(temp_range[0])
+        arrays['temp_high'].append(temp_range[1])
+
+        diseases.append([disease_name, {k: v for k, v in disease_info.items() if k != 'symptoms'}])
+
+    offsets = {}
+    position = 0
+    for name, values in arrays.items():
+        position = _align(position)
+        offsets[name] = [position, len(values)]
+        position += len(values) * values.itemsize
+
+    metadata = json.dumps({
+        'format': FORMAT_VERSION,
+        'version': data_loader.get_version(),
+        'sources': data_loader.get_digests(),
+        'shape': [disease_count, symptom_count],
+        'symptoms': symptom_names,
+        'symptom_schema': data_loader.get_symptom_schema(),
+        'diseases': diseases,
+        'recommendation_rules': RecommendationEngine.compile_rules(recommendations_config),
+        'arrays': offsets,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    data_start = _align(HEADER.size + len(metadata))
+    temp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(metadata)))
+        f.write(metadata)
+        for name, values in arrays.items():
+            f.write(b'\x00' * (data_start + offsets[name][0] - f.tell()))
+            if sys.byteorder != 'little':
+                values.byteswap()
+            values.tofile(f)
+    os.replace(temp_path, output_path)
+
+    return {
+        'version': data_loader.get_version(),
+        'diseases': disease_count,
+        'symptoms': symptom_count,
+        'bytes': output_path.stat().st_size,
+    }
+
+
+class KnowledgeBaseArtifact:
+    """Memory-mapped view of a compiled knowledge base artifact"""
+
+    def __init__(self, buffer: mmap.mmap, metadata: Dict[str, Any], data_start: int):
+        self.buffer = buffer
+        self.metadata = metadata
+        self.version = metadata['version']
+        self.disease_names = [name for name, _ in metadata['diseases']]
+        self.symptom_names = metadata['symptoms']
+        self.arrays = {
+            name: self._view(name, data_start + offset, count)
+            for name, (offset, count) in metadata['arrays'].items()
+        }
+
+    def _view(self, name: str, offset: int, count: int):
+        """Zero-copy view of one array section"""
+        code = ARRAY_TYPES[name]
+        np = load_numpy()
+        if np is not None:
+            return np.frombuffer(self.buffer, dtype=np.dtype(code).newbyteorder('<'),
+                                 count=count, offset=offset)
+        return memoryview(self.buffer)[offset:offset + count * struct.calcsize(code)].cast(code)
+
+    def _as_list(self, name: str) -> list:
+        return self.arrays[name].tolist()
+
+    def disease_database(self) -> Dict[str, Any]:
+        """Rebuild the disease dictionaries used by DiagnosisEngine"""
+        indptr = self._as_list('indptr')
+        indices = self._as_list('indices')
+        values = self._as_list('values')
+        integer = self._as_list('integer')
+        symptom_names = self.symptom_names
+
+        disease_database = {}
+        for row, (disease_name, fields) in enumerate(self.metadata['diseases']):
+            start, end = indptr[row], indptr[row + 1]
+            # Weights keep their JSON type, so exports match the JSON path
+            symptoms = {
+                symptom_names[indices[position]]: int(values[position]) if integer[position] else values[position]
+                for position in range(start, end)
+            }
+            disease_database[disease_name] = {'symptoms': symptoms, **fields}
+        return disease_database
+
+    def matrix(self) -> CompiledDiseaseMatrix:
+        """Weight matrix backed directly by the memory map"""
+        disease_count, symptom_count = self.metadata['shape']
+        return CompiledDiseaseMatrix(
+            self.disease_names,
+            self.symptom_names,
+            self.arrays['weights'].reshape(disease_count, symptom_count),
+            self.arrays['total_possible'],
+            self.arrays['temp_low'],
+            self.arrays['temp_high']
+        )
+
+    def symptom_schema(self) -> List[str]:
+        """Symptom fields declared in diseases.json"""
+        return self.metadata['symptom_schema']
+
+    def recommendation_rules(self) -> Dict[str, Any]:
+        """Precompiled recommendation rule tables"""
+        return self.metadata['recommendation_rules']
+
+
+def load_artifact(path: Path, data_dir: Path) -> Optional[KnowledgeBaseArtifact]:
+    """
+    Memory-map a knowledge base artifact if it is present and up to date
+
+    Args:
+        path: Artifact file
+        data_dir: Directory of the JSON files the artifact must match
+
+    Returns:
+        KnowledgeBaseArtifact, or None to fall back to the JSON files
+    """
+    if load_numpy() is None and sys.byteorder != 'little':
+        # The memoryview fallback can only read native byte order
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Missing or empty artifact
+        return None
+
+    try:
+        magic, format_version, meta_size = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            logger.warning(f"Ignoring knowledge base artifact {path}: unsupported format")
+            buffer.close()
+            return None
+
+        metadata = json.loads(buffer[HEADER.size:HEADER.size + meta_size].decode('utf-8'))
+
+        for filename in DATA_FILES:
+            if metadata['sources'].get(filename) != _file_digest(data_dir / filename):
+                logger.info(f"Ignoring stale knowledge base artifact {path}: {filename} changed")
+                buffer.close()
+                return None
+
+        return KnowledgeBaseArtifact(buffer, metadata, _align(HEADER.size + meta_size))
+
+    except (struct.error, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable knowledge base artifact {path}: {e}")
+        buffer.close()
+        return None
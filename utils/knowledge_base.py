@@ -0,0 +1,247 @@
+"""
+Knowledge Base Module
+=====================
+
+Immutable snapshots of the loaded knowledge base and a background watcher
+that hot-reloads them when the data files change.
+
+Requests read ``KnowledgeBaseManager.get()`` once and use that snapshot
+until they finish. A reload parses and compiles the new data on the watcher
+thread, then replaces the reference in a single assignment, so the request
+path never takes a lock and in-flight requests complete on the old version.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+import threading
+import logging
+
+from .data_loader import DataLoader, DATA_FILES
+from .kb_artifact import load_artifact
+from .pipeline import DiagnosisPipeline, create_engines
+from .recommendation_engine import RecommendationEngine
+from .result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBase:
+    """Immutable snapshot of the data files and the engines compiled from them"""
+
+    __slots__ = ('version', 'loaded_at', 'disease_count', 'pipeline')
+
+    def __init__(self, version: str, disease_count: int, pipeline: DiagnosisPipeline):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'loaded_at', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        object.__setattr__(self, 'disease_count', disease_count)
+        object.__setattr__(self, 'pipeline', pipeline)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("KnowledgeBase snapshots are immutable")
+
+    @property
+    def diagnosis_engine(self):
+        return self.pipeline.diagnosis_engine
+
+    @property
+    def recommendation_engine(self):
+        return self.pipeline.recommendation_engine
+
+    @classmethod
+    def load(
+        cls,
+        data_dir: Path,
+        settings: Mapping[str, Any],
+        cache: Optional[ResultCache] = None
+    ) -> 'KnowledgeBase':
+        """
+        Load the knowledge base and compile a new snapshot
+
+        A precompiled binary artifact (KB_ARTIFACT_PATH) is memory-mapped when
+        it matches the JSON files; otherwise the JSON files are parsed.
+
+        Args:
+            data_dir: Directory containing the JSON data files
+            settings: Configuration mapping (e.g. Flask app.config)
+            cache: Result cache shared between snapshots
+
+        Returns:
+            KnowledgeBase snapshot
+        """
+        vectorized = settings.get('USE_VECTORIZED_ENGINE', True)
+        artifact_path = settings.get('KB_ARTIFACT_PATH')
+        artifact = load_artifact(Path(artifact_path), data_dir) if artifact_path else None
+
+        if artifact is not None:
+            logger.info(f"Using knowledge base artifact {artifact_path}")
+            version = artifact.version
+            disease_database = artifact.disease_database()
+            diagnosis_engine, recommendation_engine = create_engines(
+                disease_database,
+                artifact.recommendation_rules(),
+                artifact.symptom_schema(),
+                vectorized=vectorized,
+                matrix_factory=artifact.matrix
+            )
+        else:
+            data_loader = DataLoader(data_dir)
+            disease_database = data_loader.get_diseases()
+            recommendation_rules = RecommendationEngine.compile_rules(data_loader.get_recommendations_config())
+            # Only after every data file is read, so the version covers all of them
+            version = data_loader.get_version()
+            diagnosis_engine, recommendation_engine = create_engines(
+                disease_database,
+                recommendation_rules,
+                data_loader.get_symptom_schema(),
+                vectorized=vectorized
+            )
+
+        pipeline = DiagnosisPipeline(
+            diagnosis_engine,
+            recommendation_engine,
+            settings,
+            cache=cache,
+            version=version
+        )
+        return cls(version, len(disease_database), pipeline)
+
+
+class KnowledgeBaseManager:
+    """Holds the active knowledge base snapshot and hot-reloads it on change"""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        settings: Mapping[str, Any],
+        cache: Optional[ResultCache] = None
+    ):
+        self.data_dir = data_dir
+        self.settings = settings
+        self.cache = cache
+        self.current = None
+        self.reload_count = 0
+        self.failed_reloads = 0
+        self._file_stamps = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._load_lock = threading.Lock()
+
+    def load(self) -> KnowledgeBase:
+        """Load the initial snapshot; errors propagate to the caller"""
+        stamps = self._stat_files()
+        self.current = KnowledgeBase.load(self.data_dir, self.settings, self.cache)
+        self._file_stamps = stamps
+        logger.info(
+            f"Knowledge base {self.current.version} loaded "
+            f"({self.current.disease_count} diseases)"
+        )
+        return self.current
+
+    def get(self) -> KnowledgeBase:
+        """
+        Return the active snapshot, loading it on first use
+
+        Only the very first call takes a lock (double-checked); afterwards
+        this is a plain attribute read.
+        """
+        snapshot = self.current
+        if snapshot is None:
+            with self._load_lock:
+                if self.current is None:
+                    self.load()
+                snapshot = self.current
+        return snapshot
+
+    def _stat_files(self) -> Tuple[Tuple[str, int, int], ...]:
+        """Cheap change detector: (name, mtime_ns, size) of every data file"""
+        stamps = []
+        for filename in DATA_FILES:
+            try:
+                stat = (self.data_dir / filename).stat()
+                stamps.append((filename, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append((filename, 0, -1))
+        return tuple(stamps)
+
+    def check_for_changes(self) -> bool:
+        """
+        Reload the knowledge base if any data file changed
+
+        The new snapshot is built without touching the active one; a parse or
+        compile failure is logged and the old snapshot stays live.
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        if self.current is None:
+            # Nothing loaded yet (lazy startup); the first get() loads fresh data
+            return False
+
+        stamps = self._stat_files()
+        if stamps == self._file_stamps:
+            return False
+
+        try:
+            snapshot = KnowledgeBase.load(self.data_dir, self.settings, self.cache)
+        except Exception as e:
+            # Retry only once the files change again
+            self._file_stamps = stamps
+            self.failed_reloads += 1
+            logger.error(f"Knowledge base reload failed, keeping {self.current.version}: {e}")
+            return False
+
+        self._file_stamps = stamps
+        if self.current is not None and snapshot.version == self.current.version:
+            return False
+
+        previous = self.current
+        self.current = snapshot
+        self.reload_count += 1
+        logger.info(
+            f"Knowledge base reloaded: {previous.version if previous else None} -> "
+            f"{snapshot.version} ({snapshot.disease_count} diseases)"
+        )
+
+        if self.cache is not None:
+            self.cache.clear()
+        return True
+
+    def start_watcher(self, interval: float):
+        """Poll the data files every interval seconds on a daemon thread"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name='kb-watcher', daemon=True
+        )
+        self._watcher.start()
+        logger.info(f"Watching {self.data_dir} for knowledge base changes every {interval}s")
+
+    def stop_watcher(self):
+        """Stop the background watcher thread"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                logger.error(f"Knowledge base watcher error: {e}", exc_info=True)
+
+    def status(self) -> Dict[str, Any]:
+        """Describe the active snapshot and reload counters"""
+        if self.current is None:
+            return {'loaded': False, 'watching': self._watcher is not None and self._watcher.is_alive()}
+        return {
+            'loaded': True,
+            'version': self.current.version,
+            'loaded_at': self.current.loaded_at,
+            'disease_count': self.current.disease_count,
+            'reload_count': self.reload_count,
+            'failed_reloads': self.failed_reloads,
+            'watching': self._watcher is not None and self._watcher.is_alive()
+        }
@@ -0,0 +1,215 @@
+"""
+Logging Pipeline Module
+=======================
+
+Non-blocking logging for the request path. Request threads only put the
+log record on a bounded in-memory queue; a background thread formats it and
+writes it to the real handler (stderr).
+
+- Formatting is deferred: hot-path messages use %-style arguments, so the
+  message string is only built by the writer thread, and not at all for
+  records that are filtered or sampled out.
+- The queue is bounded. When it is full the record is dropped and counted,
+  so a slow log sink never applies backpressure to requests.
+- Hot-path loggers can be sampled: with a rate of 0.01 only every 100th
+  INFO/DEBUG record is kept. Warnings and errors are never sampled.
+- Records can be written as text or as one JSON object per line.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Mapping, Optional
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_pipeline = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one compact JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fixed fraction of the INFO and DEBUG records of selected loggers
+
+    Sampling is deterministic (every Nth record), so a rate of 0.01 keeps
+    exactly one record in a hundred. Child loggers inherit their parent's
+    rate unless they have their own.
+    """
+
+    def __init__(self, rates: Mapping[str, float]):
+        super().__init__()
+        # logger name -> keep every Nth record (0 drops them all)
+        self._every = {
+            name: (round(1 / rate) if rate > 0 else 0)
+            for name, rate in rates.items() if rate < 1
+        }
+        self._counters = {}
+        self.sampled_out = 0
+
+    def _interval(self, name: str) -> Optional[int]:
+        while name:
+            if name in self._every:
+                return self._every[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._every:
+            return True
+        every = self._interval(record.name)
+        if every is None:
+            return True
+        if every:
+            counter = self._counters.get(record.name)
+            if counter is None:
+                counter = self._counters.setdefault(record.name, itertools.count())
+            # next() on itertools.count is atomic under the GIL
+            if next(counter) % every == 0:
+                return True
+        self.sampled_out += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats the message here, on the calling thread.
+        # The queue never leaves the process, so the record is passed as is
+        # and the writer thread formats it.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    """QueueListener that waits for room for its stop sentinel"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LoggingPipeline:
+    """The installed handlers, for statistics and shutdown"""
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        sampler: Optional[SamplingFilter] = None,
+        listener: Optional[QueueListener] = None
+    ):
+        self.handler = handler
+        self.sampler = sampler
+        self.listener = listener
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counts of dropped and sampled-out records"""
+        log_queue = getattr(self.handler, 'queue', None)
+        return {
+            'async': self.listener is not None,
+            'queued': log_queue.qsize() if log_queue is not None else 0,
+            'dropped': getattr(self.handler, 'dropped', 0),
+            'sampled_out': self.sampler.sampled_out if self.sampler is not None else 0,
+        }
+
+    def stop(self):
+        """Flush queued records and stop the writer thread"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def start(self):
+        """Restart the writer thread after stop(), e.g. in a forked worker"""
+        if self.listener is not None and self.listener._thread is None:
+            self.listener.start()
+
+
+def configure_logging(settings: Mapping[str, Any], force: bool = False) -> LoggingPipeline:
+    """
+    Install the logging pipeline on the root logger
+
+    Like logging.basicConfig, nothing is changed when the root logger already
+    has handlers (e.g. configured by the hosting server) unless force is set.
+    Calling it again returns the pipeline installed first.
+
+    Args:
+        settings: Application settings (LOG_LEVEL, LOG_FORMAT, LOG_ASYNC,
+                  LOG_QUEUE_SIZE, LOG_SAMPLE_RATES)
+        force: Replace existing root handlers
+
+    Returns:
+        LoggingPipeline of the installed handler
+    """
+    global _pipeline
+    root = logging.getLogger()
+    if _pipeline is not None and not force:
+        return _pipeline
+
+    if root.handlers and not force:
+        # Leave the host's configuration alone
+        _pipeline = LoggingPipeline(root.handlers[0])
+        return _pipeline
+
+    if settings['LOG_FORMAT'] == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    if _pipeline is not None:
+        _pipeline.stop()
+
+    sampler = SamplingFilter(settings['LOG_SAMPLE_RATES']) if settings['LOG_SAMPLE_RATES'] else None
+    listener = None
+    if settings['LOG_ASYNC']:
+        log_queue = queue.Queue(settings['LOG_QUEUE_SIZE'])
+        handler = DroppingQueueHandler(log_queue)
+        listener = _Listener(log_queue, stream_handler)
+        listener.start()
+    else:
+        # Serverless functions are frozen between requests, which would
+        # strand queued records, so they write synchronously
+        handler = stream_handler
+    if sampler is not None:
+        handler.addFilter(sampler)
+
+    root.addHandler(handler)
+    root.setLevel(settings['LOG_LEVEL'])
+
+    _pipeline = LoggingPipeline(handler, sampler, listener)
+    atexit.register(_pipeline.stop)
+    return _pipeline
@@ -0,0 +1,227 @@
+"""
+Metrics Module
+==============
+
+Low-overhead request instrumentation: per-stage monotonic timers, histograms
+and counters, rendered in the Prometheus text exposition format.
+
+Every thread records into its own shard, so the request path never takes a
+lock; shards are only merged when /metrics is scraped. Shards of threads that
+have exited are folded into a retired shard at scrape time, so thread-per-
+request servers do not grow the shard list without bound.
+"""
+
+from bisect import bisect_left
+from time import perf_counter_ns
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import weakref
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (50us .. 2.5s)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+METRIC_PREFIX = 'symptom_checker_'
+
+# HELP text of the metrics recorded through Metrics
+METRIC_HELP = {
+    'requests_total': 'Requests handled, by endpoint and status code',
+    'errors_total': 'Requests that failed, by endpoint and exception type',
+    'batch_records_total': 'Records processed by /diagnose/batch',
+    'stage_seconds': 'Time spent in each request stage',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class StageTimer:
+    """Splits one request into consecutive, named stages"""
+
+    __slots__ = ('start', 'last', 'stages')
+
+    def __init__(self):
+        self.start = self.last = perf_counter_ns()
+        self.stages = []
+
+    def mark(self, stage: str):
+        """Close the current stage: time since the previous mark goes to ``stage``"""
+        now = perf_counter_ns()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def total_ns(self) -> int:
+        return self.last - self.start
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f"{stage};dur={duration / 1e6:.3f}" for stage, duration in self.stages]
+        entries.append(f"total;dur={self.total_ns() / 1e6:.3f}")
+        return ', '.join(entries)
+
+
+class _Shard:
+    """Counters and histograms written by a single thread"""
+
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def merge_into(self, counters: Dict, histograms: Dict, bucket_count: int):
+        for key, value in list(self.counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, (counts, total) in list(self.histograms.items()):
+            merged = histograms.setdefault(key, [[0] * bucket_count, 0.0])
+            for i, count in enumerate(counts):
+                merged[0][i] += count
+            merged[1] += total
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Metrics:
+    """Per-thread sharded request metrics"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard()
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            return shard
+
+    def timer(self) -> StageTimer:
+        """Start timing a request"""
+        return StageTimer()
+
+    def increment(self, name: str, labels: Labels = (), amount: int = 1):
+        """Add to a counter"""
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name: str, labels: Labels, seconds: float):
+        """Record one histogram observation"""
+        histograms = self._shard().histograms
+        entry = histograms.get((name, labels))
+        if entry is None:
+            entry = histograms[(name, labels)] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, seconds)] += 1
+        entry[1] += seconds
+
+    def record_request(
+        self,
+        endpoint: str,
+        status: int,
+        timer: Optional[StageTimer] = None,
+        error: Optional[BaseException] = None
+    ):
+        """
+        Record a finished request: its status, error type and stage timings
+
+        Args:
+            endpoint: Request path
+            status: HTTP status code
+            timer: Stage timer of the request, if it was timed
+            error: Exception that failed the request
+        """
+        self.increment('requests_total', (('endpoint', endpoint), ('status', str(status))))
+        if error is not None:
+            self.increment('errors_total', (('endpoint', endpoint), ('type', type(error).__name__)))
+        if timer is not None:
+            for stage, duration in timer.stages:
+                self.observe('stage_seconds', (('stage', stage),), duration / 1e9)
+            self.observe('stage_seconds', (('stage', 'total'),), timer.total_ns() / 1e9)
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        """Merge all shards into (counters, histograms)"""
+        bucket_count = len(self.buckets) + 1
+        counters, histograms = {}, {}
+        with self._lock:
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    # The owning thread is gone and can no longer write
+                    shard.merge_into(self._retired.counters, self._retired.histograms, bucket_count)
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            self._retired.merge_into(counters, histograms, bucket_count)
+            for _, shard in live:
+                shard.merge_into(counters, histograms, bucket_count)
+        return counters, histograms
+
+    def render(self, gauges: Iterable[Tuple[str, str, str, Labels, float]] = ()) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+
+        Args:
+            gauges: Extra samples as (name, type, help, labels, value), e.g.
+                cache and knowledge base statistics
+
+        Returns:
+            Exposition text
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+
+        by_name = {}
+        for (name, labels), value in sorted(counters.items()):
+            by_name.setdefault(name, []).append((labels, value))
+        for name, samples in by_name.items():
+            lines.extend(_header(name, 'counter', METRIC_HELP.get(name, name)))
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+
+        by_name = {}
+        for (name, labels), entry in sorted(histograms.items()):
+            by_name.setdefault(name, []).append((labels, entry))
+        for name, samples in by_name.items():
+            lines.extend(_header(name, 'histogram', METRIC_HELP.get(name, name)))
+            for labels, (counts, total) in samples:
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels, f'le="{bound}"')
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{bucket_labels} {cumulative}")
+                cumulative += counts[-1]
+                bucket_labels = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total:.9f}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {cumulative}")
+
+        seen = set()
+        for name, metric_type, help_text, labels, value in gauges:
+            if name not in seen:
+                lines.extend(_header(name, metric_type, help_text))
+                seen.add(name)
+            lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def _header(name: str, metric_type: str, help_text: str) -> List[str]:
+    return [
+        f"# HELP {METRIC_PREFIX}{name} {help_text}",
+        f"# TYPE {METRIC_PREFIX}{name} {metric_type}",
+    ]
@@ -0,0 +1,100 @@
+"""
+Model Export Module
+===================
+
+Compact, versioned export of a compiled knowledge base for client-side
+scoring.
+
+The diagnosis and recommendation rules are deterministic and small, so the
+web interface can score a record in the browser (static/scorer.js) while the
+sliders move, and only ask the server for the authoritative result on
+submit. The export holds everything the scorer needs, already resolved to
+symptom registry positions:
+
+- ``symptoms`` and ``labels``: registry names and their display labels
+- ``diseases``: one row per disease, in database order:
+  ``[name, description, urgency, severity, incubation, temp_range,
+  total_possible, [position, weight, position, weight, ...]]``
+- ``recommendations``: the compiled rule tables of RecommendationEngine
+- ``settings``: confidence threshold, result limit and temperature range
+
+It is served as compact JSON whose strong ETag is its content hash; a
+reloaded knowledge base (or changed settings) gives a new ETag.
+"""
+
+from typing import Any, Dict
+import json
+
+from .assets import Asset
+from .diagnosis_engine import HIGH_SEVERITY_SYMPTOMS
+from .recommendation_engine import EMERGENCY_HEADER
+
+# Bumped when the layout of the export changes
+MODEL_FORMAT = 1
+
+
+def export_model(pipeline) -> Dict[str, Any]:
+    """
+    Describe a pipeline's engines as JSON-serializable rule tables
+
+    Args:
+        pipeline: DiagnosisPipeline of a knowledge base snapshot
+
+    Returns:
+        Model dictionary, see the module docstring
+    """
+    registry = pipeline.registry
+    index = registry.index
+
+    diseases = []
+    for disease_name, disease_info in pipeline.diagnosis_engine.disease_database.items():
+        weights = []
+        total_possible = 0
+        for symptom, weight in disease_info.get('symptoms', {}).items():
+            total_possible += weight * 10
+            weights.extend((index[symptom], weight))
+        diseases.append([
+            disease_name,
+            disease_info.get('description', disease_name),
+            disease_info.get('urgency', 'normal'),
+            disease_info.get('severity', 'medium'),
+            disease_info.get('incubation', 'unknown'),
+            list(disease_info.get('temp_range', [0, 100])),
+            total_possible,
+            weights
+        ])
+
+    return {
+        'format': MODEL_FORMAT,
+        'kb_version': pipeline.version,
+        'symptoms': list(registry.names),
+        'labels': [name.replace('_', ' ').title() for name in registry.names],
+        'high_severity': [index[symptom] for symptom in HIGH_SEVERITY_SYMPTOMS if symptom in index],
+        'settings': {
+            'min_confidence': pipeline.min_confidence,
+            'max_results': pipeline.max_results,
+            'min_temperature': pipeline.min_temperature,
+            'max_temperature': pipeline.max_temperature
+        },
+        'diseases': diseases,
+        'recommendations': {
+            **pipeline.recommendation_engine.rules,
+            'emergency_header': EMERGENCY_HEADER
+        }
+    }
+
+
+def model_asset(pipeline) -> Asset:
+    """
+    Encode a pipeline's model export for serving
+
+    Args:
+        pipeline: DiagnosisPipeline of a knowledge base snapshot
+
+    Returns:
+        Asset with compact JSON and its compressed variants
+    """
+    body = json.dumps(export_model(pipeline), ensure_ascii=False, separators=(',', ':'))
+    asset = Asset('model.json', 'application/json', body.encode('utf-8'))
+    asset.add_variants()
+    return asset
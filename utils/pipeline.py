@@ -0,0 +1,359 @@
+"""
+Diagnosis Pipeline Module
+=========================
+
+Validation and end-to-end diagnosis of a single symptom record, shared by the
+web application and the offline bulk scoring tools.
+
+The accepted symptom fields come from the knowledge base's SymptomRegistry;
+a validated record is a SymptomVector that both engines read by index.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterable, List, Mapping, Optional, Tuple
+import logging
+
+from .assets import Asset
+from .data_loader import DataLoader
+from .diagnosis_engine import DiagnosisEngine
+from .metrics import StageTimer
+from .model_export import model_asset
+from .recommendation_engine import RecommendationEngine
+from .result_cache import ResultCache, make_cache_key
+from .serialization import ResponseEncoder, current_timestamp
+from .symptom_registry import SymptomRegistry, SymptomVector
+from .vector_engine import CompiledDiseaseMatrix, VectorizedDiagnosisEngine
+
+logger = logging.getLogger(__name__)
+
+
+def create_diagnosis_engine(
+    disease_database: Dict[str, Any],
+    vectorized: bool = True,
+    matrix_factory: Optional[Callable[[], CompiledDiseaseMatrix]] = None,
+    registry: Optional[SymptomRegistry] = None
+) -> DiagnosisEngine:
+    """
+    Build the best available diagnosis engine
+
+    Args:
+        disease_database: Disease configuration from database
+        vectorized: Prefer the NumPy engine when NumPy is installed
+        matrix_factory: Supplies a precompiled weight matrix (e.g. memory-mapped)
+        registry: Symptom registry shared with the recommendation engine
+
+    Returns:
+        DiagnosisEngine instance
+    """
+    if vectorized and VectorizedDiagnosisEngine.is_available():
+        matrix = matrix_factory() if matrix_factory is not None else None
+        return VectorizedDiagnosisEngine(disease_database, matrix=matrix, registry=registry)
+    return DiagnosisEngine(disease_database, registry=registry)
+
+
+def create_engines(
+    disease_database: Dict[str, Any],
+    recommendation_rules: Dict[str, Any],
+    symptom_schema: Iterable[str] = (),
+    vectorized: bool = True,
+    matrix_factory: Optional[Callable[[], CompiledDiseaseMatrix]] = None
+) -> Tuple[DiagnosisEngine, RecommendationEngine]:
+    """
+    Build both engines over one symptom registry derived from the data
+
+    Args:
+        disease_database: Disease configuration from database
+        recommendation_rules: Rule tables from RecommendationEngine.compile_rules
+        symptom_schema: Symptom fields declared in diseases.json
+        vectorized: Prefer the NumPy engine when NumPy is installed
+        matrix_factory: Supplies a precompiled weight matrix (e.g. memory-mapped)
+
+    Returns:
+        Tuple of (diagnosis engine, recommendation engine)
+    """
+    registry = SymptomRegistry.from_knowledge_base(
+        disease_database, symptom_schema, RecommendationEngine.rule_symptoms(recommendation_rules)
+    )
+    diagnosis_engine = create_diagnosis_engine(
+        disease_database, vectorized=vectorized, matrix_factory=matrix_factory, registry=registry
+    )
+    return diagnosis_engine, RecommendationEngine.from_rules(recommendation_rules, registry)
+
+
+class DiagnosisPipeline:
+    """Validates symptom records and runs them through both engines"""
+
+    def __init__(
+        self,
+        diagnosis_engine: DiagnosisEngine,
+        recommendation_engine: RecommendationEngine,
+        settings: Mapping[str, Any],
+        cache: Optional[ResultCache] = None,
+        version: Optional[str] = None
+    ):
+        self.diagnosis_engine = diagnosis_engine
+        self.recommendation_engine = recommendation_engine
+        self.registry = diagnosis_engine.registry
+        if recommendation_engine.registry is not self.registry:
+            # Engines built separately: accept every symptom either one knows;
+            # each engine then maps the record onto its own registry
+            self.registry = SymptomRegistry(
+                dict.fromkeys(self.registry.names + recommendation_engine.registry.names)
+            )
+        self.min_temperature = settings['MIN_TEMPERATURE']
+        self.max_temperature = settings['MAX_TEMPERATURE']
+        self.min_confidence = settings['MIN_CONFIDENCE_THRESHOLD']
+        self.max_results = settings['MAX_RESULTS']
+        self.cache = cache
+        self.cache_precision = settings.get('RESULT_CACHE_TEMPERATURE_PRECISION', 1)
+        self.version = version
+        # Cache keys are namespaced by knowledge base version so results
+        # computed against an older snapshot can never be served
+        self._cache_namespace = (version or '').encode('ascii')
+        self.encoder = ResponseEncoder(diagnosis_engine.disease_database)
+        self._model_asset = None
+
+    @classmethod
+    def from_data_dir(cls, data_dir: Path, settings: Mapping[str, Any]) -> 'DiagnosisPipeline':
+        """
+        Load the knowledge base from disk and build a pipeline
+
+        Args:
+            data_dir: Directory containing diseases.json and recommendations.json
+            settings: Configuration mapping (e.g. Flask app.config)
+
+        Returns:
+            DiagnosisPipeline instance
+        """
+        data_loader = DataLoader(data_dir)
+        diagnosis_engine, recommendation_engine = create_engines(
+            data_loader.get_diseases(),
+            RecommendationEngine.compile_rules(data_loader.get_recommendations_config()),
+            data_loader.get_symptom_schema(),
+            vectorized=settings.get('USE_VECTORIZED_ENGINE', True)
+        )
+        return cls(diagnosis_engine, recommendation_engine, settings, version=data_loader.get_version())
+
+    def validate(self, data: Dict[str, Any]) -> Tuple[float, SymptomVector]:
+        """
+        Validate and extract symptom data from a patient record
+
+        Args:
+            data: Patient record (request JSON, CSV row, ...)
+
+        Returns:
+            Tuple of (temperature, symptoms_data) or raises ValueError;
+            symptoms_data holds every registered symptom
+        """
+        try:
+            temperature = self._validate_temperature(data.get('temperature', 36.6))
+
+            # Extract all symptoms and validate their ranges (0-10)
+            return temperature, self.registry.parse(data)
+
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid input data: {str(e)}")
+
+    def validate_changes(self, data: Dict[str, Any]) -> Tuple[Optional[float], Dict[int, int]]:
+        """
+        Validate a partial record: only the fields that changed
+
+        Args:
+            data: Changed fields, e.g. {"cough": 6} or {"temperature": 38.4}
+
+        Returns:
+            Tuple of (temperature or None, {registry position: severity})
+            or raises ValueError
+        """
+        try:
+            temperature = None
+            if 'temperature' in data:
+                temperature = self._validate_temperature(data['temperature'])
+            symptoms = {name: value for name, value in data.items() if name != 'temperature'}
+            return temperature, self.registry.parse_changes(symptoms)
+
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid input data: {str(e)}")
+
+    def is_critical(self, data: Any) -> bool:
+        """
+        Cheap pre-check of an unvalidated record for critical symptoms
+
+        Args:
+            data: Patient record (request JSON)
+
+        Returns:
+            True if the record trips a critical rule of recommendations.json;
+            malformed records are never critical (validation rejects them)
+        """
+        if not isinstance(data, Mapping):
+            return False
+        try:
+            temperature = float(data.get('temperature', 36.6))
+        except (TypeError, ValueError):
+            return False
+        return self.recommendation_engine.is_critical(data, temperature)
+
+    def _validate_temperature(self, value: Any) -> float:
+        temperature = float(value)
+
+        # Validate temperature range
+        if not (self.min_temperature <= temperature <= self.max_temperature):
+            raise ValueError(
+                f"Temperature must be between {self.min_temperature}°C and {self.max_temperature}°C"
+            )
+        return temperature
+
+    def run(
+        self,
+        temperature: float,
+        symptoms_data: Mapping[str, int],
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the diagnosis pipeline for one validated symptom record
+
+        When a result cache is attached, identical records are served from it.
+        Cached responses share their nested lists and must not be mutated;
+        only the timestamp is regenerated.
+
+        Args:
+            temperature: Patient's temperature
+            symptoms_data: Validated symptom severities
+            timer: Records per-stage timings when metrics are enabled
+
+        Returns:
+            Response dictionary with diagnoses and recommendations
+        """
+        timestamp = current_timestamp()
+
+        if self.cache is None:
+            return self._compute(temperature, symptoms_data, timestamp, timer)
+
+        key = make_cache_key(temperature, symptoms_data, self.cache_precision)
+        if key is None:
+            return self._compute(temperature, symptoms_data, timestamp, timer)
+        key = self._cache_namespace + key
+
+        cached = self.cache.get(key)
+        if timer is not None:
+            timer.mark('cache')
+        if cached is not None:
+            return {**cached, 'timestamp': timestamp}
+
+        response = self._compute(temperature, symptoms_data, timestamp, timer)
+        self.cache.put(key, response)
+        return response
+
+    def _compute(
+        self,
+        temperature: float,
+        symptoms_data: Mapping[str, int],
+        timestamp: str,
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
+        """Score one record through both engines"""
+        # Perform diagnosis, keeping only the top max results
+        diagnoses = self.diagnosis_engine.analyze_symptoms(
+            symptoms_data,
+            temperature,
+            min_confidence=self.min_confidence,
+            limit=self.max_results
+        )
+        if timer is not None:
+            timer.mark('analyze')
+
+        return self.build_response(temperature, symptoms_data, diagnoses, timestamp, timer)
+
+    def build_response(
+        self,
+        temperature: float,
+        symptoms_data: Mapping[str, int],
+        diagnoses: List[Dict[str, Any]],
+        timestamp: str,
+        timer: Optional[StageTimer] = None
+    ) -> Dict[str, Any]:
+        """
+        Assess severity and recommendations for already ranked diagnoses
+
+        Args:
+            temperature: Patient's temperature
+            symptoms_data: Validated symptom severities
+            diagnoses: Output of analyze_symptoms (or an IncrementalDiagnosis)
+            timestamp: Response timestamp
+            timer: Records per-stage timings when metrics are enabled
+
+        Returns:
+            Response dictionary with diagnoses and recommendations
+        """
+        # Assess overall severity
+        overall_severity = self.diagnosis_engine.assess_overall_severity(
+            diagnoses, symptoms_data, temperature
+        )
+        if timer is not None:
+            timer.mark('severity')
+
+        # Generate recommendations
+        recommendations = self.recommendation_engine.generate_recommendations(
+            diagnoses, symptoms_data, temperature
+        )
+        if timer is not None:
+            timer.mark('recommend')
+
+        # Calculate symptom summary
+        active_symptoms = [value for value in symptoms_data.values() if value > 0]
+        symptom_avg = sum(active_symptoms) / len(active_symptoms) if active_symptoms else 0
+
+        return {
+            'diagnoses': diagnoses,
+            'overall_severity': overall_severity,
+            'symptom_average': round(symptom_avg, 1),
+            'temperature': temperature,
+            'active_symptom_count': len(active_symptoms),
+            'recommendations': recommendations,
+            'timestamp': timestamp,
+            'critical_warning': len(recommendations.get('immediate', [])) > 0,
+            'kb_version': self.version
+        }
+
+    def explain(
+        self,
+        temperature: float,
+        symptoms_data: Mapping[str, int],
+        diagnoses: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-symptom contributions and what-if sensitivity of reported diagnoses
+
+        Args:
+            temperature: Patient's temperature
+            symptoms_data: Validated symptom severities
+            diagnoses: Diagnoses of the response being explained
+
+        Returns:
+            One explanation per diagnosis, see DiagnosisEngine.explain
+        """
+        return self.diagnosis_engine.explain(
+            symptoms_data, temperature, [diagnosis['disease'] for diagnosis in diagnoses]
+        )
+
+    def model(self) -> Asset:
+        """
+        Compact model export for client-side scoring, built on first use
+
+        Returns:
+            Asset holding the export JSON (see utils/model_export.py)
+        """
+        asset = self._model_asset
+        if asset is None:
+            asset = self._model_asset = model_asset(self)
+        return asset
+
+    def encode(self, response: Dict[str, Any]) -> bytes:
+        """Encode a response as compact JSON, byte-identical to jsonify"""
+        return self.encoder.encode(response)
+
+    def diagnose(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a patient record and run the full pipeline on it"""
+        temperature, symptoms_data = self.validate(data)
+        return self.run(temperature, symptoms_data)
@@ -3,69 +3,269 @@ Recommendation Engine Module
 =============================
 
 Generates personalized medical recommendations based on diagnosis and symptoms.
+
+The JSON configuration is compiled at load time into flat threshold tables.
+Evaluating a request yields a bitmask of fired rules, and the assembled
+recommendation lists are memoized per bitmask; the {temp} placeholder is
+filled in last. Rule symptoms are resolved to SymptomRegistry positions, so
+rules read a request's severities by index.
 """
 
-from typing import Dict, List, Any
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Any
 import logging
 
+from .symptom_registry import SymptomRegistry
+
 logger = logging.getLogger(__name__)
 
+# Upper bound on memoized recommendation plans before the memo is reset
+MAX_MEMOIZED_PLANS = 4096
+
+EMERGENCY_HEADER = "🚨 SEEK EMERGENCY MEDICAL CARE IMMEDIATELY"
+
+
 class RecommendationEngine:
-    """Generates personalized recommendations"""
+    """Generates personalized recommendations from compiled rule tables"""
 
-    def __init__(self, recommendations_config: Dict[str, Any]):
+    def __init__(
+        self,
+        recommendations_config: Dict[str, Any],
+        registry: Optional[SymptomRegistry] = None
+    ):
         self.config = recommendations_config
+        self._load_rules(self.compile_rules(recommendations_config), registry)
+
+    @classmethod
+    def from_rules(
+        cls,
+        rules: Dict[str, Any],
+        registry: Optional[SymptomRegistry] = None
+    ) -> 'RecommendationEngine':
+        """
+        Build an engine from rule tables produced by compile_rules
+
+        Args:
+            rules: Compiled rule tables (e.g. read back from a KB artifact)
+            registry: Symptom registry shared with the diagnosis engine
+
+        Returns:
+            RecommendationEngine instance
+        """
+        engine = cls.__new__(cls)
+        engine.config = None
+        engine._load_rules(rules, registry)
+        return engine
+
+    @staticmethod
+    def rule_symptoms(rules: Dict[str, Any]) -> List[str]:
+        """
+        Symptoms referenced by compiled rule tables, in first-seen order
+
+        Args:
+            rules: Compiled rule tables
+
+        Returns:
+            List of symptom names
+        """
+        symptoms = [symptom for _, symptom, _, _ in rules['critical'] if symptom is not None]
+        symptoms.extend(symptom for symptom, _, _ in rules['symptom_rules'])
+        symptoms.extend(rules['general']['symptoms'])
+        return list(dict.fromkeys(symptoms))
+
+    @staticmethod
+    def compile_rules(recommendations_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compile the JSON configuration into flat, JSON-serializable rule tables
+
+        Args:
+            recommendations_config: Recommendations configuration
+
+        Returns:
+            Dictionary of rule tables
+        """
+        critical_config = recommendations_config.get('critical_symptoms', {})
+
+        # Critical rules: [temp_threshold, symptom, symptom_threshold, message].
+        # High fever is always checked first, then the other rules in order.
+        critical = []
+        if 'high_fever' in critical_config:
+            high_fever = critical_config['high_fever']
+            critical.append([high_fever.get('threshold', 40.0), None, None, high_fever['message']])
+        for key, config in critical_config.items():
+            if key == 'high_fever' or 'symptom' not in config:
+                continue
+            if 'temp_threshold' in config or 'symptom_threshold' in config:
+                # Combined rule, e.g. high fever with severe headache
+                critical.append([
+                    config.get('temp_threshold', 39.4),
+                    config['symptom'],
+                    config.get('symptom_threshold', 8),
+                    config['message']
+                ])
+            else:
+                critical.append([None, config['symptom'], config.get('threshold', 7), config['message']])
+
+        # Medical messages per urgency level and per disease
+        urgency_messages = {}
+        for urgency, urgency_info in recommendations_config.get('urgency_levels', {}).items():
+            if 'message' in urgency_info:
+                urgency_messages[urgency] = [urgency_info['message']]
+            elif 'messages' in urgency_info:
+                urgency_messages[urgency] = list(urgency_info['messages'])
+
+        general_config = recommendations_config.get('general_care', {})
+
+        return {
+            'critical': critical,
+            'urgency_messages': urgency_messages,
+            'disease_messages': {
+                disease: list(info.get('medical', []))
+                for disease, info in recommendations_config.get('disease_specific', {}).items()
+            },
+            # Temperature tiers, checked in order; the first match wins
+            'temperature_tiers': [
+                [config.get('threshold', 100), list(config.get('recommendations', []))]
+                for config in recommendations_config.get('temperature_care', {}).values()
+            ],
+            # Symptom care rules: one bit each, in configuration order
+            'symptom_rules': [
+                [symptom, config.get('threshold', 6), list(config.get('recommendations', []))]
+                for symptom, config in recommendations_config.get('symptom_care', {}).items()
+            ],
+            'general': {
+                'threshold': general_config.get('threshold', 5),
+                'symptoms': list(general_config.get('symptoms', [])),
+                'recommendations': list(general_config.get('recommendations', []))
+            },
+            'prevention': list(recommendations_config.get('prevention', []))
+        }
+
+    def _load_rules(self, rules: Dict[str, Any], registry: Optional[SymptomRegistry] = None):
+        """Install compiled rule tables and reset the memoized plans"""
+        self.rules = rules
+        self.registry = registry or SymptomRegistry(self.rule_symptoms(rules))
+        index = self.registry.indices(self.rule_symptoms(rules))
+
+        self._critical_rules = [tuple(rule) for rule in rules['critical']]
+        # (temp_threshold, symptom position, symptom_threshold) per critical rule
+        self._critical_checks = [
+            (temp_threshold, None if symptom is None else index[symptom], symptom_threshold)
+            for temp_threshold, symptom, symptom_threshold, _ in self._critical_rules
+        ]
+        self._urgency_messages = {k: tuple(v) for k, v in rules['urgency_messages'].items()}
+        self._disease_messages = {k: tuple(v) for k, v in rules['disease_messages'].items()}
+        self._temperature_tiers = [
+            (threshold, tuple(recs)) for threshold, recs in rules['temperature_tiers']
+        ]
+        self._symptom_rules = [
+            (symptom, threshold, tuple(recs)) for symptom, threshold, recs in rules['symptom_rules']
+        ]
+        self._symptom_checks = [(index[symptom], threshold) for symptom, threshold, _ in self._symptom_rules]
+
+        general = rules['general']
+        self._general_threshold = general['threshold']
+        self._general_symptoms = tuple(general['symptoms'])
+        self._general_positions = tuple(index[symptom] for symptom in self._general_symptoms)
+        self._general_recommendations = tuple(general['recommendations'])
+        self._general_bit = 1 << len(self._symptom_rules)
+        self._tier_shift = len(self._symptom_rules) + 1
+
+        self._prevention = tuple(rules['prevention'])
+
+        self._critical_plans = {}
+        self._care_plans = {}
 
     def check_critical_symptoms(
         self,
-        symptoms_data: Dict[str, int],
+        symptoms_data: Mapping[str, int],
         temperature: float
     ) -> List[str]:
         """
         Check for symptoms requiring immediate medical attention
 
         Args:
-            symptoms_data: Dictionary of symptom severities
+            symptoms_data: SymptomVector or dictionary of symptom severities
             temperature: Patient's temperature
 
         Returns:
             List of critical warning messages
         """
-        critical_flags = []
-        critical_config = self.config.get('critical_symptoms', {})
+        severities = self.registry.severities(symptoms_data)
+        return list(self._critical_messages(self._critical_mask(severities, temperature)))
 
-        # Check high fever
-        if 'high_fever' in critical_config:
-            threshold = critical_config['high_fever'].get('threshold', 40.0)
-            if temperature >= threshold:
-                critical_flags.append(critical_config['high_fever']['message'])
+    def is_critical(self, symptoms_data: Mapping[str, Any], temperature: float) -> bool:
+        """
+        Whether any critical rule fires, for a record that is not validated yet
 
-        # Check other critical symptoms
-        for key, config in critical_config.items():
-            if key == 'high_fever':
+        Only the few symptoms the critical rules name are read, so this is
+        cheap enough to run before admission control and validation.
+
+        Args:
+            symptoms_data: Raw record, e.g. the request JSON
+            temperature: Patient's temperature
+
+        Returns:
+            True if a critical rule fires; values that are not numbers never fire
+        """
+        # Written as "not >=" so that NaN never fires
+        for temp_threshold, symptom, symptom_threshold, _ in self._critical_rules:
+            if temp_threshold is not None and not temperature >= temp_threshold:
+                continue
+            if symptom is not None:
+                try:
+                    if not float(symptoms_data.get(symptom, 0)) >= symptom_threshold:
+                        continue
+                except (TypeError, ValueError):
+                    continue
+            return True
+        return False
+
+    def _critical_messages(self, critical_mask: int) -> Tuple[str, ...]:
+        """Messages of the critical rules set in a bitmask, in rule order"""
+        return tuple(
+            rule[3] for bit, rule in enumerate(self._critical_rules)
+            if critical_mask >> bit & 1
+        )
+
+    def _critical_mask(self, severities: Sequence, temperature: float) -> int:
+        """Evaluate the critical rules into a bitmask of fired rules"""
+        mask = 0
+        for bit, (temp_threshold, position, symptom_threshold) in enumerate(self._critical_checks):
+            if temp_threshold is not None and temperature < temp_threshold:
                 continue
+            if position is not None and severities[position] < symptom_threshold:
+                continue
+            mask |= 1 << bit
+        return mask
+
+    def _care_mask(self, severities: Sequence, temperature: float) -> int:
+        """Evaluate the temperature, symptom and general care rules into a bitmask"""
+        mask = 0
+        for bit, (position, threshold) in enumerate(self._symptom_checks):
+            if severities[position] >= threshold:
+                mask |= 1 << bit
+
+        general_threshold = self._general_threshold
+        if any(severities[position] >= general_threshold for position in self._general_positions):
+            mask |= self._general_bit
 
-            if 'symptom' in config:
-                symptom = config['symptom']
-                threshold = config.get('threshold', 7)
+        for tier, (threshold, _) in enumerate(self._temperature_tiers, start=1):
+            if temperature >= threshold:
+                mask |= tier << self._tier_shift
+                break
 
-                # Special case for fever with headache
-                if key == 'fever_with_headache':
-                    temp_threshold = config.get('temp_threshold', 39.4)
-                    symptom_threshold = config.get('symptom_threshold', 8)
-                    if (temperature >= temp_threshold and
-                        symptoms_data.get(symptom, 0) >= symptom_threshold):
-                        critical_flags.append(config['message'])
-                else:
-                    if symptoms_data.get(symptom, 0) >= threshold:
-                        critical_flags.append(config['message'])
+        return mask
 
-        return critical_flags
+    def _medical_key(self, diagnoses: List[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+        """Reduce the diagnoses to the (urgency, disease) pair that drives medical advice"""
+        if not diagnoses or diagnoses[0]['confidence'] < 60:
+            return None
+        return diagnoses[0]['urgency'], diagnoses[0]['disease']
 
     def generate_recommendations(
         self,
         diagnoses: List[Dict[str, Any]],
-        symptoms_data: Dict[str, int],
+        symptoms_data: Mapping[str, int],
         temperature: float
     ) -> Dict[str, List[str]]:
         """
@@ -79,112 +279,91 @@ class RecommendationEngine:
         Returns:
             Dictionary with recommendation categories
         """
+        severities = self.registry.severities(symptoms_data)
+
+        # Check for critical symptoms first
+        critical_mask = self._critical_mask(severities, temperature)
+        if critical_mask:
+            immediate = self._critical_plans.get(critical_mask)
+            if immediate is None:
+                immediate = self._remember(
+                    self._critical_plans, critical_mask,
+                    (EMERGENCY_HEADER,) + self._critical_messages(critical_mask)
+                )
+            return {
+                'immediate': list(immediate),
+                'medical': [],
+                'home_care': [],
+                'prevention': []
+            }
+
+        plan_key = (self._care_mask(severities, temperature), self._medical_key(diagnoses))
+        plan = self._care_plans.get(plan_key)
+        if plan is None:
+            plan = self._remember(self._care_plans, plan_key, self._build_care_plan(*plan_key))
+        medical, home_care, templated = plan
+
+        home_care = list(home_care)
+        if templated:
+            # Replace temperature placeholder
+            temp = str(temperature)
+            for index in range(templated):
+                home_care[index] = home_care[index].replace('{temp}', temp)
+
         recommendations = {
             'immediate': [],
-            'medical': [],
-            'home_care': [],
-            'prevention': []
+            'medical': list(medical),
+            'home_care': home_care,
+            'prevention': list(self._prevention)
         }
 
-        # Check for critical symptoms first
-        critical = self.check_critical_symptoms(symptoms_data, temperature)
-        if critical:
-            recommendations['immediate'].append("🚨 SEEK EMERGENCY MEDICAL CARE IMMEDIATELY")
-            recommendations['immediate'].extend(critical)
-            return recommendations
+        logger.info(
+            "Generated %d recommendations", len(medical) + len(home_care) + len(self._prevention)
+        )
+        return recommendations
 
+    def _build_care_plan(
+        self,
+        care_mask: int,
+        medical_key: Optional[Tuple[str, str]]
+    ) -> Tuple[Tuple[str, ...], Tuple[str, ...], int]:
+        """
+        Assemble the recommendation lists for one combination of fired rules
+
+        Returns:
+            Tuple of (medical, home_care, templated) where the first
+            ``templated`` home care entries need the {temp} substitution
+        """
         # Medical recommendations based on diagnosis
-        self._add_medical_recommendations(recommendations, diagnoses)
+        medical = ()
+        if medical_key is not None:
+            urgency, disease = medical_key
+            medical = self._urgency_messages.get(urgency, ()) + self._disease_messages.get(disease, ())
 
         # Temperature-based care
-        self._add_temperature_care(recommendations, temperature)
+        home_care = ()
+        templated = 0
+        tier = care_mask >> self._tier_shift
+        if tier:
+            home_care = self._temperature_tiers[tier - 1][1]
+            if any('{temp}' in rec for rec in home_care):
+                templated = len(home_care)
 
         # Symptom-specific care
-        self._add_symptom_care(recommendations, symptoms_data)
+        for bit, (_, _, recs) in enumerate(self._symptom_rules):
+            if care_mask >> bit & 1:
+                home_care += recs
 
         # General care recommendations
-        self._add_general_care(recommendations, symptoms_data)
-
-        # Prevention measures
-        recommendations['prevention'] = self.config.get('prevention', [])
-
-        logger.info(f"Generated {sum(len(v) for v in recommendations.values())} recommendations")
-        return recommendations
-
-    def _add_medical_recommendations(
-        self,
-        recommendations: Dict[str, List[str]],
-        diagnoses: List[Dict[str, Any]]
-    ):
-        """Add medical recommendations based on diagnosis"""
-        if not diagnoses or diagnoses[0]['confidence'] < 60:
-            return
-
-        top_disease = diagnoses[0]
-        urgency_config = self.config.get('urgency_levels', {})
-
-        # Add urgency-based recommendations
-        if top_disease['urgency'] in urgency_config:
-            urgency_info = urgency_config[top_disease['urgency']]
-            if 'message' in urgency_info:
-                recommendations['medical'].append(urgency_info['message'])
-            elif 'messages' in urgency_info:
-                recommendations['medical'].extend(urgency_info['messages'])
-
-        # Add disease-specific recommendations
-        disease_specific = self.config.get('disease_specific', {})
-        disease_name = top_disease['disease']
-
-        if disease_name in disease_specific:
-            recommendations['medical'].extend(
-                disease_specific[disease_name].get('medical', [])
-            )
-
-    def _add_temperature_care(
-        self,
-        recommendations: Dict[str, List[str]],
-        temperature: float
-    ):
-        """Add temperature-based care recommendations"""
-        temp_care = self.config.get('temperature_care', {})
-
-        for level, config in temp_care.items():
-            threshold = config.get('threshold', 100)
-            if temperature >= threshold:
-                for rec in config.get('recommendations', []):
-                    # Replace temperature placeholder
-                    rec = rec.replace('{temp}', str(temperature))
-                    recommendations['home_care'].append(rec)
-                break
-
-    def _add_symptom_care(
-        self,
-        recommendations: Dict[str, List[str]],
-        symptoms_data: Dict[str, int]
-    ):
-        """Add symptom-specific care recommendations"""
-        symptom_care = self.config.get('symptom_care', {})
-
-        for symptom, config in symptom_care.items():
-            threshold = config.get('threshold', 6)
-            if symptoms_data.get(symptom, 0) >= threshold:
-                recommendations['home_care'].extend(
-                    config.get('recommendations', [])
-                )
-
-    def _add_general_care(
-        self,
-        recommendations: Dict[str, List[str]],
-        symptoms_data: Dict[str, int]
-    ):
-        """Add general care recommendations"""
-        general_config = self.config.get('general_care', {})
-        threshold = general_config.get('threshold', 5)
-        check_symptoms = general_config.get('symptoms', [])
-
-        # Check if any general symptoms are above threshold
-        if any(symptoms_data.get(s, 0) >= threshold for s in check_symptoms):
-            recommendations['home_care'].extend(
-                general_config.get('recommendations', [])
-            )
-
+        if care_mask & self._general_bit:
+            home_care += self._general_recommendations
+
+        return medical, home_care, templated
+
+    @staticmethod
+    def _remember(memo: Dict[Any, Any], key: Any, value: Any) -> Any:
+        """Store a memoized plan, resetting the memo if it grows unbounded"""
+        if len(memo) >= MAX_MEMOIZED_PLANS:
+            memo.clear()
+        memo[key] = value
+        return value
@@ -0,0 +1,114 @@
+"""
+Result Cache Module
+===================
+
+Bounded LRU cache for diagnosis results, keyed on a canonical packed form of
+the validated symptom vector and temperature.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+import struct
+import threading
+import time
+import logging
+
+from .symptom_registry import SymptomVector
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    temperature: float,
+    symptoms_data: Mapping[str, int],
+    precision: int = 1
+) -> Optional[bytes]:
+    """
+    Pack a validated symptom record into a compact cache key
+
+    Severities (0-10) become one byte each, in the fixed order produced by
+    validation; the temperature is stored as a fixed-point integer with
+    ``precision`` decimals. Temperatures with more precision than that are
+    not cacheable, since the exact value is echoed back in the response.
+
+    Args:
+        temperature: Validated temperature
+        symptoms_data: Validated symptom severities
+        precision: Number of decimals the temperature is entered with
+
+    Returns:
+        Cache key, or None if the record should bypass the cache
+    """
+    scale = 10 ** precision
+    fixed_point = round(temperature * scale)
+    if fixed_point / scale != temperature:
+        return None
+    if type(symptoms_data) is SymptomVector:
+        return struct.pack('<i', fixed_point) + symptoms_data.severities
+    return struct.pack('<i', fixed_point) + bytes(symptoms_data.values())
+
+
+class ResultCache:
+    """Thread-safe, size-bounded LRU cache with optional time-to-live"""
+
+    def __init__(self, max_size: int = 4096, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: bytes) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached results (e.g. after the knowledge base is reloaded)"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("Result cache cleared")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,276 @@
+"""
+Response Serialization Module
+=============================
+
+Encodes diagnosis responses to JSON bytes identical to Flask's ``jsonify``
+in compact mode (sorted keys, ASCII-only, ``(',', ':')`` separators), with
+most of the work done once per knowledge base instead of once per request:
+
+- each disease's static fields (description, name, incubation, severity,
+  urgency) are pre-encoded into two byte fragments at load time; a diagnosis
+  entry is the confidence, the matched symptoms and those fragments spliced
+  together
+- lists of strings (recommendations, matched symptoms) are encoded once and
+  memoized on their contents, so repeated advice costs a dictionary lookup
+- the response timestamp is formatted once per second
+
+Values outside the known response shape go to orjson when it is installed
+and its output is guaranteed to match the standard library, otherwise to
+``json.dumps``.
+"""
+
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict
+import json
+import re
+import time
+import logging
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Entries kept in each memo table before it is reset
+MAX_MEMOIZED_ENTRIES = 16384
+
+INFINITY = float('inf')
+
+# Top-level keys of a pipeline response (batch results add 'index')
+RESPONSE_KEYS = frozenset((
+    'diagnoses', 'overall_severity', 'symptom_average', 'temperature', 'active_symptom_count',
+    'recommendations', 'timestamp', 'critical_warning', 'kb_version'
+))
+
+# Keys of a diagnosis entry built by DiagnosisEngine._match_disease
+DIAGNOSIS_KEYS = frozenset((
+    'disease', 'description', 'confidence', 'urgency', 'severity', 'matched_symptoms', 'incubation'
+))
+
+# orjson output that may differ from json.dumps: exponent floats ("1e16" vs
+# "1e+16"), small floats written out in full ("0.00002" vs "2e-05"),
+# non-finite floats (null vs Infinity), DEL and non-ASCII characters
+_FAST_JSON_UNSAFE = re.compile(rb'[0-9]e|0\.0000|null|[\x7f-\xff]')
+
+_timestamp = (None, '')
+
+
+def current_timestamp() -> str:
+    """Local time as 'YYYY-MM-DD HH:MM:SS', formatted at most once per second"""
+    global _timestamp
+    second = int(time.time())
+    cached_second, text = _timestamp
+    if cached_second != second:
+        text = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+        _timestamp = (second, text)
+    return text
+
+
+def dumps_stdlib(value: Any) -> bytes:
+    """Reference encoding: what Flask's default JSON provider produces"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('ascii')
+
+
+def dumps_fast(value: Any) -> bytes:
+    """orjson when its output provably matches dumps_stdlib, else dumps_stdlib"""
+    if orjson is not None:
+        try:
+            encoded = orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return dumps_stdlib(value)
+        if not _FAST_JSON_UNSAFE.search(encoded):
+            return encoded
+    return dumps_stdlib(value)
+
+
+def _scalar(value: Any) -> bytes:
+    """Encode a number, string, boolean or None like json.dumps"""
+    value_type = type(value)
+    if value_type is float:
+        # Same spelling as json.encoder's floatstr
+        if value != value or value in (INFINITY, -INFINITY):
+            return dumps_stdlib(value)
+        return float.__repr__(value).encode('ascii')
+    if value_type is int:
+        return int.__repr__(value).encode('ascii')
+    if value_type is str:
+        return encode_basestring_ascii(value).encode('ascii')
+    if value is True:
+        return b'true'
+    if value is False:
+        return b'false'
+    if value is None:
+        return b'null'
+    return dumps_fast(value)
+
+
+def _same_static(values: tuple, static: tuple) -> bool:
+    """
+    True if values encode exactly like the pre-encoded static fields
+
+    Plain equality is not enough (3 == 3.0 == True encode differently), so
+    only identical objects or equal strings qualify.
+    """
+    for value, expected in zip(values, static):
+        if value is not expected and not (type(value) is str and type(expected) is str and value == expected):
+            return False
+    return True
+
+
+def _layout(keys) -> tuple:
+    """(key, encoded prefix) pairs for a response with exactly these keys"""
+    layout = []
+    for position, key in enumerate(sorted(keys)):
+        layout.append((key, (b'{' if position == 0 else b',') + dumps_stdlib(key) + b':'))
+    return tuple(layout)
+
+
+# Pre-encoded key prefixes of the response shapes with a fast path
+RESPONSE_LAYOUTS = {
+    keys: _layout(keys) for keys in (
+        RESPONSE_KEYS,
+        RESPONSE_KEYS | {'index'},
+        RESPONSE_KEYS | {'session_id', 'seq'},
+    )
+}
+
+
+class ResponseEncoder:
+    """Encodes diagnosis responses with pre-encoded per-disease fragments"""
+
+    def __init__(self, disease_database: Dict[str, Any]):
+        self._lists = {}
+        self._keys = {}
+        self._floats = {}
+        self._fragments = {}
+        for disease_name, disease_info in disease_database.items():
+            static = (
+                disease_info.get('description', disease_name),
+                disease_info.get('incubation', 'unknown'),
+                disease_info.get('severity', 'medium'),
+                disease_info.get('urgency', 'normal'),
+            )
+            head = b''.join((
+                b',"description":', dumps_stdlib(static[0]),
+                b',"disease":', dumps_stdlib(disease_name),
+                b',"incubation":', dumps_stdlib(static[1]),
+                b',"matched_symptoms":',
+            ))
+            tail = b''.join((
+                b',"severity":', dumps_stdlib(static[2]),
+                b',"urgency":', dumps_stdlib(static[3]),
+                b'}',
+            ))
+            self._fragments[disease_name] = (head, tail, static)
+
+    def encode(self, value: Any) -> bytes:
+        """
+        Encode a response (or any JSON value) to compact JSON bytes
+
+        Args:
+            value: Response dictionary
+
+        Returns:
+            JSON bytes, identical to ``json.dumps(value, sort_keys=True,
+            separators=(',', ':'))``
+        """
+        if type(value) is not dict:
+            return dumps_fast(value)
+        layout = RESPONSE_LAYOUTS.get(frozenset(value))
+        if layout is None:
+            return dumps_fast(value)
+
+        parts = []
+        for key, prefix in layout:
+            item = value[key]
+            item_type = type(item)
+            if item_type is float:
+                parts.append(prefix + self._float(item))
+            elif item_type is str:
+                parts.append(prefix + encode_basestring_ascii(item).encode('ascii'))
+            elif key == 'diagnoses':
+                parts.append(prefix + self._diagnoses(item))
+            elif key == 'recommendations':
+                parts.append(prefix + self._recommendations(item))
+            else:
+                parts.append(prefix + _scalar(item))
+        parts.append(b'}')
+        return b''.join(parts)
+
+    def _remember(self, table: dict, key: Any, encoded: bytes) -> bytes:
+        if len(table) >= MAX_MEMOIZED_ENTRIES:
+            table.clear()
+        table[key] = encoded
+        return encoded
+
+    def _string_list(self, items: Any) -> bytes:
+        """Encode a list of strings, memoized on its contents"""
+        if type(items) is not list:
+            return dumps_fast(items)
+        key = tuple(items)
+        try:
+            encoded = self._lists.get(key)
+        except TypeError:
+            # Unhashable items (nested lists or dicts)
+            return dumps_fast(items)
+        if encoded is None:
+            for item in items:
+                if type(item) is not str:
+                    return dumps_fast(items)
+            encoded = self._remember(self._lists, key, dumps_stdlib(items))
+        return encoded
+
+    def _recommendations(self, recommendations: Any) -> bytes:
+        if type(recommendations) is not dict:
+            return dumps_fast(recommendations)
+        try:
+            categories = sorted(recommendations)
+        except TypeError:
+            return dumps_fast(recommendations)
+
+        parts = []
+        for category in categories:
+            prefix = self._keys.get(category)
+            if prefix is None:
+                if type(category) is not str:
+                    return dumps_fast(recommendations)
+                prefix = self._remember(self._keys, category, dumps_stdlib(category) + b':')
+            parts.append(prefix + self._string_list(recommendations[category]))
+        return b'{' + b','.join(parts) + b'}'
+
+    def _float(self, value: float) -> bytes:
+        """
+        Encode a float, memoized: confidences, temperatures and averages are
+        rounded to one decimal and take few distinct values
+        """
+        encoded = self._floats.get(value)
+        if encoded is None:
+            encoded = _scalar(value)
+            # -0.0 == 0.0 and NaN != NaN, so neither is a usable key
+            if value > 0.0 and value != INFINITY:
+                self._remember(self._floats, value, encoded)
+        return encoded
+
+    def _diagnoses(self, diagnoses: Any) -> bytes:
+        if type(diagnoses) is not list:
+            return dumps_fast(diagnoses)
+        parts = []
+        for entry in diagnoses:
+            fragment = None
+            if type(entry) is dict and entry.keys() == DIAGNOSIS_KEYS and type(entry['disease']) is str:
+                fragment = self._fragments.get(entry['disease'])
+            # Only splice when the static fields are the ones pre-encoded
+            if fragment is None or not _same_static(
+                (entry['description'], entry['incubation'], entry['severity'], entry['urgency']),
+                fragment[2]
+            ):
+                parts.append(dumps_fast(entry))
+                continue
+            confidence = entry['confidence']
+            encoded = self._float(confidence) if type(confidence) is float else _scalar(confidence)
+            parts.append(b'{"confidence":' + encoded + fragment[0]
+                         + self._string_list(entry['matched_symptoms']) + fragment[1])
+        return b'[' + b','.join(parts) + b']'
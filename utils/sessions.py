@@ -0,0 +1,315 @@
+"""
+Diagnosis Sessions Module
+=========================
+
+Incremental diagnosis sessions. A client opens a session with a full symptom
+record and from then on sends only the fields that changed; every update is
+pushed to the session's Server-Sent Events subscribers.
+
+Each session keeps an IncrementalDiagnosis, so an update re-scores only the
+diseases that contain a changed symptom instead of the whole database.
+Severity and recommendations are then assessed exactly as for /diagnose, so
+a session always reports what a full /diagnose of the same record would.
+
+Memory is bounded: at most ``max_sessions`` sessions are live (the least
+recently active one is closed to make room for a new one), and sessions idle
+for longer than ``idle_ttl`` seconds expire.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import secrets
+import threading
+import time
+import logging
+
+from .pipeline import DiagnosisPipeline
+from .serialization import current_timestamp
+from .symptom_registry import SymptomVector
+
+logger = logging.getLogger(__name__)
+
+# SSE comment line sent while a stream is idle, so proxies keep it open and
+# dead connections are noticed
+SSE_HEARTBEAT = b': keep-alive\n\n'
+
+
+def format_event(event: str, data: bytes, event_id: Optional[int] = None) -> bytes:
+    """
+    Encode one Server-Sent Event
+
+    Args:
+        event: Event name
+        data: Single-line payload (compact JSON)
+        event_id: Sequence number clients resume from (Last-Event-ID)
+
+    Returns:
+        Event bytes, terminated by a blank line
+    """
+    header = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{header}event: {event}\ndata: ".encode('ascii') + data + b'\n\n'
+
+
+class SessionClosed(Exception):
+    """The session expired, was evicted or was closed by the client"""
+
+
+class DiagnosisSession:
+    """One patient's symptom record and its incrementally updated diagnosis"""
+
+    def __init__(
+        self,
+        session_id: str,
+        pipeline: DiagnosisPipeline,
+        temperature: float,
+        symptoms: SymptomVector
+    ):
+        self.session_id = session_id
+        self.last_active = time.monotonic()
+        self.seq = 0
+        self.closed = None
+        self.response = None
+        self.payload = b''
+        self._condition = threading.Condition()
+        self._listeners = []
+        with self._condition:
+            self._start(pipeline, temperature, symptoms)
+            self._publish()
+
+    def _start(self, pipeline: DiagnosisPipeline, temperature: float, symptoms: SymptomVector):
+        self.pipeline = pipeline
+        self.temperature = temperature
+        self._severities = bytearray(pipeline.registry.severities(symptoms))
+        self._state = pipeline.diagnosis_engine.incremental(
+            symptoms, temperature,
+            min_confidence=pipeline.min_confidence, limit=pipeline.max_results
+        )
+
+    def _rebase(self, pipeline: DiagnosisPipeline):
+        """Move the record onto a reloaded knowledge base, by symptom name"""
+        record = dict(zip(self.pipeline.registry.names, self._severities))
+        logger.info(
+            f"Session {self.session_id} moved to knowledge base {pipeline.version}"
+        )
+        self._start(pipeline, self.temperature, pipeline.registry.parse(record))
+
+    def update(self, data: Dict[str, Any], pipeline: DiagnosisPipeline) -> int:
+        """
+        Apply the changed fields of a record and publish the new diagnosis
+
+        Args:
+            data: Changed fields, e.g. {"cough": 6, "temperature": 38.4}
+            pipeline: Pipeline of the active knowledge base snapshot
+
+        Returns:
+            Sequence number of the published update; raises ValueError for
+            invalid input and SessionClosed if the session is gone
+        """
+        temperature, changes = pipeline.validate_changes(data)
+
+        with self._condition:
+            if self.closed is not None:
+                raise SessionClosed(self.closed)
+            if pipeline is not self.pipeline:
+                self._rebase(pipeline)
+
+            for position, value in changes.items():
+                self._severities[position] = value
+            if temperature is not None:
+                self.temperature = temperature
+
+            registry = pipeline.registry
+            engine_registry = pipeline.diagnosis_engine.registry
+            if engine_registry is not registry:
+                # Engines built outside a knowledge base keep their own registry
+                changes = {
+                    engine_registry.index[registry.names[position]]: value
+                    for position, value in changes.items()
+                    if registry.names[position] in engine_registry
+                }
+            self._state.update(changes, temperature)
+            self._publish()
+            return self.seq
+
+    def _publish(self):
+        """Assemble and encode the current response and wake subscribers"""
+        pipeline = self.pipeline
+        symptoms = SymptomVector(pipeline.registry, bytes(self._severities))
+        self.response = pipeline.build_response(
+            self.temperature, symptoms, self._state.diagnoses(), current_timestamp()
+        )
+        self.payload = pipeline.encode(self.response)
+        self.seq += 1
+        self._notify()
+
+    def _notify(self):
+        self._condition.notify_all()
+        for callback in list(self._listeners):
+            callback()
+
+    def latest(self) -> Tuple[int, bytes, Optional[str]]:
+        """(sequence number, encoded response, close reason or None)"""
+        with self._condition:
+            return self.seq, self.payload, self.closed
+
+    def wait(self, after_seq: int, timeout: float) -> bool:
+        """
+        Block until an update newer than after_seq is published or the
+        session closes
+
+        Returns:
+            False if the timeout elapsed first
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.seq > after_seq or self.closed is not None, timeout
+            )
+
+    def subscribe(self, callback: Callable[[], None]):
+        """
+        Call callback (without arguments) after every update and on close
+
+        Callbacks run on the updating thread while the session is locked,
+        so they must only schedule work (e.g. loop.call_soon_threadsafe).
+        """
+        with self._condition:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[], None]):
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def close(self, reason: str = 'closed'):
+        """End the session; open event streams are told why and finish"""
+        with self._condition:
+            if self.closed is None:
+                self.closed = reason
+                self._notify()
+
+
+class SessionStore:
+    """Thread-safe registry of live sessions with a size cap and idle expiry"""
+
+    def __init__(self, max_sessions: int = 1000, idle_ttl: float = 900):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Ordered by last activity, least recent first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def create(
+        self,
+        pipeline: DiagnosisPipeline,
+        temperature: float,
+        symptoms: SymptomVector
+    ) -> DiagnosisSession:
+        """
+        Open a session for a validated record
+
+        Args:
+            pipeline: Pipeline of the active knowledge base snapshot
+            temperature: Validated temperature
+            symptoms: Validated symptom vector
+
+        Returns:
+            DiagnosisSession, already holding its first diagnosis
+        """
+        session = DiagnosisSession(secrets.token_urlsafe(16), pipeline, temperature, symptoms)
+
+        evicted = []
+        with self._lock:
+            expired = self._expire(time.monotonic())
+            while len(self._sessions) >= self.max_sessions:
+                _, oldest = self._sessions.popitem(last=False)
+                evicted.append(oldest)
+                self.evicted += 1
+            self._sessions[session.session_id] = session
+            self.created += 1
+
+        for old in expired:
+            old.close('expired')
+        for old in evicted:
+            old.close('evicted')
+        if evicted:
+            logger.warning(f"Session limit ({self.max_sessions}) reached: evicted {len(evicted)} session(s)")
+        return session
+
+    def get(self, session_id: str) -> Optional[DiagnosisSession]:
+        """Look up a live session and mark it active"""
+        with self._lock:
+            expired = self._expire(time.monotonic())
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._touch(session)
+
+        for old in expired:
+            old.close('expired')
+        return session
+
+    def touch(self, session: DiagnosisSession) -> bool:
+        """
+        Mark a session active (e.g. while an event stream is open)
+
+        Returns:
+            False if the session is no longer live
+        """
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                return False
+            self._touch(session)
+            return True
+
+    def close(self, session_id: str, reason: str = 'closed') -> bool:
+        """Close and forget a session; False if it was not live"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close(reason)
+        return True
+
+    def close_all(self, reason: str = 'shutdown'):
+        """Close every session, e.g. on server shutdown"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close(reason)
+
+    def _touch(self, session: DiagnosisSession):
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(session.session_id)
+
+    def _expire(self, now: float) -> list:
+        """Remove idle sessions (caller holds the lock and closes them after)"""
+        expired = []
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_active <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            expired.append(session)
+            self.expired += 1
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        """Live session count and lifetime counters"""
+        with self._lock:
+            return {
+                'active': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'idle_ttl': self.idle_ttl,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
+
+
+def closed_event(reason: str) -> bytes:
+    """Final SSE event of a stream whose session ended"""
+    return format_event('closed', json.dumps({'reason': reason}, separators=(',', ':')).encode('ascii'))
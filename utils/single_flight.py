@@ -0,0 +1,84 @@
+"""
+Single-Flight Module
+====================
+
+Collapses concurrent identical computations into one.
+
+While a computation for a key is running, further callers with the same key
+wait for it and share its result (or its exception) instead of starting
+their own. Once it finishes the key is forgotten, so this only deduplicates
+work that overlaps in time; repeated work over time is the result cache's
+job.
+"""
+
+from typing import Any, Callable, Hashable, Tuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight computation and its outcome"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe registry of in-flight computations by key"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run function, or wait for the identical call already running
+
+        Args:
+            key: Identifies calls that produce the same result
+            function: Computation to run when no call for key is in flight
+
+        Returns:
+            Tuple of (result, shared); shared is True when the result came
+            from another caller's computation. Results are shared between
+            callers and must not be mutated.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> dict:
+        """Counters: computations executed, calls that shared one, keys in flight"""
+        with self._lock:
+            return {'executed': self.executed, 'shared': self.shared, 'in_flight': len(self._calls)}
@@ -0,0 +1,188 @@
+"""
+Symptom Registry Module
+=======================
+
+Fixed symptom -> index assignment for one knowledge base, and the compact
+symptom vector that validated records are stored in.
+
+The registry is derived from the data files: the symptom schema declared at
+the top of diseases.json (which fixes the order fields are validated and
+reported in), then any other symptom referenced by a disease or a
+recommendation rule, in first-seen order. Adding a symptom to the data files
+is enough to make it accepted, scored and cached.
+
+A validated record is a ``bytes`` object with one severity per registry
+position (a compact, immutable uint8 array that doubles as the result cache
+key), wrapped in SymptomVector: engines read the bytes by index, while the
+read-only mapping interface keeps code written against plain
+``{symptom: severity}`` dictionaries working.
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Accepted severity range of a symptom
+MIN_SEVERITY = 0
+MAX_SEVERITY = 10
+
+# Byte values of the accepted severities, see SymptomRegistry.parse
+_VALID_SEVERITIES = bytes(range(MIN_SEVERITY, MAX_SEVERITY + 1))
+
+
+class SymptomRegistry:
+    """Immutable, ordered set of the symptoms a knowledge base knows about"""
+
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Symptom registry names must be unique")
+        # Second argument of dict.get for every field, see parse()
+        self._defaults = (0,) * len(self.names)
+
+    @classmethod
+    def from_knowledge_base(
+        cls,
+        disease_database: Dict[str, Any],
+        declared: Iterable[str] = (),
+        rule_symptoms: Iterable[str] = ()
+    ) -> 'SymptomRegistry':
+        """
+        Derive the registry from the data files
+
+        Args:
+            disease_database: Disease configuration from database
+            declared: Symptom schema of diseases.json, in display order
+            rule_symptoms: Symptoms referenced by the recommendation rules
+
+        Returns:
+            SymptomRegistry instance
+        """
+        names = dict.fromkeys(declared)
+        for disease_info in disease_database.values():
+            names.update(dict.fromkeys(disease_info.get('symptoms', {})))
+        names.update(dict.fromkeys(rule_symptoms))
+        return cls(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.index
+
+    def __repr__(self) -> str:
+        return f"SymptomRegistry({len(self.names)} symptoms)"
+
+    def parse(self, data: Mapping) -> 'SymptomVector':
+        """
+        Extract and range-check every registered symptom of a record
+
+        Missing symptoms default to 0. Errors name the first offending field
+        in registry order; callers add their own context.
+
+        Args:
+            data: Patient record (request JSON, CSV row, ...)
+
+        Returns:
+            SymptomVector, or raises ValueError/TypeError
+        """
+        try:
+            severities = bytes(map(int, map(data.get, self.names, self._defaults)))
+        except ValueError:
+            # A value int() rejects, or one outside 0-255
+            severities = None
+
+        if severities is None or severities.translate(None, _VALID_SEVERITIES):
+            # Slow path, only to raise the right error
+            values = list(map(int, map(data.get, self.names, self._defaults)))
+            for name, value in zip(self.names, values):
+                if not (MIN_SEVERITY <= value <= MAX_SEVERITY):
+                    raise ValueError(
+                        f"Symptom '{name}' must be between {MIN_SEVERITY} and {MAX_SEVERITY}"
+                    )
+        return SymptomVector(self, severities)
+
+    def parse_changes(self, data: Mapping) -> Dict[int, int]:
+        """
+        Extract and range-check the symptoms present in a partial record
+
+        Args:
+            data: Symptom name -> new severity
+
+        Returns:
+            Registry position -> severity, or raises ValueError/TypeError
+        """
+        changes = {}
+        for name, value in data.items():
+            position = self.index.get(name)
+            if position is None:
+                raise ValueError(f"Unknown symptom '{name}'")
+            changes[position] = int(value)
+
+        for position, value in changes.items():
+            if not (MIN_SEVERITY <= value <= MAX_SEVERITY):
+                raise ValueError(
+                    f"Symptom '{self.names[position]}' must be between {MIN_SEVERITY} and {MAX_SEVERITY}"
+                )
+        return changes
+
+    def severities(self, symptoms_data: Mapping) -> Sequence:
+        """
+        Severities of a record in registry order
+
+        Vectors built by this registry are read in place; any other mapping
+        (plain dictionaries, vectors of another registry) is copied, with
+        unknown symptoms ignored and missing ones as 0.
+
+        Args:
+            symptoms_data: SymptomVector or symptom -> severity mapping
+
+        Returns:
+            Sequence indexed by registry position
+        """
+        if type(symptoms_data) is SymptomVector and symptoms_data.registry is self:
+            return symptoms_data.severities
+        return [symptoms_data.get(name, 0) for name in self.names]
+
+    def indices(self, names: Iterable[str]) -> Dict[str, int]:
+        """Registry positions of the given symptoms; raises KeyError for unknown ones"""
+        return {name: self.index[name] for name in names}
+
+
+class SymptomVector(Mapping):
+    """Read-only symptom -> severity mapping backed by one byte per symptom"""
+
+    __slots__ = ('registry', 'severities')
+
+    def __init__(self, registry: SymptomRegistry, severities: bytes):
+        self.registry = registry
+        self.severities = severities
+
+    def __getitem__(self, name: str) -> int:
+        return self.severities[self.registry.index[name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.registry.names)
+
+    def __len__(self) -> int:
+        return len(self.severities)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.registry.index
+
+    def __repr__(self) -> str:
+        return f"SymptomVector({dict(self)!r})"
+
+    def get(self, name: str, default: Any = None) -> Any:
+        position = self.registry.index.get(name)
+        return default if position is None else self.severities[position]
+
+    def values(self) -> bytes:
+        """Severities in registry order (bytes iterate as ints)"""
+        return self.severities
@@ -0,0 +1,332 @@
+"""
+Vectorized Diagnosis Engine Module
+===================================
+
+NumPy-backed variant of the diagnosis engine. The disease database is compiled
+once into a dense disease x symptom weight matrix so that a request is scored
+with a single matrix-vector product instead of a Python loop per disease.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Any
+import logging
+
+# NumPy is optional and imported on first use (see load_numpy) so that
+# importing the package stays cheap on cold starts
+np = None
+
+from .diagnosis_engine import BOUND_TOLERANCE, DiagnosisEngine, IncrementalDiagnosis
+from .symptom_registry import MAX_SEVERITY, MIN_SEVERITY, SymptomRegistry
+
+logger = logging.getLogger(__name__)
+
+# Slack applied to the vectorized threshold test. The matrix product sums the
+# weights in a different order than the reference loop, so scores can differ
+# in the last few bits; candidates are re-scored exactly before being returned.
+SCORE_TOLERANCE = 1e-6
+
+
+def load_numpy():
+    """
+    Import NumPy on first use
+
+    Returns:
+        The numpy module, or None if it is not installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy is optional
+            return None
+        np = numpy
+    return np
+
+
+class CompiledDiseaseMatrix:
+    """Dense, read-only representation of the disease database"""
+
+    def __init__(
+        self,
+        disease_names: List[str],
+        symptom_names: List[str],
+        weights,
+        total_possible,
+        temp_low,
+        temp_high
+    ):
+        if load_numpy() is None:
+            raise ImportError("NumPy is required for the vectorized diagnosis engine")
+
+        self.disease_names = disease_names
+        self.symptom_names = symptom_names
+        self.weights = weights
+        self.total_possible = total_possible
+        self.temp_low = temp_low
+        self.temp_high = temp_high
+
+        # Diseases without symptoms always score 0; avoid dividing by zero
+        self.score_scale = np.divide(
+            100.0, self.total_possible,
+            out=np.zeros_like(self.total_possible),
+            where=self.total_possible > 0
+        )
+
+    @classmethod
+    def from_database(cls, disease_database: Dict[str, Any]) -> 'CompiledDiseaseMatrix':
+        """Compile a disease database into dense weight and temperature arrays"""
+        if load_numpy() is None:
+            raise ImportError("NumPy is required for the vectorized diagnosis engine")
+
+        symptom_names = []
+        symptom_index = {}
+        for disease_info in disease_database.values():
+            for symptom in disease_info.get('symptoms', {}):
+                if symptom not in symptom_index:
+                    symptom_index[symptom] = len(symptom_names)
+                    symptom_names.append(symptom)
+
+        disease_count = len(disease_database)
+        weights = np.zeros((disease_count, len(symptom_names)), dtype=np.float64)
+        total_possible = np.zeros(disease_count, dtype=np.float64)
+        temp_low = np.zeros(disease_count, dtype=np.float64)
+        temp_high = np.zeros(disease_count, dtype=np.float64)
+
+        for row, disease_info in enumerate(disease_database.values()):
+            # Accumulate in the same order as calculate_disease_probability
+            row_total = 0
+            for symptom, weight in disease_info.get('symptoms', {}).items():
+                weights[row, symptom_index[symptom]] = weight
+                row_total += weight * 10
+            total_possible[row] = row_total
+
+            temp_range = disease_info.get('temp_range', [0, 100])
+            temp_low[row] = temp_range[0]
+            temp_high[row] = temp_range[1]
+
+        return cls(
+            list(disease_database.keys()), symptom_names,
+            weights, total_possible, temp_low, temp_high
+        )
+
+    def temperature_multipliers(self, temperature: float):
+        """Vectorized equivalent of DiagnosisEngine.adjust_probability_by_temperature"""
+        in_range = (self.temp_low <= temperature) & (temperature <= self.temp_high)
+        near_upper = np.abs(temperature - self.temp_high) <= 1.0
+        return np.where(in_range, 1.2, np.where(near_upper, 1.1, 1.0))
+
+    def score_vector(self, vector, temperature: float):
+        """Approximate adjusted probability of every disease for a severity vector in column order"""
+        base = (self.weights @ vector) * self.score_scale
+        return np.minimum(base * self.temperature_multipliers(temperature), 100.0)
+
+
+class VectorizedDiagnosisEngine(DiagnosisEngine):
+    """Diagnosis engine that scores all diseases with one matrix-vector product"""
+
+    def __init__(
+        self,
+        disease_database: Dict[str, Any],
+        matrix: Optional[CompiledDiseaseMatrix] = None,
+        registry: Optional[SymptomRegistry] = None
+    ):
+        super().__init__(disease_database, registry)
+        self.matrix = matrix if matrix is not None else CompiledDiseaseMatrix.from_database(disease_database)
+        # Registry position of every matrix column, to gather a request's
+        # severities into column order
+        self._columns = np.array(
+            [self.registry.index[symptom] for symptom in self.matrix.symptom_names], dtype=np.intp
+        )
+        # Matrix column of every registry position that has one
+        self._column_of = {position: column for column, position in enumerate(self._columns.tolist())}
+
+    def _column_vector(self, severities: Sequence):
+        """Severities gathered into matrix column order as float64"""
+        if type(severities) is bytes:
+            return np.frombuffer(severities, dtype=np.uint8)[self._columns].astype(np.float64)
+        vector = np.asarray(severities, dtype=np.float64)[self._columns]
+        # Like symptom_vector, inactive (<= 0) severities contribute nothing
+        np.maximum(vector, 0.0, out=vector)
+        return vector
+
+    @staticmethod
+    def is_available() -> bool:
+        """Whether NumPy could be imported"""
+        return load_numpy() is not None
+
+    def analyze_symptoms(
+        self,
+        symptoms_data: Mapping[str, int],
+        temperature: float,
+        min_confidence: float = 20,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analyze symptoms and return potential diagnoses
+
+        Produces exactly the same output as DiagnosisEngine.analyze_symptoms:
+        the matrix product selects candidate diseases and each candidate is
+        then re-scored with the reference per-disease calculation.
+
+        Args:
+            symptoms_data: SymptomVector or dictionary of symptom severities
+            temperature: Patient's temperature
+            min_confidence: Minimum confidence threshold
+            limit: Maximum number of diagnoses to return (None for all)
+
+        Returns:
+            List of potential diagnoses sorted by confidence
+        """
+        severities = self.registry.severities(symptoms_data)
+        scores = self.matrix.score_vector(self._column_vector(severities), temperature)
+        candidates = np.flatnonzero(scores >= min_confidence - SCORE_TOLERANCE)
+
+        if limit is not None and len(candidates) > limit:
+            # Only diseases that can tie the k-th best (after rounding) need
+            # exact scoring
+            candidate_scores = scores[candidates]
+            kth_score = np.partition(candidate_scores, -limit)[-limit] if limit > 0 else np.inf
+            candidates = candidates[candidate_scores >= kth_score - 0.1 - SCORE_TOLERANCE]
+
+        disease_matches = []
+
+        for row in candidates.tolist():
+            match = self._match_disease(row, severities, temperature, min_confidence)
+            if match is not None:
+                disease_matches.append(match)
+
+        # Sort by confidence (highest first)
+        disease_matches.sort(key=lambda x: x['confidence'], reverse=True)
+        if limit is not None:
+            disease_matches = disease_matches[:limit]
+
+        logger.info("Found %d potential diagnoses", len(disease_matches))
+        return disease_matches
+
+    def incremental(
+        self,
+        symptoms_data: Mapping[str, int],
+        temperature: float,
+        min_confidence: float = 20,
+        limit: Optional[int] = None
+    ) -> 'VectorizedIncrementalDiagnosis':
+        """DiagnosisEngine.incremental with the partial scores kept in a NumPy vector"""
+        return VectorizedIncrementalDiagnosis(
+            self, self.registry.severities(symptoms_data), temperature, min_confidence, limit
+        )
+
+    def explain(
+        self,
+        symptoms_data: Mapping[str, int],
+        temperature: float,
+        diseases: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        DiagnosisEngine.explain for all requested diseases at once
+
+        Contributions and the whole disease x symptom x severity grid come
+        from array operations on the weight matrix rows; only the output
+        dictionaries are built in Python.
+        """
+        severities = self.registry.severities(symptoms_data)
+        rows = self._rows(diseases)
+        if not rows:
+            return []
+
+        matrix = self.matrix
+        selected = np.array(rows, dtype=np.intp)
+        weights = matrix.weights[selected]
+        vector = self._column_vector(severities)
+        # Same operations, in the same order, as the Python implementation so
+        # both engines explain identically
+        scores = np.array([self._row_score(row, severities) for row in rows], dtype=np.float64)
+        totals = matrix.total_possible[selected][:, None]
+        multipliers = matrix.temperature_multipliers(temperature)[selected][:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Score of every disease without each symptom, then with that
+            # symptom at every severity
+            others = scores[:, None] - weights * vector
+            levels = np.arange(MIN_SEVERITY, MAX_SEVERITY + 1, dtype=np.float64)
+            grid = np.minimum(
+                (others[:, :, None] + weights[:, :, None] * levels)
+                / totals[:, :, None] * 100 * multipliers[:, :, None],
+                100.0
+            )
+            contributions = (weights * vector / totals * 100 * multipliers)
+        # Zero-weight diseases always score 0, like _row_probability
+        unweighted = totals[:, 0] <= 0
+        grid[unweighted] = 0
+        contributions[unweighted] = 0
+        grid = grid.tolist()
+        contributions = contributions.tolist()
+
+        names = self.registry.names
+        explanations = []
+        for i, row in enumerate(rows):
+            confidence = self._row_confidence(row, severities, temperature)
+            row_contributions = []
+            sensitivity = {}
+            for position, _, _ in self._row_symptoms[row]:
+                column = self._column_of[position]
+                value = severities[position]
+                if value > 0:
+                    row_contributions.append((contributions[i][column], names[position]))
+                cells = [round(cell, 1) for cell in grid[i][column]]
+                # The current severity is exactly the reported confidence
+                cells[value - MIN_SEVERITY] = confidence
+                sensitivity[names[position]] = cells
+            explanations.append(self._explanation(row, temperature, confidence, row_contributions, sensitivity))
+        return explanations
+
+
+class VectorizedIncrementalDiagnosis(IncrementalDiagnosis):
+    """
+    IncrementalDiagnosis with the partial scores of all diseases in one vector
+
+    A symptom change adds its delta times the symptom's weight column, and
+    candidates are picked with np.partition, so an update costs a few
+    vectorized passes instead of a Python loop over the affected diseases.
+    """
+
+    def _resync(self):
+        vector = self.engine._column_vector(bytes(self.severities))
+        self._scores = self.engine.matrix.weights @ vector
+        self._reestimate()
+
+    def _reestimate(self):
+        matrix = self.engine.matrix
+        self._factors = matrix.score_scale * matrix.temperature_multipliers(self.temperature)
+        self._exact = {}
+        self._estimates = np.minimum(self._scores * self._factors, 100.0)
+
+    def _apply(self, changed: List[Tuple[int, int, int]]):
+        engine = self.engine
+        for position, delta, _ in changed:
+            column = engine._column_of.get(position)
+            if column is not None:
+                self._scores += delta * engine.matrix.weights[:, column]
+        np.minimum(self._scores * self._factors, 100.0, out=self._estimates)
+
+        # Drop cached entries of diseases containing a changed symptom, from
+        # whichever side is smaller: the cache or the symptoms' posting lists
+        positions = {position for position, _, _ in changed}
+        exact = self._exact
+        if len(exact) < sum(len(engine._symptom_index[position]) for position in positions):
+            row_symptoms = engine._row_symptoms
+            stale = [
+                row for row in exact
+                if any(position in positions for position, _, _ in row_symptoms[row])
+            ]
+        else:
+            stale = [row for position in positions for row, _ in engine._symptom_index[position]]
+        for row in stale:
+            exact.pop(row, None)
+
+    def _candidates(self) -> Iterable[int]:
+        estimates = self._estimates
+        cutoff = self.min_confidence - SCORE_TOLERANCE
+        if self.limit is not None and len(estimates) >= self.limit:
+            kth_score = np.partition(estimates, -self.limit)[-self.limit]
+            if kth_score >= self.min_confidence + SCORE_TOLERANCE:
+                cutoff = max(cutoff, kth_score - 2 * BOUND_TOLERANCE)
+        return np.flatnonzero(estimates >= cutoff).tolist()